@@ -50,21 +50,47 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    # Serves collected static files from the app server, with far-future
+    # cache headers for hashed names and precompressed .gz/.br variants.
+    'whitenoise.middleware.WhiteNoiseMiddleware',
+    # Server-Timing headers and the /metrics histograms; below WhiteNoise so
+    # static files are not counted.
+    'blogs.middleware.PerformanceMiddleware',
+    # gzip (brotli, zstd when installed) for HTML and JSON; below
+    # PerformanceMiddleware so response sizes are measured as sent.
+    'blogs.compression.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    # Clients that wrote read from the primary for a while (blogs.replicas).
+    'blogs.middleware.ReplicaPinMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
 ROOT_URLCONF = 'blogging_system.urls'
 
+# In production mode templates are found and compiled once per process by
+# the cached loader (and warmed at worker boot, see gunicorn.conf.py). With
+# BLOG_TEMPLATE_BUNDLE pointing at the output of `manage.py bundle_templates`,
+# project templates are read from that one file. Development mode (the
+# default with DEBUG) keeps Django's defaults, which pick up template edits.
+TEMPLATE_PRODUCTION_MODE = os.environ.get('DJANGO_TEMPLATE_MODE', 'development' if DEBUG else 'production') == 'production'
+BLOG_TEMPLATE_BUNDLE = os.environ.get('BLOG_TEMPLATE_BUNDLE')
+
+TEMPLATE_LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+if BLOG_TEMPLATE_BUNDLE:
+    TEMPLATE_LOADERS.insert(0, ('blogs.template_cache.BundleLoader', BLOG_TEMPLATE_BUNDLE))
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [BASE_DIR / 'templates'],
-        'APP_DIRS': True,
+        'APP_DIRS': not TEMPLATE_PRODUCTION_MODE,
         'OPTIONS': {
             'context_processors': [
                 'django.template.context_processors.debug',
@@ -75,6 +101,8 @@ TEMPLATES = [
         },
     },
 ]
+if TEMPLATE_PRODUCTION_MODE:
+    TEMPLATES[0]['OPTIONS']['loaders'] = [('django.template.loaders.cached.Loader', TEMPLATE_LOADERS)]
 
 WSGI_APPLICATION = 'blogging_system.wsgi.application'
 
@@ -82,13 +110,62 @@ WSGI_APPLICATION = 'blogging_system.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        #'NAME': BASE_DIR / 'db.sqlite3',
-        'NAME': BASE_DIR / 'data' / 'db.sqlite3',
+# DJANGO_DB_ENGINE selects the backend: 'sqlite' (default) or 'postgresql'.
+# Connections are persistent (CONN_MAX_AGE) and health-checked before reuse.
+
+DB_ENGINE = os.environ.get('DJANGO_DB_ENGINE', 'sqlite')
+CONN_MAX_AGE = int(os.environ.get('DJANGO_CONN_MAX_AGE', 60))
+
+if DB_ENGINE == 'postgresql':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('POSTGRES_DB', 'blog'),
+            'USER': os.environ.get('POSTGRES_USER', 'blog'),
+            'PASSWORD': os.environ.get('POSTGRES_PASSWORD', ''),
+            'HOST': os.environ.get('POSTGRES_HOST', 'localhost'),
+            'PORT': os.environ.get('POSTGRES_PORT', '5432'),
+            'CONN_MAX_AGE': CONN_MAX_AGE,
+            'CONN_HEALTH_CHECKS': True,
+        }
+    }
+else:
+    DATABASES = {
+        'default': {
+            # django.db.backends.sqlite3 plus per-connection PRAGMAs (WAL,
+            # busy timeout, mmap, cache size) and BEGIN IMMEDIATE transactions.
+            'ENGINE': 'blogging_system.sqlite_backend',
+            #'NAME': BASE_DIR / 'db.sqlite3',
+            'NAME': BASE_DIR / 'data' / 'db.sqlite3',
+            'CONN_MAX_AGE': CONN_MAX_AGE,
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {
+                'transaction_mode': 'IMMEDIATE',
+                'pragmas': {
+                    'busy_timeout': int(os.environ.get('SQLITE_BUSY_TIMEOUT', 5000)),
+                },
+            },
+        }
     }
-}
+
+# DJANGO_DB_REPLICAS lists read replicas, comma-separated: SQLite files for
+# the sqlite engine (kept up to date with `manage.py sync_replicas`), hosts
+# for postgresql. The post list and detail views read from them; everything
+# else uses the primary. See blogs.replicas.
+DB_REPLICAS = [replica.strip() for replica in os.environ.get('DJANGO_DB_REPLICAS', '').split(',') if replica.strip()]
+for number, replica in enumerate(DB_REPLICAS, 1):
+    DATABASES['replica%d' % number] = dict(
+        DATABASES['default'],
+        **{'HOST' if DB_ENGINE == 'postgresql' else 'NAME': replica},
+        TEST={'MIRROR': 'default'},
+    )
+DATABASE_ROUTERS = ['blogs.replicas.ReplicaRouter']
+BLOG_READ_REPLICAS = ['replica%d' % number for number in range(1, len(DB_REPLICAS) + 1)]
+# 'round-robin' or 'least-latency'.
+BLOG_REPLICA_STRATEGY = os.environ.get('BLOG_REPLICA_STRATEGY', 'round-robin')
+# How long a client that wrote reads from the primary, in seconds. Keep it
+# above the replication lag.
+BLOG_REPLICA_PIN_SECONDS = int(os.environ.get('BLOG_REPLICA_PIN_SECONDS', 5))
 
 
 # Password validation
@@ -122,19 +199,117 @@ USE_I18N = True
 USE_TZ = True
 
 
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+# The local-memory default is per process (LRU, MAX_ENTRIES). When running
+# several worker processes point DJANGO_CACHE_BACKEND/LOCATION at a shared
+# cache so generation bumps reach every worker.
+
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get('DJANGO_CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('DJANGO_CACHE_LOCATION', 'blogging-system'),
+        'TIMEOUT': int(os.environ.get('DJANGO_CACHE_TIMEOUT', 300)),
+        'OPTIONS': {
+            'MAX_ENTRIES': int(os.environ.get('DJANGO_CACHE_MAX_ENTRIES', 5000)),
+        },
+    }
+}
+
+# TTL of cached /api/posts/ list and detail responses, in seconds.
+BLOG_API_CACHE_TIMEOUT = int(os.environ.get('BLOG_API_CACHE_TIMEOUT', 60))
+
+# TTL of whole /blog/ pages cached for anonymous visitors, and of the
+# versioned template fragments every visitor shares, in seconds.
+BLOG_PAGE_CACHE_TIMEOUT = int(os.environ.get('BLOG_PAGE_CACHE_TIMEOUT', 60))
+BLOG_FRAGMENT_CACHE_TIMEOUT = int(os.environ.get('BLOG_FRAGMENT_CACHE_TIMEOUT', 600))
+
+# TTL of the cached user -> author mapping the write endpoints use, in seconds.
+# Authors being saved or deleted drop it in the process that made the change.
+BLOG_AUTHOR_CACHE_TIMEOUT = int(os.environ.get('BLOG_AUTHOR_CACHE_TIMEOUT', 600))
+
+# Write-behind comments (see blogs.comment_queue): new comments are answered
+# with 202, spooled to BLOG_COMMENT_SPOOL_DIR and stored in batches, every
+# BLOG_COMMENT_QUEUE_INTERVAL seconds by a thread in each worker, or by
+# `manage.py flush_comments --interval N` with BLOG_COMMENT_QUEUE_WORKER=command.
+# Spooled comments survive a crashed process; BLOG_COMMENT_SPOOL_FSYNC=1 makes
+# them survive a power loss too, at one fsync per comment.
+BLOG_COMMENT_QUEUE = os.environ.get('BLOG_COMMENT_QUEUE', '0') == '1'
+BLOG_COMMENT_SPOOL_DIR = os.environ.get('BLOG_COMMENT_SPOOL_DIR', str(BASE_DIR / 'data' / 'comment_spool'))
+BLOG_COMMENT_QUEUE_WORKER = os.environ.get('BLOG_COMMENT_QUEUE_WORKER', 'thread')
+BLOG_COMMENT_QUEUE_INTERVAL = float(os.environ.get('BLOG_COMMENT_QUEUE_INTERVAL', 1.0))
+BLOG_COMMENT_SPOOL_FSYNC = os.environ.get('BLOG_COMMENT_SPOOL_FSYNC', '0') == '1'
+
+# Responses smaller than this, in bytes, are not compressed: they fit in a
+# packet or two anyway.
+BLOG_COMPRESS_MIN_SIZE = int(os.environ.get('BLOG_COMPRESS_MIN_SIZE', 1024))
+
+# Post and comment bodies are stored compressed (blogs.fields): 'zlib',
+# 'zstd' (needs the zstandard package) or 'none'. Applies to new writes;
+# every stored value names its own codec. Texts under the minimum size, in
+# bytes, are stored as they are.
+BLOG_TEXT_COMPRESSION = os.environ.get('BLOG_TEXT_COMPRESSION', 'zlib')
+BLOG_TEXT_COMPRESS_MIN_SIZE = int(os.environ.get('BLOG_TEXT_COMPRESS_MIN_SIZE', 256))
+
+# Requests above these budgets are logged to 'blogs.performance' and counted
+# in /metrics.
+BLOG_QUERY_BUDGET = int(os.environ.get('BLOG_QUERY_BUDGET', 20))
+BLOG_LATENCY_BUDGET_MS = int(os.environ.get('BLOG_LATENCY_BUDGET_MS', 500))
+
+# With several worker processes, set this to a directory they share so
+# /metrics reports all of them rather than the one answering.
+BLOG_METRICS_DIR = os.environ.get('BLOG_METRICS_DIR') or None
+
+# Largest item list accepted by the bulk ingestion endpoints.
+BLOG_BULK_MAX_ITEMS = int(os.environ.get('BLOG_BULK_MAX_ITEMS', 5000))
+
+
 # Static files (CSS, JavaScript, Images)
 # https://docs.djangoproject.com/en/4.2/howto/static-files/
 
 STATIC_URL = 'static/'
+STATIC_ROOT = BASE_DIR / 'staticfiles'
+
+# Plain storage by default, so dev and tests work without collectstatic. The
+# production image sets DJANGO_STATICFILES_STORAGE to WhiteNoise's manifest
+# storage: content-hashed names plus a manifest, and gzip/brotli copies next
+# to each file. Templates must then use {% static %}.
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': os.environ.get(
+            'DJANGO_STATICFILES_STORAGE', 'django.contrib.staticfiles.storage.StaticFilesStorage'
+        ),
+    },
+}
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# API clients authenticate with tokens (`manage.py api_token create <user>`).
+# HTTP Basic runs a full password hash per request; DJANGO_API_BASIC_AUTH=1
+# re-enables it for clients that cannot move yet.
 REST_FRAMEWORK = {
+    # Session first: its lack of a WWW-Authenticate challenge keeps
+    # unauthenticated requests at 403, as before.
     'DEFAULT_AUTHENTICATION_CLASSES': [
         'rest_framework.authentication.SessionAuthentication',
-        'rest_framework.authentication.BasicAuthentication',  # Optional but useful
+        'blogs.authentication.TokenAuthentication',
     ],
 }
+if os.environ.get('DJANGO_API_BASIC_AUTH', '0') == '1':
+    REST_FRAMEWORK['DEFAULT_AUTHENTICATION_CLASSES'].append('rest_framework.authentication.BasicAuthentication')
+
+# Sessions are read from the cache and only fall back to the database on a
+# miss; session users come from a short-lived in-process cache. Together an
+# authenticated request needs no auth queries.
+SESSION_ENGINE = os.environ.get('DJANGO_SESSION_ENGINE', 'django.contrib.sessions.backends.cached_db')
+AUTHENTICATION_BACKENDS = ['blogs.authentication.CachedModelBackend']
+
+# Lifetime of cached API tokens and session users, in seconds: how long a
+# revoked token or changed user may still be seen by other worker processes.
+BLOG_AUTH_CACHE_TIMEOUT = int(os.environ.get('BLOG_AUTH_CACHE_TIMEOUT', 30))
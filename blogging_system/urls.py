@@ -17,6 +17,7 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path,include
 from django.views.generic.base import RedirectView
+from blogs.views import prometheus_metrics
 
 urlpatterns = [
     path('', RedirectView.as_view(url='/blog/', permanent=True)),
@@ -24,4 +25,5 @@ urlpatterns = [
     path('blog/', include('blogs.urls')),
     path('api/', include('blogs.urls_api')),
     path('api-auth/', include('rest_framework.urls')), 
+    path('metrics', prometheus_metrics, name='metrics'),
 ]
@@ -1,7 +1,17 @@
 from django.contrib import admin
 
-from .models import Author,Post,Comment
+from .models import Author,Post,Comment,ApiToken
 
 admin.site.register(Author)
 admin.site.register(Post)
 admin.site.register(Comment)
+
+
+@admin.register(ApiToken)
+class ApiTokenAdmin(admin.ModelAdmin):
+    list_display = ['prefix', 'name', 'user', 'created', 'revoked_at']
+    readonly_fields = ['prefix', 'key_hash', 'created']
+
+    def has_add_permission(self, request):
+        # Keys are only ever shown once, by `manage.py api_token create`.
+        return False
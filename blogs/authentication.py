@@ -0,0 +1,144 @@
+"""
+API tokens and cached authentication lookups.
+
+`TokenAuthentication` replaces HTTP Basic for integration clients: a token is
+a random key, so a single SHA-256 identifies it. Basic needs a full PBKDF2
+hash on every request. Tokens and session users are kept in a short-lived
+in-process cache (`BLOG_AUTH_CACHE_TIMEOUT` seconds). With the cached session
+engine, an authenticated request then runs no auth queries at all.
+
+Revoking a token or changing a user drops the cached entry in the process
+that made the change. Other processes notice when their entry expires.
+"""
+import copy
+import hashlib
+import secrets
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+from django.utils import timezone
+from rest_framework import authentication, exceptions
+
+from .models import ApiToken
+
+
+class LocalCache:
+    """Thread-safe in-process mapping whose entries expire after `timeout()` seconds."""
+    max_entries = 10000
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entries = {}
+
+    def timeout(self):
+        return getattr(settings, 'BLOG_AUTH_CACHE_TIMEOUT', 30)
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            return None
+        return entry[1]
+
+    def set(self, key, value):
+        now = time.monotonic()
+        with self.lock:
+            if len(self.entries) >= self.max_entries:
+                self.entries = {k: entry for k, entry in self.entries.items() if entry[0] >= now}
+                if len(self.entries) >= self.max_entries:
+                    self.entries.clear()
+            self.entries[key] = (now + self.timeout(), value)
+
+    def delete(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def delete_matching(self, test):
+        """Drop every entry whose value passes `test`."""
+        with self.lock:
+            self.entries = {key: entry for key, entry in self.entries.items() if not test(entry[1])}
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+tokens = LocalCache()
+users = LocalCache()
+
+
+def hash_key(key):
+    return hashlib.sha256(key.encode('utf-8')).hexdigest()
+
+
+def create_token(user, name=''):
+    """A new token for `user`: returns `(token, key)`. The key is not stored."""
+    key = secrets.token_urlsafe(32)
+    token = ApiToken.objects.create(user=user, name=name, prefix=key[:8], key_hash=hash_key(key))
+    return token, key
+
+
+def revoke_token(token):
+    # Saved rather than updated, so the signal drops it from the cache.
+    if token.revoked_at is None:
+        token.revoked_at = timezone.now()
+        token.save(update_fields=['revoked_at'])
+
+
+def forget_user(user_id):
+    users.delete(user_id)
+    # Tokens hold their user too.
+    tokens.delete_matching(lambda token: token.user_id == user_id)
+
+
+class TokenAuthentication(authentication.BaseAuthentication):
+    """`Authorization: Token <key>` (or `Bearer <key>`) against hashed, revocable ApiTokens."""
+    # Bytes, as the header is: a scheme that is not valid UTF-8 is just not ours.
+    keywords = (b'token', b'bearer')
+
+    def authenticate(self, request):
+        parts = authentication.get_authorization_header(request).split()
+        if not parts or parts[0].lower() not in self.keywords:
+            return None
+        if len(parts) != 2:
+            raise exceptions.AuthenticationFailed("Invalid token header.")
+        try:
+            key = parts[1].decode('ascii')
+        except UnicodeError:
+            raise exceptions.AuthenticationFailed("Invalid token header.")
+        return self.authenticate_key(key)
+
+    def authenticate_key(self, key):
+        key_hash = hash_key(key)
+        cached = tokens.get(key_hash)
+        if cached is None:
+            token = (
+                ApiToken.objects.select_related('user')
+                .filter(key_hash=key_hash, revoked_at__isnull=True).first()
+            )
+            if token is None or not token.user.is_active:
+                raise exceptions.AuthenticationFailed("Invalid token.")
+            cached = token
+            tokens.set(key_hash, token)
+        # A copy per request: handlers may change the user they are given.
+        token = copy.copy(cached)
+        token.user = copy.copy(cached.user)
+        return token.user, token
+
+    def authenticate_header(self, request):
+        return 'Token'
+
+
+class CachedModelBackend(ModelBackend):
+    """ModelBackend whose per-request session user lookup is served from the in-process cache."""
+
+    def get_user(self, user_id):
+        user = users.get(user_id)
+        if user is None:
+            user = super().get_user(user_id)
+            if user is None:
+                return None
+            users.set(user_id, user)
+        return copy.copy(user)
@@ -0,0 +1,48 @@
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Author
+
+
+USER_AUTHOR_KEY = 'blogs:user-author:%s'
+# Cached for users without an author, so they do not query on every request.
+# Only briefly: a user who is given an author in another process (with a
+# per-process cache) can post once it expires.
+NO_AUTHOR = 0
+NO_AUTHOR_TIMEOUT = 30
+
+
+def author_cache_timeout():
+    return getattr(settings, 'BLOG_AUTHOR_CACHE_TIMEOUT', 600)
+
+
+def author_id_for_user(user_id):
+    """
+    The pk of the author linked to `user_id`, or None.
+
+    The mapping is cached for `BLOG_AUTHOR_CACHE_TIMEOUT` seconds; the `Author`
+    signal handlers in `blogs.signals` drop it whenever an author is saved or
+    deleted.
+    """
+    key = USER_AUTHOR_KEY % user_id
+    author_id = cache.get(key)
+    if author_id is None:
+        author_id = (
+            Author.objects.filter(user_id=user_id).order_by('pk')
+            .values_list('pk', flat=True).first()
+        ) or NO_AUTHOR
+        cache.set(key, author_id, author_cache_timeout() if author_id else NO_AUTHOR_TIMEOUT)
+    return author_id or None
+
+
+def request_author_id(request):
+    """`author_id_for_user` for the request's user, resolved once per request."""
+    if not hasattr(request, '_author_id'):
+        user = request.user
+        request._author_id = author_id_for_user(user.pk) if user.is_authenticated else None
+    return request._author_id
+
+
+def forget_user(user_id):
+    if user_id is not None:
+        cache.delete(USER_AUTHOR_KEY % user_id)
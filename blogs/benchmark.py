@@ -0,0 +1,297 @@
+"""
+Request benchmarks for the blog workload.
+
+Scenarios build requests against real data and are replayed through a
+transport: the Django test client (in-process) or HTTP against a running
+server. Results are plain dicts so runs can be saved as JSON and compared.
+"""
+import http.cookiejar
+import itertools
+import json
+import random
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+from django.conf import settings
+from django.test import Client
+
+from .models import Post
+
+FILTERS = ('title', 'author_name', 'start_date', 'end_date')
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def summarize(latencies, errors, elapsed):
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'requests_per_s': len(latencies) / elapsed if elapsed else 0.0,
+        'p50_ms': percentile(latencies, 0.50) * 1000,
+        'p90_ms': percentile(latencies, 0.90) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000,
+        'max_ms': max(latencies, default=0.0) * 1000,
+    }
+
+
+class Workload:
+    """Samples of real rows that scenarios draw their parameters from."""
+
+    def __init__(self, seed=0, sample=1000):
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        posts = list(
+            Post.objects.filter(active=True).order_by('?')
+            .values_list('pk', 'title', 'author__name', 'published_date')[:sample]
+        )
+        if not posts:
+            raise ValueError("No active posts; run generate_data first.")
+        self.post_ids = [post[0] for post in posts]
+        self.title_words = [word for post in posts for word in post[1].split()[:2]]
+        self.author_names = sorted({post[2] for post in posts})
+        self.days = sorted(post[3].date() for post in posts)
+        self.own_posts = []
+        self.run = '%x' % time.time_ns()
+        self.counter = itertools.count()
+
+    def choice(self, values):
+        with self.lock:
+            return self.rng.choice(values)
+
+    def date_range(self):
+        with self.lock:
+            start, end = sorted(self.rng.sample(self.days, 2))
+        return start.isoformat(), end.isoformat()
+
+    def unique(self, prefix):
+        return '%s %s-%d' % (prefix, self.run, next(self.counter))
+
+    def own_post(self, pop=False):
+        """A post of the benchmark author (see `ensure_own_posts`)."""
+        with self.lock:
+            if pop:
+                return self.own_posts.pop()
+            return self.rng.choice(self.own_posts)
+
+
+def list_params(workload, combo):
+    params = {}
+    start, end = workload.date_range()
+    for name in combo:
+        if name == 'title':
+            params['title'] = workload.choice(workload.title_words)
+        elif name == 'author_name':
+            params['author_name'] = workload.choice(workload.author_names)
+        elif name == 'start_date':
+            params['start_date'] = start
+        elif name == 'end_date':
+            params['end_date'] = end
+    return params
+
+
+def list_scenario(combo):
+    def build(workload):
+        params = dict(list_params(workload, combo), page_size=20)
+        return 'GET', '/api/posts/?' + urllib.parse.urlencode(params), None
+    return build
+
+
+def detail(workload):
+    return 'GET', '/api/posts/%d/' % workload.choice(workload.post_ids), None
+
+
+def comment_create(workload):
+    post = workload.choice(workload.post_ids)
+    return 'POST', '/api/posts/%d/comments/' % post, {'content': 'Benchmark comment.'}
+
+
+def post_create(workload):
+    body = {'title': workload.unique('Benchmark post'), 'content': 'Benchmark post content.'}
+    return 'POST', '/api/posts/create/', body
+
+
+def post_edit(workload):
+    body = {'title': workload.unique('Benchmark edit'), 'content': 'Edited benchmark content.', 'active': True}
+    return 'PUT', '/api/posts/%d/edit/' % workload.own_post(), body
+
+
+def post_delete(workload):
+    return 'DELETE', '/api/posts/%d/delete/' % workload.own_post(pop=True), None
+
+
+def html_list(workload):
+    return 'GET', '/blog/', None
+
+
+def html_detail(workload):
+    return 'GET', '/blog/%d/' % workload.choice(workload.post_ids), None
+
+
+def scenarios():
+    """Name -> request builder. Every subset of the list filters gets its own scenario."""
+    result = {}
+    for size in range(len(FILTERS) + 1):
+        for combo in itertools.combinations(FILTERS, size):
+            result['api-list[%s]' % '+'.join(combo)] = list_scenario(combo)
+    result.update({
+        'api-detail': detail,
+        'api-comment-create': comment_create,
+        'api-post-create': post_create,
+        'api-post-edit': post_edit,
+        'api-post-delete': post_delete,
+        'html-list': html_list,
+        'html-detail': html_detail,
+    })
+    return result
+
+
+def allowed_host():
+    """A Host header ALLOWED_HOSTS accepts; the test client's 'testserver' often is not."""
+    for host in settings.ALLOWED_HOSTS:
+        if host == '*':
+            return 'testserver'
+        if host:
+            return host.lstrip('.')
+    return 'localhost'
+
+
+class InProcessTransport:
+    """Django test client, logged in as the benchmark user. Not thread safe."""
+    concurrency = 1
+
+    def __init__(self, user):
+        self.client = Client(HTTP_HOST=allowed_host())
+        self.client.force_login(user)
+
+    def request(self, method, path, body=None):
+        kwargs = {}
+        if body is not None:
+            kwargs = {'data': json.dumps(body), 'content_type': 'application/json'}
+        response = getattr(self.client, method.lower())(path, **kwargs)
+        return response.status_code, self.response_json(response)
+
+    def response_json(self, response):
+        if response.get('Content-Type', '').startswith('application/json') and response.content:
+            return json.loads(response.content)
+        return None
+
+
+class HttpTransport:
+    """HTTP against a running server, with a session logged in through /api-auth/login/."""
+
+    def __init__(self, base_url, username, password, concurrency=1):
+        self.base_url = base_url.rstrip('/')
+        self.concurrency = concurrency
+        self.cookies = http.cookiejar.CookieJar()
+        self.opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(self.cookies))
+        self.login(username, password)
+
+    def csrf_token(self):
+        return next((cookie.value for cookie in self.cookies if cookie.name == 'csrftoken'), '')
+
+    def login(self, username, password):
+        url = self.base_url + '/api-auth/login/'
+        self.opener.open(url).read()
+        data = urllib.parse.urlencode({
+            'username': username, 'password': password, 'csrfmiddlewaretoken': self.csrf_token(),
+            'next': '/api/posts/?page_size=1',
+        }).encode()
+        request = urllib.request.Request(url, data=data, headers={'Referer': url})
+        try:
+            self.opener.open(request).read()
+        except urllib.error.HTTPError as exc:
+            raise ValueError("Login failed: HTTP %d." % exc.code)
+        if not any(cookie.name == 'sessionid' for cookie in self.cookies):
+            raise ValueError("Could not log in as %s." % username)
+
+    def request(self, method, path, body=None):
+        headers = {'Accept': 'application/json', 'X-CSRFToken': self.csrf_token(),
+                   'Referer': self.base_url + '/'}
+        data = None
+        if body is not None:
+            data = json.dumps(body).encode()
+            headers['Content-Type'] = 'application/json'
+        request = urllib.request.Request(self.base_url + path, data=data, headers=headers, method=method)
+        try:
+            with self.opener.open(request) as response:
+                content, status, content_type = response.read(), response.status, response.headers.get('Content-Type', '')
+        except urllib.error.HTTPError as exc:
+            content, status, content_type = exc.read(), exc.code, exc.headers.get('Content-Type', '')
+        if content_type.startswith('application/json') and content:
+            return status, json.loads(content)
+        return status, None
+
+
+def ensure_own_posts(workload, transport, count):
+    """Posts of the benchmark author for the edit and delete scenarios to use."""
+    while len(workload.own_posts) < count:
+        status, data = transport.request(*post_create(workload))
+        if status != 201:
+            raise ValueError("Could not create a post for the benchmark author (HTTP %d)." % status)
+        workload.own_posts.append(Post.objects.filter(title=data['data']['title']).values_list('pk', flat=True).get())
+
+
+def run_scenario(transport, workload, build, requests):
+    """Send `requests` requests built by `build`, spread over the transport's concurrency."""
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    counter = itertools.count()
+
+    def worker():
+        while next(counter) < requests:
+            method, path, body = build(workload)
+            start = time.perf_counter()
+            try:
+                status, _ = transport.request(method, path, body)
+            except OSError:
+                status = None
+            elapsed = time.perf_counter() - start
+            with lock:
+                if status is not None and status < 400:
+                    latencies.append(elapsed)
+                else:
+                    errors[0] += 1
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=worker) for _ in range(transport.concurrency)]
+    if len(threads) == 1:
+        worker()
+    else:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    return summarize(latencies, errors[0], time.perf_counter() - start)
+
+
+def run(transport, workload, names, requests):
+    builders = scenarios()
+    if 'api-post-edit' in names or 'api-post-delete' in names:
+        ensure_own_posts(workload, transport, requests + 1)
+    return {name: run_scenario(transport, workload, builders[name], requests) for name in names}
+
+
+def compare(baseline, current, threshold):
+    """
+    Scenarios whose throughput dropped or p99 latency rose by more than
+    `threshold` (a fraction) against `baseline`, as `(name, metric, old, new)`.
+    """
+    regressions = []
+    for name, new in current.items():
+        old = baseline.get(name)
+        if old is None:
+            continue
+        if old['requests_per_s'] and new['requests_per_s'] < old['requests_per_s'] * (1 - threshold):
+            regressions.append((name, 'requests_per_s', old['requests_per_s'], new['requests_per_s']))
+        if old['p99_ms'] and new['p99_ms'] > old['p99_ms'] * (1 + threshold):
+            regressions.append((name, 'p99_ms', old['p99_ms'], new['p99_ms']))
+    return regressions
@@ -0,0 +1,136 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Post, Comment, make_excerpt
+from .serializers import BulkPostSerializer, BulkCommentSerializer
+from .counters import refresh_comment_stats
+from . import cache, search
+
+
+User = get_user_model()
+
+DEFAULT_CHUNK_SIZE = 500
+
+
+def chunked(items, size):
+    for start in range(0, len(items), size):
+        yield start, items[start:start + size]
+
+
+def validate_items(items, serializer_class):
+    """
+    Field-level validation of every item, without touching the database.
+
+    Returns `(valid, results)`: `valid` is a list of `(index, validated_data)`
+    and `results` holds one result dict per item, errors already filled in.
+    """
+    valid = []
+    results = [None] * len(items)
+    for index, item in enumerate(items):
+        serializer = serializer_class(data=item)
+        if serializer.is_valid():
+            valid.append((index, serializer.validated_data))
+        else:
+            results[index] = {'index': index, 'status': 'error', 'errors': serializer.errors}
+    return valid, results
+
+
+def error(results, index, field, message):
+    results[index] = {'index': index, 'status': 'error', 'errors': {field: [message]}}
+
+
+def summarize(results):
+    created = sum(1 for result in results if result['status'] == 'created')
+    return {'created': created, 'failed': len(results) - created, 'results': results}
+
+
+def ingest_posts(items, author_id, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Create many posts for the author `author_id` with set-based title checks and `bulk_create`.
+
+    Each chunk is one transaction: a single `title__in` query finds titles that
+    already exist, duplicates inside the batch are rejected after the first
+    occurrence, and the remaining rows are inserted together.
+    """
+    valid, results = validate_items(items, BulkPostSerializer)
+    seen = set()
+
+    for _, chunk in chunked(valid, chunk_size):
+        with transaction.atomic():
+            titles = [data['title'] for _, data in chunk]
+            taken = set(Post.objects.filter(title__in=titles).values_list('title', flat=True))
+            rows = []
+            for index, data in chunk:
+                title = data['title']
+                if title in taken or title in seen:
+                    error(results, index, 'title', "A post with this title already exists.")
+                    continue
+                seen.add(title)
+                # bulk_create skips Post.save(), which fills in the excerpt.
+                post = Post(author_id=author_id, active=True, excerpt=make_excerpt(data['content']), **data)
+                rows.append((index, post))
+
+            created = Post.objects.bulk_create([post for _, post in rows])
+            for (index, _), post in zip(rows, created):
+                results[index] = {'index': index, 'status': 'created', 'id': post.pk}
+            # bulk_create sends no signals.
+            search.index_saved_posts(created)
+
+    cache.invalidate_posts()
+    return summarize(results)
+
+
+def ingest_comments(items, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Create many comments with `bulk_create`.
+
+    Each chunk resolves its target posts and usernames with one query each;
+    comments on missing or inactive posts are rejected per item.
+    """
+    valid, results = validate_items(items, BulkCommentSerializer)
+    touched = set()
+
+    for _, chunk in chunked(valid, chunk_size):
+        with transaction.atomic():
+            post_ids = {data['post'] for _, data in chunk}
+            active = set(
+                Post.objects.filter(pk__in=post_ids, active=True).values_list('pk', flat=True)
+            )
+            usernames = {data['user'] for _, data in chunk if data.get('user')}
+            users = dict(
+                User.objects.filter(username__in=usernames).values_list('username', 'pk')
+            )
+
+            rows = []
+            for index, data in chunk:
+                if data['post'] not in active:
+                    error(results, index, 'post', "Post does not exist or is inactive.")
+                    continue
+                username = data.get('user')
+                if username and username not in users:
+                    error(results, index, 'user', "Unknown username.")
+                    continue
+                comment = Comment(
+                    post_id=data['post'],
+                    content=data['content'],
+                    user_id=users.get(username),
+                    created=data.get('created') or timezone.now(),
+                )
+                rows.append((index, comment))
+
+            created = Comment.objects.bulk_create([comment for _, comment in rows])
+            for (index, _), comment in zip(rows, created):
+                results[index] = {'index': index, 'status': 'created', 'id': comment.pk}
+                touched.add(comment.post_id)
+
+            # bulk_create sends no signals, so recount the posts of this chunk.
+            refresh_comment_stats(post_ids & active)
+
+    if touched:
+        # Archive comments may be older than the newest one, so move the
+        # posts' validators explicitly rather than relying on comment times.
+        Post.objects.filter(pk__in=touched).update(updated_at=timezone.now())
+        for post_id in touched:
+            cache.invalidate_post(post_id)
+    return summarize(results)
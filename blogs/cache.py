@@ -0,0 +1,289 @@
+import hashlib
+import re
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse
+from django.middleware.csrf import get_token
+from django.utils.cache import patch_vary_headers
+from rest_framework.response import Response
+
+from .conditional import conditional_response, set_validators
+from . import compression, replicas
+
+
+POSTS_GENERATION_KEY = 'blogs:gen:posts'
+POST_GENERATION_KEY = 'blogs:gen:post:%s'
+# Bumped along with every POST_GENERATION_KEY, for pages that show many posts'
+# comment counts.
+ANY_POST_GENERATION_KEY = 'blogs:gen:any-post'
+# Set for BLOG_REPLICA_PIN_SECONDS after a generation is bumped: replicas may
+# not have the change yet.
+CHANGED_KEY = '%s:changed'
+
+# Response headers that are part of a cached API response (the post list's
+# next page link).
+CACHED_HEADERS = ('Link',)
+
+# The hidden input `{% csrf_token %}` renders.
+CSRF_INPUT = re.compile(rb'(name="csrfmiddlewaretoken" value=")[^"]*(")')
+
+
+def csrf_parts(content):
+    """A cached page (CSRF token stripped) split where the token goes."""
+    bounds = [0] + [match.end(1) for match in CSRF_INPUT.finditer(content)] + [len(content)]
+    return [content[start:end] for start, end in zip(bounds, bounds[1:])]
+
+
+class CacheStats:
+    """In-process hit/miss counters, per cached view scope."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = {}
+
+    def record(self, scope, outcome):
+        with self.lock:
+            counts = self.counters.setdefault(scope, {'hits': 0, 'misses': 0})
+            counts[outcome] += 1
+
+    def snapshot(self):
+        with self.lock:
+            return {scope: dict(counts) for scope, counts in self.counters.items()}
+
+    def reset(self):
+        with self.lock:
+            self.counters.clear()
+
+
+stats = CacheStats()
+
+
+def api_cache_timeout():
+    return getattr(settings, 'BLOG_API_CACHE_TIMEOUT', 60)
+
+
+def page_cache_timeout():
+    return getattr(settings, 'BLOG_PAGE_CACHE_TIMEOUT', 60)
+
+
+def fragment_cache_timeout():
+    return getattr(settings, 'BLOG_FRAGMENT_CACHE_TIMEOUT', 600)
+
+
+def start_generation(key):
+    # A missing counter restarts from the clock rather than from 0, so an
+    # evicted generation can never line up with entries cached under it before.
+    cache.add(key, time.time_ns() // 1000, timeout=None)
+
+
+def current_generations(keys):
+    generations = cache.get_many(keys)
+    missing = [key for key in keys if key not in generations]
+    if missing:
+        for key in missing:
+            start_generation(key)
+        generations.update(cache.get_many(missing))
+    return generations
+
+
+def bump(key):
+    start_generation(key)
+    try:
+        cache.incr(key)
+    except ValueError:
+        start_generation(key)
+
+
+def invalidate(key):
+    # Bump now so this process never serves stale data, and again after commit
+    # so a reader that refilled the cache mid-transaction is discarded too.
+    bump(key)
+    transaction.on_commit(lambda: bump(key))
+    if replicas.replicas():
+        transaction.on_commit(lambda: cache.set(CHANGED_KEY % key, True, replicas.pin_seconds()))
+
+
+def invalidate_posts():
+    invalidate(POSTS_GENERATION_KEY)
+
+
+def invalidate_post(pk):
+    invalidate(POST_GENERATION_KEY % pk)
+    invalidate(ANY_POST_GENERATION_KEY)
+
+
+def replica_may_be_stale(keys):
+    """
+    Whether this request read from a replica that may lag behind a recent
+    change to `keys`. Its response must not be cached under the new generation.
+    """
+    if replicas.read_database.get() is None:
+        return False
+    return bool(cache.get_many([CHANGED_KEY % key for key in keys]))
+
+
+def normalized_params(query_params):
+    """Query params as a canonical string: sorted, with empty values dropped."""
+    items = sorted(
+        (key, value)
+        for key, values in query_params.lists()
+        for value in values
+        if value != ''
+    )
+    return '&'.join('%s=%s' % item for item in items)
+
+
+def response_cache_key(prefix, scope, request, query_params, keys):
+    generations = current_generations(keys)
+    material = '|'.join([
+        request.get_host(),
+        request.path,
+        normalized_params(query_params),
+    ] + [str(generations.get(key, 0)) for key in keys])
+    digest = hashlib.md5(material.encode('utf-8')).hexdigest()
+    return 'blogs:%s:%s:%s' % (prefix, scope, digest)
+
+
+def plain(data):
+    # DRF's ReturnList/ReturnDict keep a reference to their serializer, which
+    # must not end up pickled into the cache.
+    if isinstance(data, dict):
+        return {key: plain(value) for key, value in data.items()}
+    if isinstance(data, list):
+        return [plain(value) for value in data]
+    return data
+
+
+class CachedResponseMixin:
+    """
+    Read-through cache for GET responses of a DRF view.
+
+    Entries are keyed on the view scope, the current generation counters and
+    the normalized query params. Writes never delete entries; the `post_save`
+    and `post_delete` handlers in `blogs.signals` bump the generation instead,
+    which orphans every key built from the old value.
+    """
+    cache_scope = None
+
+    def get_generation_keys(self):
+        return [POSTS_GENERATION_KEY]
+
+    def get(self, request, *args, **kwargs):
+        keys = self.get_generation_keys()
+        key = response_cache_key('api', self.cache_scope, request, request.query_params, keys)
+        entry = cache.get(key)
+        if entry is not None:
+            stats.record(self.cache_scope, 'hits')
+            # Validators are cached with the body, so conditional requests that
+            # hit the cache are answered without touching the database.
+            validators = entry['validators']
+            response = None
+            if validators is not None:
+                response = conditional_response(request, *validators)
+            if response is None:
+                variant_key = self.get_variant_key(request, key)
+                variant = compression.cached_variant(request, variant_key) if variant_key else None
+                if variant is not None:
+                    response = compression.variant_response(*variant)
+                else:
+                    response = Response(entry['data'])
+                    if variant_key:
+                        compression.cache_variants(response, variant_key, api_cache_timeout())
+                if validators is not None:
+                    set_validators(response, *validators)
+                    if variant is not None:
+                        compression.weaken_etag(response)
+                for name, value in entry.get('headers', {}).items():
+                    response[name] = value
+            response['X-Cache'] = 'HIT'
+            return response
+
+        stats.record(self.cache_scope, 'misses')
+        response = super().get(request, *args, **kwargs)
+        if response.status_code == 200 and not replica_may_be_stale(keys):
+            cache.set(key, {
+                'data': plain(response.data),
+                'validators': getattr(self, '_validators', None),
+                'headers': {name: response[name] for name in CACHED_HEADERS if response.has_header(name)},
+            }, api_cache_timeout())
+            variant_key = self.get_variant_key(request, key)
+            if variant_key:
+                compression.cache_variants(response, variant_key, api_cache_timeout())
+        response['X-Cache'] = 'MISS'
+        return response
+
+    def get_variant_key(self, request, key):
+        """
+        Where the compressed bytes of the response go, next to the entry at
+        `key`. JSON only: the browsable API renders per-user pages. The media
+        type is part of the key, since `; indent=` changes the bytes.
+        """
+        if request.accepted_renderer.format != 'json':
+            return None
+        media_type = hashlib.md5(request.accepted_media_type.encode('utf-8')).hexdigest()[:12]
+        return '%s:%s' % (key, media_type)
+
+
+class CachedPageMixin:
+    """
+    Whole-page cache for the server-rendered views, for anonymous visitors.
+
+    Keys are built like `CachedResponseMixin`'s, so the same signals
+    invalidate them. The CSRF token is the one per-visitor part of a page: it
+    is stripped before caching and every hit gets the visitor's own. Logged-in
+    users get a freshly rendered page, with the `{% cache %}` fragments in the
+    templates (versioned on the post's `updated_at` and comment counters)
+    saving most of the rendering.
+    """
+    cache_scope = None
+
+    def get_generation_keys(self):
+        return [POSTS_GENERATION_KEY]
+
+    def get_context_data(self, **kwargs):
+        kwargs.setdefault('fragment_cache_timeout', fragment_cache_timeout())
+        return super().get_context_data(**kwargs)
+
+    def get(self, request, *args, **kwargs):
+        if request.user.is_authenticated:
+            return super().get(request, *args, **kwargs)
+
+        keys = self.get_generation_keys()
+        key = response_cache_key('page', self.cache_scope, request, request.GET, keys)
+        entry = cache.get(key)
+        if entry is not None:
+            stats.record(self.cache_scope, 'hits')
+            token = get_token(request).encode('ascii')
+            parts = csrf_parts(entry['content'])
+            if entry.get('gzip') is not None and compression.negotiate(request, ['gzip']):
+                # Already compressed; preferred over compressing with a better coding now.
+                response = HttpResponse(compression.stitch_gzip(entry['gzip'], parts, token),
+                                        content_type=entry['content_type'])
+                response['Content-Encoding'] = 'gzip'
+                patch_vary_headers(response, ('Accept-Encoding',))
+            else:
+                response = HttpResponse(token.join(parts), content_type=entry['content_type'])
+            response['X-Cache'] = 'HIT'
+            return response
+
+        stats.record(self.cache_scope, 'misses')
+        response = super().get(request, *args, **kwargs)
+        if response.status_code == 200 and not replica_may_be_stale(keys):
+            response.add_post_render_callback(lambda rendered: self.store_page(key, rendered))
+        response['X-Cache'] = 'MISS'
+        return response
+
+    def store_page(self, key, response):
+        content = CSRF_INPUT.sub(rb'\1\2', response.content)
+        gzip = None
+        if len(content) >= compression.min_size():
+            gzip = compression.deflate_segments(csrf_parts(content))
+        cache.set(key, {
+            'content': content,
+            'gzip': gzip,
+            'content_type': response['Content-Type'],
+        }, page_cache_timeout())
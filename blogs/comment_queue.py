@@ -0,0 +1,300 @@
+"""
+Write-behind queue for comments.
+
+With `BLOG_COMMENT_QUEUE` on, a new comment is validated, appended to a spool
+file in `BLOG_COMMENT_SPOOL_DIR` and answered right away; `flush()` later
+stores everything spooled with one `bulk_create` per batch, so a burst of
+comments costs a few database transactions instead of one each. Flushing is
+done by a background thread in every process that accepted a comment, or by
+`manage.py flush_comments` when `BLOG_COMMENT_QUEUE_WORKER` is 'command'.
+
+The spool is one append-only JSON lines file shared by all processes and
+guarded by `flock`. A flush renames it out of the way first, so writers move
+on to a fresh file while the claimed one is stored. Every comment carries its
+token into the database, so a flush that is interrupted and replayed never
+stores a comment twice.
+
+Visitors read their own writes: the comments a visitor still has queued on a
+post are stored, by their tokens, before that post's pages are read for them
+(see `QueuedCommentsVisibleMixin`); everyone else's stay queued for the next
+flush. This needs the cache to be shared by all processes, as it already must
+be for the response cache.
+"""
+import contextlib
+import fcntl
+import glob
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache as django_cache
+from django.db import IntegrityError, close_old_connections, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .bulk import DEFAULT_CHUNK_SIZE, chunked
+from .counters import refresh_comment_stats
+from .models import Comment, Post
+from . import cache, replicas
+
+
+User = get_user_model()
+
+logger = logging.getLogger('blogs.comment_queue')
+
+SPOOL_NAME = 'comments.jsonl'
+PENDING_LOCK_NAME = 'pending.lock'
+PENDING_KEY = 'blogs:pending-comments:%s'
+WRITER_COOKIE = 'comment_writer'
+# How long a visitor's queued comments are remembered for read-your-writes;
+# far longer than any flush takes.
+PENDING_TIMEOUT = 300
+
+
+def enabled():
+    return getattr(settings, 'BLOG_COMMENT_QUEUE', False)
+
+
+def spool_dir():
+    return str(getattr(settings, 'BLOG_COMMENT_SPOOL_DIR', os.path.join(settings.BASE_DIR, 'data', 'comment_spool')))
+
+
+class Spool:
+    """Append-only JSON lines file, claimed whole by the flushing process."""
+
+    def __init__(self, directory, fsync=False):
+        self.directory = directory
+        self.path = os.path.join(directory, SPOOL_NAME)
+        self.fsync = fsync
+
+    def append(self, entry):
+        line = json.dumps(entry) + '\n'
+        os.makedirs(self.directory, exist_ok=True)
+        while True:
+            with open(self.path, 'a') as f:
+                fcntl.flock(f, fcntl.LOCK_EX)
+                # The file may have been claimed between open() and flock();
+                # then this is no longer the spool, and the write goes to a new one.
+                try:
+                    current = os.stat(self.path).st_ino
+                except FileNotFoundError:
+                    current = None
+                if current != os.fstat(f.fileno()).st_ino:
+                    continue
+                f.write(line)
+                f.flush()
+                if self.fsync:
+                    os.fsync(f.fileno())
+                return
+
+    def claim(self):
+        """Rename the spool aside; returns every claimed file, older leftovers included."""
+        try:
+            os.replace(self.path, os.path.join(
+                self.directory, 'comments.%d.%d.claimed' % (time.time_ns(), os.getpid())
+            ))
+        except FileNotFoundError:
+            pass
+        return sorted(glob.glob(os.path.join(self.directory, 'comments.*.claimed')))
+
+    def read(self, f):
+        entries = []
+        for number, line in enumerate(f, 1):
+            try:
+                entries.append(json.loads(line))
+            except ValueError:
+                # A line cut short by a crash while appending.
+                logger.warning("Skipping unreadable line %d of %s", number, f.name)
+        return entries
+
+
+def spool():
+    return Spool(spool_dir(), getattr(settings, 'BLOG_COMMENT_SPOOL_FSYNC', False))
+
+
+@contextlib.contextmanager
+def pending_lock():
+    """
+    Held while a visitor's pending entries are read and written back, so
+    concurrent requests in any process on this spool cannot lose each other's.
+    """
+    directory = spool_dir()
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, PENDING_LOCK_NAME), 'a') as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        yield
+
+
+def writer_key(request):
+    """Who submitted a comment: the user, or the anonymous visitor's cookie."""
+    if request.user.is_authenticated:
+        return 'user:%s' % request.user.pk
+    writer = request.COOKIES.get(WRITER_COOKIE) or getattr(request, '_comment_writer', None)
+    if writer is None:
+        writer = request._comment_writer = uuid.uuid4().hex
+    return 'anon:%s' % writer
+
+
+def set_writer_cookie(request, response):
+    writer = getattr(request, '_comment_writer', None)
+    if writer is not None:
+        response.set_cookie(WRITER_COOKIE, writer, max_age=PENDING_TIMEOUT, httponly=True, samesite='Lax')
+    return response
+
+
+def enqueue(request, post_id, content):
+    """Spool a validated comment; returns its token."""
+    token = uuid.uuid4()
+    entry = {
+        'token': token.hex,
+        'post': post_id,
+        'user': request.user.pk if request.user.is_authenticated else None,
+        'content': content,
+        'created': timezone.now().isoformat(),
+    }
+    spool().append(entry)
+    # The visitor's own entries by post, for ensure_visible().
+    key = PENDING_KEY % writer_key(request)
+    with pending_lock():
+        pending = django_cache.get(key) or {}
+        pending.setdefault(post_id, []).append(entry)
+        django_cache.set(key, pending, PENDING_TIMEOUT)
+    start_worker()
+    return token
+
+
+def ensure_visible(request, post_id):
+    """
+    Store this visitor's comments on `post_id` that are still queued. Only
+    theirs: the flush that finds them in the spool later skips their tokens.
+    """
+    if not enabled():
+        return
+    if not request.user.is_authenticated and WRITER_COOKIE not in request.COOKIES:
+        return
+    key = PENDING_KEY % writer_key(request)
+    if not django_cache.get(key):
+        return
+    with pending_lock():
+        pending = django_cache.get(key)
+        if not pending or post_id not in pending:
+            return
+        entries = pending.pop(post_id)
+        if pending:
+            django_cache.set(key, pending, PENDING_TIMEOUT)
+        else:
+            django_cache.delete(key)
+    # The replicas have not seen the stored comments yet.
+    replicas.read_from_primary()
+    try:
+        store(entries)
+    except IntegrityError:
+        # A flush stored the same tokens meanwhile.
+        pass
+
+
+def store(entries):
+    """Create the comments of `entries` not stored yet; returns how many were created."""
+    tokens = [uuid.UUID(entry['token']) for entry in entries]
+    with transaction.atomic():
+        stored = set(Comment.objects.filter(token__in=tokens).values_list('token', flat=True))
+        posts = set(Post.objects.filter(pk__in={entry['post'] for entry in entries}).values_list('pk', flat=True))
+        users = set(User.objects.filter(
+            pk__in={entry['user'] for entry in entries if entry['user'] is not None}
+        ).values_list('pk', flat=True))
+
+        rows = []
+        for token, entry in zip(tokens, entries):
+            if token in stored:
+                continue
+            if entry['post'] not in posts:
+                logger.warning("Dropping queued comment %s: post %s no longer exists", token, entry['post'])
+                continue
+            rows.append(Comment(
+                token=token,
+                post_id=entry['post'],
+                user_id=entry['user'] if entry['user'] in users else None,
+                content=entry['content'],
+                created=parse_datetime(entry['created']),
+            ))
+        Comment.objects.bulk_create(rows)
+
+        # bulk_create sends no signals: counters, validators and caches by hand.
+        touched = {row.post_id for row in rows}
+        if touched:
+            refresh_comment_stats(touched)
+            Post.objects.filter(pk__in=touched).update(updated_at=timezone.now())
+    for post_id in touched:
+        cache.invalidate_post(post_id)
+    return len(rows)
+
+
+flush_lock = threading.Lock()
+
+
+def flush(batch_size=DEFAULT_CHUNK_SIZE):
+    """Store everything spooled so far; returns the number of comments created."""
+    created = 0
+    queue = spool()
+    with flush_lock:
+        for path in queue.claim():
+            try:
+                f = open(path)
+            except FileNotFoundError:
+                # Another process stored and removed it since claim() listed it.
+                continue
+            with f:
+                # Waits for writers that opened the file before it was claimed.
+                fcntl.flock(f, fcntl.LOCK_EX)
+                if not os.path.exists(path):
+                    # Another process stored and removed it meanwhile.
+                    continue
+                entries = queue.read(f)
+                for _, batch in chunked(entries, batch_size):
+                    created += store(batch)
+                os.unlink(path)
+    return created
+
+
+class FlushThread(threading.Thread):
+    def __init__(self, interval):
+        super().__init__(name='comment-queue-flush', daemon=True)
+        self.interval = interval
+
+    def run(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                flush()
+            except Exception:
+                logger.exception("Flushing the comment queue failed")
+            finally:
+                close_old_connections()
+
+
+worker = None
+worker_lock = threading.Lock()
+
+
+def start_worker():
+    global worker
+    if getattr(settings, 'BLOG_COMMENT_QUEUE_WORKER', 'thread') != 'thread':
+        return
+    with worker_lock:
+        if worker is None or not worker.is_alive():
+            worker = FlushThread(getattr(settings, 'BLOG_COMMENT_QUEUE_INTERVAL', 1.0))
+            worker.start()
+
+
+class QueuedCommentsVisibleMixin:
+    """Read-your-writes for queued comments on the post named by `post_kwarg`."""
+    post_kwarg = 'pk'
+
+    def get(self, request, *args, **kwargs):
+        ensure_visible(request, int(kwargs[self.post_kwarg]))
+        return super().get(request, *args, **kwargs)
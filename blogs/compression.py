@@ -0,0 +1,289 @@
+"""
+Response compression.
+
+`CompressionMiddleware` compresses text responses (HTML, JSON, NDJSON, CSV,
+...) with the best coding the client accepts: brotli and zstd when their
+modules are installed, gzip always. Bodies under `BLOG_COMPRESS_MIN_SIZE`
+are sent as they are: they fit in a packet or two either way, so compressing
+them costs CPU and saves nothing. Per-response compression uses fast levels.
+
+Cached responses are compressed once, at high levels, and the compressed
+bytes are cached next to the raw ones:
+
+* API responses (`cache.CachedResponseMixin`) mark the response with their
+  cache key; the middleware stores each coding it produces under that key,
+  and cache hits are answered from it without rendering.
+* Cached pages (`cache.CachedPageMixin`) carry each visitor's own CSRF token,
+  so no two hits have the same bytes. The page is stored as raw deflate
+  segments split at the token, and each hit stitches them into one gzip
+  stream around the token, sent as a stored block (which also keeps the
+  token out of any compression side channel).
+
+A compressed response's strong ETag is made weak (`W/"..."`), as Django's
+GZipMiddleware does: it no longer describes the bytes sent. It still names
+the same version, so If-Match on the edit endpoints accepts the weak form
+(see `conditional.IfMatchMixin`).
+"""
+import re
+import struct
+import zlib
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+COMPRESSIBLE_TYPES = re.compile(
+    r'^(text/|application/(json|x-ndjson|javascript|xml|[\w.+-]+\+json|[\w.+-]+\+xml)|image/svg\+xml)'
+)
+
+# Per response: most of the ratio for little CPU.
+LEVELS = {'br': 4, 'zstd': 3, 'gzip': 5}
+# Compressed once and cached: worth the extra CPU.
+STORED_LEVELS = {'br': 9, 'zstd': 12, 'gzip': 9}
+
+GZIP_HEADER = b'\x1f\x8b\x08\x00\x00\x00\x00\x00\x00\xff'
+
+
+def available_codings():
+    """Codings this process can produce, most preferred first."""
+    codings = []
+    if brotli is not None:
+        codings.append('br')
+    if zstandard is not None:
+        codings.append('zstd')
+    codings.append('gzip')
+    return codings
+
+
+def min_size():
+    return getattr(settings, 'BLOG_COMPRESS_MIN_SIZE', 1024)
+
+
+def parse_accept_encoding(header):
+    """`Accept-Encoding` as a {coding: q} dict."""
+    accepted = {}
+    for item in header.split(','):
+        coding, _, params = item.strip().partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        for param in params.split(';'):
+            name, _, value = param.strip().partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        accepted[coding] = q
+    return accepted
+
+
+def negotiate(request, codings=None):
+    """The coding of `codings` (default: all available) the request accepts best, or None."""
+    accepted = parse_accept_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+    best, best_q = None, 0.0
+    for coding in codings or available_codings():
+        q = accepted.get(coding, accepted.get('*', 0.0))
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+def compress(data, coding, level):
+    if coding == 'br':
+        return brotli.compress(data, quality=level)
+    if coding == 'zstd':
+        return zstandard.ZstdCompressor(level=level).compress(data)
+    return gzip_compress(data, level)
+
+
+def gzip_compress(data, level):
+    # zlib rather than the gzip module: no timestamp in the header, so the
+    # same body always compresses to the same bytes.
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    return compressor.compress(data) + compressor.flush()
+
+
+class StreamCompressor:
+    """Incremental compressor: `process(chunk)` for each chunk, then `finish()`."""
+
+    def __init__(self, coding, level):
+        if coding == 'br':
+            compressor = brotli.Compressor(quality=level)
+            self.process, self.finish = compressor.process, compressor.finish
+        elif coding == 'zstd':
+            compressor = zstandard.ZstdCompressor(level=level).compressobj()
+            self.process, self.finish = compressor.compress, compressor.flush
+        else:
+            compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+            self.process, self.finish = compressor.compress, compressor.flush
+
+
+def compress_stream(chunks, coding, level):
+    # As export.gzip_stream: output goes out as the compressor produces it,
+    # not flushed after every chunk, which would cost ratio.
+    compressor = StreamCompressor(coding, level)
+    for chunk in chunks:
+        data = compressor.process(chunk)
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+async def acompress_stream(chunks, coding, level):
+    compressor = StreamCompressor(coding, level)
+    async for chunk in chunks:
+        data = compressor.process(chunk)
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+# Cached compressed API responses.
+
+def variant_key(key, coding):
+    return '%s:%s' % (key, coding)
+
+
+def cache_variants(response, key, timeout):
+    """Have the middleware cache `response` compressed, under `key` (see `cached_variant`)."""
+    response.compression_cache = (key, timeout)
+
+
+def cached_variant(request, key):
+    """`(coding, entry)` of a compressed response stored under `key`, for the request's best coding; or None."""
+    coding = negotiate(request)
+    if coding is None:
+        return None
+    entry = cache.get(variant_key(key, coding))
+    return (coding, entry) if entry is not None else None
+
+
+def weaken_etag(response):
+    etag = response.get('ETag')
+    if etag and etag.startswith('"'):
+        response['ETag'] = 'W/' + etag
+
+
+def variant_response(coding, entry):
+    response = HttpResponse(entry['content'], content_type=entry['content_type'])
+    response['Content-Encoding'] = coding
+    patch_vary_headers(response, ('Accept-Encoding',))
+    return response
+
+
+# Cached pages: gzip stitched around the CSRF token.
+
+def deflate_segments(parts, level=STORED_LEVELS['gzip']):
+    """
+    Each of `parts` compressed as raw deflate blocks. All but the last end on
+    a full flush, byte-aligned and without back-references, so other blocks
+    can go between them (see `stitch_gzip`).
+    """
+    segments = []
+    for i, part in enumerate(parts):
+        compressor = zlib.compressobj(level, zlib.DEFLATED, -15)
+        last = i == len(parts) - 1
+        segments.append(compressor.compress(part) + compressor.flush(zlib.Z_FINISH if last else zlib.Z_FULL_FLUSH))
+    return segments
+
+
+def stored_block(data):
+    """`data` as non-final, uncompressed deflate blocks."""
+    compressor = zlib.compressobj(0, zlib.DEFLATED, -15)
+    return compressor.compress(data) + compressor.flush(zlib.Z_FULL_FLUSH)
+
+
+def stitch_gzip(segments, parts, insert):
+    """
+    One gzip stream of the raw `parts` joined by `insert`, from
+    `deflate_segments` of those parts: only `insert` is compressed (stored)
+    now. The checksum runs over the raw bytes, which is far cheaper than
+    compressing them.
+    """
+    body = [GZIP_HEADER]
+    crc = 0
+    size = 0
+    for i, (segment, part) in enumerate(zip(segments, parts)):
+        if i:
+            body.append(stored_block(insert))
+            crc = zlib.crc32(insert, crc)
+            size += len(insert)
+        body.append(segment)
+        crc = zlib.crc32(part, crc)
+        size += len(part)
+    body.append(struct.pack('<II', crc, size & 0xffffffff))
+    return b''.join(body)
+
+
+class CompressionMiddleware:
+    """
+    Compresses text responses with the best coding the client accepts; see
+    the module docstring. Goes above any middleware that changes the body.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        return self.process_response(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        response = await self.get_response(request)
+        return self.process_response(request, response)
+
+    def process_response(self, request, response):
+        if response.has_header('Content-Encoding') or response.status_code in (204, 304):
+            return response
+        if not COMPRESSIBLE_TYPES.match(response.get('Content-Type', '')):
+            return response
+        patch_vary_headers(response, ('Accept-Encoding',))
+        coding = negotiate(request)
+        if coding is None:
+            return response
+
+        if response.streaming:
+            if response.is_async:
+                response.streaming_content = acompress_stream(response.streaming_content, coding, LEVELS[coding])
+            else:
+                response.streaming_content = compress_stream(response.streaming_content, coding, LEVELS[coding])
+            del response['Content-Length']
+        else:
+            if len(response.content) < min_size():
+                return response
+            stored = getattr(response, 'compression_cache', None)
+            if stored is not None:
+                key, timeout = stored
+                content = compress(response.content, coding, STORED_LEVELS[coding])
+                cache.set(variant_key(key, coding), {
+                    'content': content,
+                    'content_type': response['Content-Type'],
+                }, timeout)
+            else:
+                content = compress(response.content, coding, LEVELS[coding])
+            response.content = content
+            response['Content-Length'] = str(len(content))
+        response['Content-Encoding'] = coding
+        weaken_etag(response)
+        return response
@@ -0,0 +1,146 @@
+import hashlib
+from calendar import timegm
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_etags, quote_etag
+from rest_framework import exceptions, status
+
+
+def make_etag(*parts):
+    material = '|'.join('' if part is None else str(part) for part in parts)
+    return quote_etag(hashlib.md5(material.encode('utf-8')).hexdigest())
+
+
+def timestamp(value):
+    return timegm(value.utctimetuple()) if value is not None else None
+
+
+def set_validators(response, etag, last_modified):
+    if etag:
+        response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified)
+
+
+def conditional_response(request, etag, last_modified):
+    """
+    A 304 or 412 for `request` given the current validators, or None when the
+    request should be served normally.
+    """
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is not None:
+        set_validators(response, etag, last_modified)
+    return response
+
+
+class ConditionalGetMixin:
+    """
+    ETag / Last-Modified support for a DRF view.
+
+    Views implement `get_validators()`, returning `(etag, last_modified)` from a
+    query that reads version columns only, so a 304 costs one small query and
+    no serialization. If `get_validators()` returns None the request is served
+    normally (e.g. so a missing object still produces a 404).
+    """
+
+    def get_validators(self):
+        raise NotImplementedError
+
+    def get_validators_once(self):
+        if not hasattr(self, '_validators'):
+            self._validators = self.get_validators()
+        return self._validators
+
+    def get(self, request, *args, **kwargs):
+        validators = self.get_validators_once()
+        if validators is not None:
+            response = conditional_response(request, *validators)
+            if response is not None:
+                return response
+
+        response = super().get(request, *args, **kwargs)
+        if validators is not None and response.status_code == status.HTTP_200_OK:
+            set_validators(response, *validators)
+        return response
+
+
+class PreconditionFailed(exceptions.APIException):
+    status_code = status.HTTP_412_PRECONDITION_FAILED
+    default_detail = "The resource has changed since it was read; fetch it again."
+    default_code = 'precondition_failed'
+
+
+class PreconditionRequired(exceptions.APIException):
+    status_code = status.HTTP_428_PRECONDITION_REQUIRED
+    default_detail = "This request must be conditional; send an If-Match header."
+    default_code = 'precondition_required'
+
+
+class IfMatchMixin(ConditionalGetMixin):
+    """
+    Optimistic concurrency for update views: `If-Match` is checked against the
+    current ETag, failing with 412 on a mismatch. With `BLOG_REQUIRE_IF_MATCH`
+    enabled, writes without `If-Match` get a 428.
+
+    The check runs after `get_object()`'s permission checks, and the write only
+    goes through if the version it matched is still current: the
+    `version_fields` it was read from are compared in an UPDATE in the same
+    transaction as the save. Of two writers sending the same ETag, the second
+    gets a 412. Views build `get_validators()` from `get_version()`.
+
+    The weak form of the ETag matches too: compression weakens the ETag a
+    client reads (see `blogs.compression`), but it still names this version.
+    """
+    version_fields = ()
+
+    def get_version(self):
+        if not hasattr(self, '_version'):
+            lookup = self.lookup_url_kwarg or self.lookup_field
+            self._version = (
+                self.get_queryset().model._default_manager.filter(pk=self.kwargs[lookup])
+                .values_list(*self.version_fields).first()
+            )
+        return self._version
+
+    def get_object(self):
+        obj = super().get_object()
+        if self.request.method in ('PUT', 'PATCH'):
+            self.check_preconditions(self.request)
+        return obj
+
+    def check_preconditions(self, request):
+        self.matched_version = None
+        if 'HTTP_IF_MATCH' not in request.META:
+            if getattr(settings, 'BLOG_REQUIRE_IF_MATCH', False):
+                raise PreconditionRequired()
+            return
+        version = self.get_version()
+        validators = self.get_validators_once()
+        if validators is None:
+            return
+        tags = [tag[2:] if tag.startswith('W/') else tag for tag in parse_etags(request.META['HTTP_IF_MATCH'])]
+        if tags == ['*']:
+            return
+        if validators[0] not in tags:
+            raise PreconditionFailed()
+        self.matched_version = version
+
+    def perform_update(self, serializer):
+        version = getattr(self, 'matched_version', None)
+        if version is None:
+            return super().perform_update(serializer)
+        with transaction.atomic():
+            # A no-op write, matched on the version: it also locks the row
+            # until the save commits.
+            field = self.version_fields[0]
+            unchanged = (
+                type(serializer.instance)._default_manager
+                .filter(pk=serializer.instance.pk, **dict(zip(self.version_fields, version)))
+                .update(**{field: F(field)})
+            )
+            if not unchanged:
+                raise PreconditionFailed()
+            super().perform_update(serializer)
@@ -0,0 +1,51 @@
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+
+from .models import Comment, Post
+
+
+def comment_added(comment):
+    """Count a new comment on its post with a single atomic UPDATE."""
+    Post.objects.filter(pk=comment.post_id).update(
+        comment_count=F('comment_count') + 1,
+        # Coalesce first: SQLite's MAX() returns NULL if any argument is NULL.
+        last_commented_at=Greatest(Coalesce('last_commented_at', Value(comment.created)), Value(comment.created)),
+    )
+
+
+def comment_removed(comment):
+    """
+    Uncount a deleted comment. The latest comment time is re-read from the
+    (post, created, id) index in case the newest comment was the one removed.
+    """
+    Post.objects.filter(pk=comment.post_id).update(
+        # Clamped: a counter that has drifted to 0 must not fail the delete.
+        comment_count=Greatest(F('comment_count') - 1, Value(0)),
+        last_commented_at=latest_comment(),
+        updated_at=timezone.now(),
+    )
+
+
+def latest_comment():
+    return Subquery(
+        Comment.objects.filter(post=OuterRef('pk')).order_by('-created').values('created')[:1]
+    )
+
+
+def comment_total():
+    return Coalesce(Subquery(
+        Comment.objects.filter(post=OuterRef('pk')).order_by()
+        .values('post').annotate(n=Count('id')).values('n')
+    ), 0)
+
+
+def refresh_comment_stats(post_ids):
+    """
+    Recompute `comment_count` and `last_commented_at` from the comments table
+    for the given posts, in one UPDATE. Used by bulk writers and `reconcile_comment_counts`.
+    """
+    return Post.objects.filter(pk__in=post_ids).update(
+        comment_count=comment_total(),
+        last_commented_at=latest_comment(),
+    )
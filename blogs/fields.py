@@ -0,0 +1,179 @@
+"""
+Compressed text storage.
+
+`CompressedTextField` is a `TextField` stored as a binary column: one header
+byte naming the codec, then the text. Texts of `BLOG_TEXT_COMPRESS_MIN_SIZE`
+bytes or more are compressed with `BLOG_TEXT_COMPRESSION` ('zlib', 'zstd' when
+the `zstandard` package is installed, or 'none'); shorter ones, and ones that
+would not shrink, are stored as UTF-8. Every row names its own codec, so the
+settings can change without rewriting existing rows.
+
+Model instances decompress lazily: the column is loaded as a `CompressedText`,
+which becomes a `str` the first time the attribute is read, and an instance
+saved without reading it writes the stored bytes back as they are.
+`values()` and `values_list()` return `CompressedText` for compressed rows;
+`str()` them. Exact lookups work, since the same text always encodes to the
+same bytes under the same settings; substring lookups do not.
+"""
+import zlib
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import models
+from django.db.models.query_utils import DeferredAttribute
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+RAW = 0
+ZLIB = 1
+ZSTD = 2
+CODECS = {'none': RAW, 'zlib': ZLIB, 'zstd': ZSTD}
+
+ZLIB_LEVEL = 6
+ZSTD_LEVEL = 6
+
+
+def text_codec():
+    name = getattr(settings, 'BLOG_TEXT_COMPRESSION', 'zlib')
+    if name not in CODECS:
+        raise ImproperlyConfigured("BLOG_TEXT_COMPRESSION must be one of: %s." % ', '.join(CODECS))
+    if name == 'zstd' and zstandard is None:
+        raise ImproperlyConfigured("BLOG_TEXT_COMPRESSION = 'zstd' needs the zstandard package.")
+    return CODECS[name]
+
+
+def min_size():
+    return getattr(settings, 'BLOG_TEXT_COMPRESS_MIN_SIZE', 256)
+
+
+def compress_text(text, codec=None):
+    """`text` as a stored value: the codec byte, then the (compressed) UTF-8."""
+    data = text.encode('utf-8')
+    if codec is None:
+        codec = text_codec() if len(data) >= min_size() else RAW
+    if codec == ZLIB:
+        compressed = zlib.compress(data, ZLIB_LEVEL)
+    elif codec == ZSTD:
+        compressed = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+    else:
+        return bytes([RAW]) + data
+    if len(compressed) >= len(data):
+        return bytes([RAW]) + data
+    return bytes([codec]) + compressed
+
+
+def decompress_text(payload):
+    payload = bytes(payload)
+    codec, data = payload[0], payload[1:]
+    if codec == ZLIB:
+        data = zlib.decompress(data)
+    elif codec == ZSTD:
+        if zstandard is None:
+            raise ImproperlyConfigured("Reading zstd-compressed text needs the zstandard package.")
+        data = zstandard.ZstdDecompressor().decompress(data)
+    elif codec != RAW:
+        raise ValueError("Unknown compressed text codec %d." % codec)
+    return data.decode('utf-8')
+
+
+class CompressedText:
+    """A compressed value as loaded from the database; `str()` decompresses it."""
+    __slots__ = ('payload', 'text')
+
+    def __init__(self, payload):
+        self.payload = payload
+        self.text = None
+
+    def __str__(self):
+        if self.text is None:
+            self.text = decompress_text(self.payload)
+        return self.text
+
+    def __eq__(self, other):
+        if isinstance(other, (str, CompressedText)):
+            return str(self) == str(other)
+        return NotImplemented
+
+    def __hash__(self):
+        return hash(str(self))
+
+    def __repr__(self):
+        return '<CompressedText: %d bytes>' % len(self.payload)
+
+
+class CompressedTextDescriptor(DeferredAttribute):
+    # A data descriptor, so that reads come here even once the value is in
+    # the instance's __dict__.
+    def __set__(self, instance, value):
+        instance.__dict__[self.field.attname] = value
+
+    def __get__(self, instance, cls=None):
+        value = super().__get__(instance, cls)
+        if isinstance(value, CompressedText):
+            value = instance.__dict__[self.field.attname] = str(value)
+        return value
+
+
+class CompressedTextField(models.TextField):
+    descriptor_class = CompressedTextDescriptor
+
+    def get_internal_type(self):
+        # BLOB on SQLite, bytea on PostgreSQL.
+        return 'BinaryField'
+
+    def from_db_value(self, value, expression, connection):
+        if value is None or isinstance(value, str):
+            return value
+        value = bytes(value)
+        if value[:1] == bytes([RAW]):
+            return value[1:].decode('utf-8')
+        return CompressedText(value)
+
+    def to_python(self, value):
+        if isinstance(value, CompressedText):
+            return str(value)
+        return super().to_python(value)
+
+    def pre_save(self, model_instance, add):
+        # Not read since it was loaded: write the stored bytes back unchanged.
+        value = model_instance.__dict__.get(self.attname)
+        if isinstance(value, CompressedText):
+            return value
+        return super().pre_save(model_instance, add)
+
+    def get_db_prep_value(self, value, connection, prepared=False):
+        if isinstance(value, CompressedText):
+            return connection.Database.Binary(value.payload)
+        value = super().get_db_prep_value(value, connection, prepared)
+        if value is None:
+            return None
+        return connection.Database.Binary(compress_text(value))
+
+
+def compress_table_column(connection, table, column='content', chunk_size=500, codec=None):
+    """
+    Re-encode every value of `table.column` with `compress_text` (`codec`:
+    by the settings), in keyset chunks on id. Reads plain text as well as
+    any stored encoding.
+    """
+    qn = connection.ops.quote_name
+    select = 'SELECT id, %s FROM %s WHERE id > %%s ORDER BY id LIMIT %%s' % (qn(column), qn(table))
+    update = 'UPDATE %s SET %s = %%s WHERE id = %%s' % (qn(table), qn(column))
+    last = 0
+    while True:
+        with connection.cursor() as cursor:
+            cursor.execute(select, [last, chunk_size])
+            rows = cursor.fetchall()
+            if not rows:
+                return
+            changes = []
+            for pk, value in rows:
+                text = value if isinstance(value, str) or value is None else decompress_text(value)
+                if text is not None:
+                    changes.append((connection.Database.Binary(compress_text(text, codec)), pk))
+            cursor.executemany(update, changes)
+        last = rows[-1][0]
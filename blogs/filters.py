@@ -0,0 +1,45 @@
+import datetime
+
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from rest_framework.exceptions import ValidationError
+
+
+def parse_day(value, param):
+    try:
+        date = parse_date(value)
+    except ValueError:
+        date = None
+    if date is None:
+        raise ValidationError({param: "Enter a valid date in YYYY-MM-DD format."})
+    return date
+
+
+def day_start(date):
+    """Aware datetime at midnight of `date` in the current time zone."""
+    return timezone.make_aware(datetime.datetime.combine(date, datetime.time.min))
+
+
+def filter_posts(qs, params):
+    """
+    Apply the post list filters (title, author_name, start_date, end_date).
+
+    Date ranges are half-open datetime bounds on the raw column
+    (`start <= published_date < end + 1 day`) rather than `published_date__date`
+    lookups, so the (active, published_date, id) index can be used.
+    """
+    title = params.get('title')
+    author_name = params.get('author_name')
+    start_date = params.get('start_date')
+    end_date = params.get('end_date')
+
+    if title:
+        qs = qs.filter(title__icontains=title)
+    if author_name:
+        qs = qs.filter(author__name__icontains=author_name)
+    if start_date:
+        qs = qs.filter(published_date__gte=day_start(parse_day(start_date, 'start_date')))
+    if end_date:
+        end = parse_day(end_date, 'end_date') + datetime.timedelta(days=1)
+        qs = qs.filter(published_date__lt=day_start(end))
+    return qs
@@ -0,0 +1,39 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from blogs.authentication import create_token, revoke_token
+from blogs.models import ApiToken
+
+
+class Command(BaseCommand):
+    help = "Create, list and revoke API tokens (sent as `Authorization: Token <key>`)."
+
+    def add_arguments(self, parser):
+        actions = parser.add_subparsers(dest='action', required=True)
+        create = actions.add_parser('create', help="Create a token; the key is printed once.")
+        create.add_argument('username')
+        create.add_argument('--name', default='')
+        actions.add_parser('list', help="List tokens.")
+        revoke = actions.add_parser('revoke', help="Revoke tokens by key prefix.")
+        revoke.add_argument('prefix')
+
+    def handle(self, *args, **options):
+        action = options['action']
+        if action == 'create':
+            try:
+                user = get_user_model().objects.get(username=options['username'])
+            except get_user_model().DoesNotExist:
+                raise CommandError("No user named %s." % options['username'])
+            token, key = create_token(user, options['name'])
+            self.stdout.write(key)
+        elif action == 'list':
+            for token in ApiToken.objects.select_related('user').order_by('created'):
+                state = 'revoked %s' % token.revoked_at.isoformat() if token.revoked_at else 'active'
+                self.stdout.write('%s...  %-20s %-20s %s' % (token.prefix, token.user, token.name, state))
+        else:
+            matches = list(ApiToken.objects.filter(prefix=options['prefix'], revoked_at__isnull=True))
+            if not matches:
+                raise CommandError("No active token starts with %s." % options['prefix'])
+            for token in matches:
+                revoke_token(token)
+            self.stdout.write(self.style.SUCCESS("Revoked %d token(s)." % len(matches)))
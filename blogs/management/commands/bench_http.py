@@ -0,0 +1,92 @@
+import asyncio
+import json
+import time
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+
+from blogs.benchmark import percentile
+
+
+async def fetch(host, port, target):
+    """One GET on a fresh connection; returns the status code."""
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        writer.write((
+            'GET %s HTTP/1.1\r\nHost: %s:%d\r\nConnection: close\r\n'
+            'Accept: application/json\r\n\r\n' % (target, host, port)
+        ).encode('ascii'))
+        await writer.drain()
+        status_line = await reader.readline()
+        await reader.read()
+        return int(status_line.split()[1])
+    finally:
+        writer.close()
+
+
+async def client(host, port, target, deadline, latencies, errors):
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        try:
+            status = await fetch(host, port, target)
+        except (OSError, ValueError, IndexError):
+            status = None
+        if status == 200:
+            latencies.append(time.perf_counter() - start)
+        else:
+            errors.append(status)
+
+
+class Command(BaseCommand):
+    help = (
+        "HTTP load generator for comparing the sync (WSGI) and async (ASGI) read "
+        "paths: runs N concurrent clients against a URL and reports throughput "
+        "and latency percentiles."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('url', help="e.g. http://127.0.0.1:8000/api/async/posts/?page_size=20")
+        parser.add_argument('--concurrency', default='1,10,50,100', help="Comma separated client counts.")
+        parser.add_argument('--seconds', type=float, default=10.0)
+        parser.add_argument('--json', action='store_true', help="Print results as JSON.")
+
+    def handle(self, *args, **options):
+        url = urlsplit(options['url'])
+        if url.scheme != 'http' or not url.hostname:
+            raise CommandError("Expected an http:// URL.")
+        target = url.path or '/'
+        if url.query:
+            target += '?' + url.query
+
+        results = []
+        for concurrency in [int(n) for n in options['concurrency'].split(',')]:
+            results.append(asyncio.run(self.run(
+                url.hostname, url.port or 80, target, concurrency,
+                options['seconds'],
+            )))
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        self.stdout.write("%12s %10s %10s %10s %10s %8s" % (
+            'concurrency', 'req/s', 'p50 ms', 'p99 ms', 'max ms', 'errors'))
+        for row in results:
+            self.stdout.write("%12d %10.1f %10.1f %10.1f %10.1f %8d" % (
+                row['concurrency'], row['requests_per_s'], row['p50_ms'],
+                row['p99_ms'], row['max_ms'], row['errors']))
+
+    async def run(self, host, port, target, concurrency, seconds):
+        latencies, errors = [], []
+        deadline = time.perf_counter() + seconds
+        await asyncio.gather(*[
+            client(host, port, target, deadline, latencies, errors)
+            for _ in range(concurrency)
+        ])
+        return {
+            'concurrency': concurrency,
+            'requests_per_s': len(latencies) / seconds,
+            'p50_ms': percentile(latencies, 0.50) * 1000,
+            'p99_ms': percentile(latencies, 0.99) * 1000,
+            'max_ms': max(latencies, default=0.0) * 1000,
+            'errors': len(errors),
+        }
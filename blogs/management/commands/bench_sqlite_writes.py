@@ -0,0 +1,130 @@
+import json
+import multiprocessing
+import os
+import sqlite3
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand
+
+from blogging_system.sqlite_backend.base import DEFAULT_PRAGMAS
+
+
+SCHEMA = """
+    CREATE TABLE post (id INTEGER PRIMARY KEY, title TEXT, active BOOL);
+    CREATE TABLE comment (id INTEGER PRIMARY KEY, post_id INTEGER, content TEXT, created TEXT);
+    CREATE INDEX comment_post ON comment (post_id, created);
+"""
+
+# Django's stock SQLite setup: rollback journal, synchronous=FULL, the
+# sqlite3 module's 5 s busy timeout and deferred BEGIN.
+MODES = {
+    'default': {'pragmas': {}, 'begin': 'BEGIN'},
+    'tuned': {'pragmas': DEFAULT_PRAGMAS, 'begin': 'BEGIN IMMEDIATE'},
+}
+
+
+def connect(path, mode):
+    conn = sqlite3.connect(path, timeout=5.0, isolation_level=None)
+    for name, value in MODES[mode]['pragmas'].items():
+        conn.execute('PRAGMA %s = %s' % (name, value))
+    return conn
+
+
+def writer(path, mode, seconds, start):
+    """Mimic CommentCreateAPIView: look the post up, insert, commit."""
+    conn = connect(path, mode)
+    commits = errors = 0
+    while time.time() < start:
+        time.sleep(0.001)
+    deadline = start + seconds
+    while time.time() < deadline:
+        try:
+            conn.execute(MODES[mode]['begin'])
+            conn.execute('SELECT active FROM post WHERE id = 1').fetchone()
+            conn.execute(
+                'INSERT INTO comment (post_id, content, created) VALUES (1, ?, ?)',
+                ('x' * 200, time.time()),
+            )
+            conn.execute('COMMIT')
+            commits += 1
+        except sqlite3.OperationalError:
+            errors += 1
+            if conn.in_transaction:
+                conn.execute('ROLLBACK')
+    return commits, errors
+
+
+def reader(path, mode, seconds, start):
+    conn = connect(path, mode)
+    reads = 0
+    while time.time() < start:
+        time.sleep(0.001)
+    deadline = start + seconds
+    while time.time() < deadline:
+        try:
+            conn.execute('SELECT COUNT(*) FROM comment WHERE post_id = 1').fetchone()
+            reads += 1
+        except sqlite3.OperationalError:
+            pass
+    return reads, 0
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure SQLite comment-write throughput with N parallel writer processes, "
+        "comparing Django's stock SQLite settings with the tuned backend."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--writers', default='1,2,4,8', help="Comma separated writer counts.")
+        parser.add_argument('--readers', type=int, default=2)
+        parser.add_argument('--seconds', type=float, default=3.0)
+        parser.add_argument('--modes', default='default,tuned')
+        parser.add_argument('--json', action='store_true', help="Print results as JSON.")
+
+    def handle(self, *args, **options):
+        results = []
+        for mode in options['modes'].split(','):
+            for count in [int(n) for n in options['writers'].split(',')]:
+                results.append(self.run(mode, count, options['readers'], options['seconds']))
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        self.stdout.write("%-8s %8s %8s %12s %10s %12s" % (
+            'mode', 'writers', 'readers', 'commits/s', 'errors', 'reads/s'))
+        for row in results:
+            self.stdout.write("%-8s %8d %8d %12.0f %10d %12.0f" % (
+                row['mode'], row['writers'], row['readers'], row['commits_per_s'],
+                row['errors'], row['reads_per_s']))
+
+    def run(self, mode, writers, readers, seconds):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'bench.sqlite3')
+            conn = connect(path, mode)
+            conn.executescript(SCHEMA)
+            conn.execute("INSERT INTO post (id, title, active) VALUES (1, 'Trending', 1)")
+            conn.close()
+
+            start = time.time() + 0.5
+            jobs = [(writer, path, mode, seconds, start)] * writers
+            jobs += [(reader, path, mode, seconds, start)] * readers
+            with multiprocessing.Pool(len(jobs)) as pool:
+                outcomes = pool.starmap(run_job, jobs)
+
+        commits = sum(done for done, _ in outcomes[:writers])
+        errors = sum(failed for _, failed in outcomes[:writers])
+        reads = sum(done for done, _ in outcomes[writers:])
+        return {
+            'mode': mode,
+            'writers': writers,
+            'readers': readers,
+            'commits_per_s': commits / seconds,
+            'errors': errors,
+            'reads_per_s': reads / seconds,
+        }
+
+
+def run_job(func, *args):
+    return func(*args)
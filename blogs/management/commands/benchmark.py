@@ -0,0 +1,104 @@
+import json
+import platform
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from blogs.benchmark import HttpTransport, InProcessTransport, Workload, compare, run, scenarios
+from blogs.models import Author
+
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the blog endpoints: list (every filter combination), detail, comment "
+        "create, post create/edit/delete and the HTML pages. Runs in-process through the "
+        "test client, or against a running server with --url. Reads and writes into the "
+        "configured database, so run it on generated data."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', help="Base URL of a running server; in-process when omitted.")
+        parser.add_argument('--concurrency', type=int, default=1, help="Client threads (--url only).")
+        parser.add_argument('--requests', type=int, default=200, help="Requests per scenario.")
+        parser.add_argument('--scenarios', help="Comma separated subset; see --list.")
+        parser.add_argument('--list', action='store_true', help="List the scenarios and exit.")
+        parser.add_argument('--username', default='bench')
+        parser.add_argument('--password', default='bench-password')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', help="Write the results as JSON to this file.")
+        parser.add_argument('--compare', help="Baseline JSON from an earlier run.")
+        parser.add_argument('--threshold', type=float, default=0.15,
+                            help="Slowdown (fraction) that counts as a regression.")
+
+    def handle(self, *args, **options):
+        available = scenarios()
+        if options['list']:
+            for name in available:
+                self.stdout.write(name)
+            return
+        names = options['scenarios'].split(',') if options['scenarios'] else list(available)
+        unknown = set(names) - set(available)
+        if unknown:
+            raise CommandError("Unknown scenarios: %s" % ', '.join(sorted(unknown)))
+
+        user = self.bench_user(options['username'], options['password'])
+        try:
+            workload = Workload(seed=options['seed'])
+            if options['url']:
+                transport = HttpTransport(options['url'], options['username'], options['password'],
+                                          options['concurrency'])
+            else:
+                transport = InProcessTransport(user)
+            results = run(transport, workload, names, options['requests'])
+        except ValueError as exc:
+            raise CommandError(str(exc))
+
+        report = {
+            'meta': {
+                'date': timezone.now().isoformat(),
+                'target': options['url'] or 'in-process',
+                'concurrency': transport.concurrency,
+                'requests': options['requests'],
+                'python': platform.python_version(),
+            },
+            'scenarios': results,
+        }
+        self.print_table(results)
+        failed = [name for name, row in results.items() if row['errors'] and not row['requests']]
+        if failed:
+            raise CommandError("Every request failed in: %s." % ', '.join(failed))
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(report, f, indent=2)
+
+        if options['compare']:
+            with open(options['compare']) as f:
+                baseline = json.load(f)['scenarios']
+            regressions = compare(baseline, results, options['threshold'])
+            for name, metric, old, new in regressions:
+                self.stderr.write("REGRESSION %s %s: %.1f -> %.1f" % (name, metric, old, new))
+            if regressions:
+                raise CommandError("%d regression(s) over %d%%." % (len(regressions), options['threshold'] * 100))
+            self.stdout.write(self.style.SUCCESS("No regressions against %s." % options['compare']))
+
+    def bench_user(self, username, password):
+        user, created = User.objects.get_or_create(username=username)
+        if created:
+            user.set_password(password)
+            user.save()
+        Author.objects.get_or_create(user=user, defaults={
+            'name': 'Benchmark', 'email': '%s@bench.example.com' % username,
+        })
+        return user
+
+    def print_table(self, results):
+        self.stdout.write("%-48s %8s %8s %9s %9s %9s %7s" % (
+            'scenario', 'req/s', 'p50 ms', 'p90 ms', 'p99 ms', 'max ms', 'errors'))
+        for name, row in results.items():
+            self.stdout.write("%-48s %8.1f %8.1f %9.1f %9.1f %9.1f %7d" % (
+                name, row['requests_per_s'], row['p50_ms'], row['p90_ms'],
+                row['p99_ms'], row['max_ms'], row['errors']))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from blogs.template_cache import write_bundle
+
+
+class Command(BaseCommand):
+    help = (
+        "Write the sources of all project templates to one JSON file. Point "
+        "BLOG_TEMPLATE_BUNDLE at it to load templates from the bundle in production."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', nargs='?', default='templates.bundle.json')
+
+    def handle(self, *args, **options):
+        templates = write_bundle(options['path'])
+        self.stdout.write(self.style.SUCCESS(
+            "Bundled %d templates into %s." % (len(templates), options['path'])
+        ))
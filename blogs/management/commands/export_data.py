@@ -0,0 +1,42 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.exceptions import ValidationError
+
+from blogs.export import CONTENT_TYPES, DEFAULT_CHUNK_SIZE, export_stream
+
+
+class Command(BaseCommand):
+    help = "Export active posts or their comments as NDJSON or CSV, streamed in keyset chunks."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', nargs='?', default='-', help="Output file ('-' for stdout).")
+        parser.add_argument('--kind', choices=['posts', 'comments'], default='posts')
+        parser.add_argument('--output', choices=sorted(CONTENT_TYPES), default='ndjson')
+        parser.add_argument('--gzip', action='store_true')
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+        parser.add_argument('--title')
+        parser.add_argument('--author-name')
+        parser.add_argument('--start-date')
+        parser.add_argument('--end-date')
+
+    def handle(self, *args, **options):
+        params = {
+            name: options[name]
+            for name in ('title', 'author_name', 'start_date', 'end_date')
+            if options[name]
+        }
+        try:
+            chunks = export_stream(options['kind'], options['output'], params,
+                                   gzip=options['gzip'], chunk_size=options['chunk_size'])
+        except ValidationError as exc:
+            raise CommandError(exc.detail)
+
+        path = options['path']
+        out = sys.stdout.buffer if path == '-' else open(path, 'wb')
+        try:
+            for chunk in chunks:
+                out.write(chunk)
+        finally:
+            if path != '-':
+                out.close()
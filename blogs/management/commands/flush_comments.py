@@ -0,0 +1,28 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from blogs.bulk import DEFAULT_CHUNK_SIZE
+from blogs.comment_queue import flush
+
+
+class Command(BaseCommand):
+    help = (
+        "Store the comments spooled by the write-behind comment queue. Runs once, "
+        "or every --interval seconds as the queue's consumer process."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=None, help="Keep flushing, this many seconds apart.")
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        while True:
+            created = flush(options['batch_size'])
+            if created or options['interval'] is None:
+                self.stdout.write("Stored %d queued comments." % created)
+            if options['interval'] is None:
+                return
+            close_old_connections()
+            time.sleep(options['interval'])
@@ -0,0 +1,127 @@
+import bisect
+import datetime
+import itertools
+import random
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from blogs.bulk import DEFAULT_CHUNK_SIZE, chunked
+from blogs.counters import refresh_comment_stats
+from blogs.models import Author, Comment, Post, make_excerpt
+from blogs import cache, search
+
+
+User = get_user_model()
+
+WORDS = (
+    "django python database query index cache latency throughput async worker "
+    "server request response template serializer migration model view router "
+    "replica cursor keyset pagination search ranking comment author post blog "
+    "release deploy monitor profile benchmark memory thread process signal "
+    "storage compression static token session middleware metric budget"
+).split()
+
+
+def sentence(rng, words):
+    return ' '.join(rng.choice(WORDS) for _ in range(words)).capitalize() + '.'
+
+
+def paragraph(rng, sentences):
+    return ' '.join(sentence(rng, rng.randint(6, 16)) for _ in range(sentences))
+
+
+def zipf_weights(n, s):
+    """Cumulative Zipf weights: the post of rank k gets 1 / k**s of the comments."""
+    return list(itertools.accumulate(1.0 / (rank ** s) for rank in range(1, n + 1)))
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate synthetic authors, users, posts and comments with bulk inserts. "
+        "Comments follow a Zipf distribution over posts: a few posts get most of them."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--authors', type=int, default=50)
+        parser.add_argument('--users', type=int, default=500, help="Commenting users.")
+        parser.add_argument('--posts', type=int, default=5000)
+        parser.add_argument('--comments', type=int, default=50000)
+        parser.add_argument('--zipf', type=float, default=1.1, help="Zipf exponent of comments per post.")
+        parser.add_argument('--anonymous', type=float, default=0.2, help="Share of anonymous comments.")
+        parser.add_argument('--inactive', type=float, default=0.05, help="Share of inactive posts.")
+        parser.add_argument('--days', type=int, default=365, help="Spread publish dates over this many days.")
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        size = options['chunk_size']
+        now = timezone.now()
+        # Prefix every generated name so repeated runs never collide.
+        run = '%x' % int(now.timestamp())
+        # One hash for everyone: hashing per user would dominate the run time.
+        password = make_password('password')
+
+        users = User.objects.bulk_create([
+            User(username='gen-%s-user%d' % (run, i), password=password, first_name=sentence(rng, 1)[:-1])
+            for i in range(options['authors'] + options['users'])
+        ], batch_size=size)
+        authors = Author.objects.bulk_create([
+            Author(name='%s %s' % (rng.choice(WORDS).title(), rng.choice(WORDS).title()),
+                   email='gen-%s-author%d@example.com' % (run, i), user=user)
+            for i, user in enumerate(users[:options['authors']])
+        ], batch_size=size)
+        commenters = users[options['authors']:]
+        self.stdout.write("Created %d authors and %d users." % (len(authors), len(commenters)))
+
+        post_ids = []
+        span = options['days'] * 86400
+        for start, rows in chunked(range(options['posts']), size):
+            posts = [
+                Post(
+                    title='%s %s-%d' % (sentence(rng, rng.randint(3, 8))[:-1], run, i),
+                    content=paragraph(rng, rng.randint(3, 12)),
+                    published_date=now - datetime.timedelta(seconds=rng.randint(0, span)),
+                    author=rng.choice(authors),
+                    status='published',
+                    active=rng.random() >= options['inactive'],
+                )
+                for i in rows
+            ]
+            for post in posts:
+                post.excerpt = make_excerpt(post.content)
+            with transaction.atomic():
+                posts = Post.objects.bulk_create(posts)
+            post_ids.extend(post.pk for post in posts)
+        self.stdout.write("Created %d posts." % len(post_ids))
+
+        # Popularity is independent of age, so shuffle which post gets which rank.
+        ranked = post_ids[:]
+        rng.shuffle(ranked)
+        weights = zipf_weights(len(ranked), options['zipf'])
+        total = weights[-1] if weights else 0
+        created = 0
+        for start, rows in chunked(range(options['comments'] if ranked else 0), size):
+            with transaction.atomic():
+                Comment.objects.bulk_create([
+                    Comment(
+                        post_id=ranked[bisect.bisect_left(weights, rng.random() * total)],
+                        content=sentence(rng, rng.randint(4, 30)),
+                        user=None if rng.random() < options['anonymous'] else rng.choice(commenters),
+                        created=now - datetime.timedelta(seconds=rng.randint(0, span)),
+                    )
+                    for _ in rows
+                ])
+            created += len(rows)
+        self.stdout.write("Created %d comments." % created)
+
+        # bulk_create sends no signals: counters, search index and caches by hand.
+        for start, ids in chunked(post_ids, size):
+            refresh_comment_stats(ids)
+            search.index_posts(ids)
+        cache.invalidate_posts()
+        self.stdout.write(self.style.SUCCESS("Done."))
@@ -0,0 +1,69 @@
+import json
+import sys
+from itertools import islice
+
+from django.core.management.base import BaseCommand, CommandError
+
+from blogs.bulk import DEFAULT_CHUNK_SIZE, ingest_comments, ingest_posts
+from blogs.models import Author
+
+
+class Command(BaseCommand):
+    help = (
+        "Bulk import posts or comments from a JSONL file, one JSON object per line. "
+        "Posts take title/content/published_date; comments take post/content/user/created."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="JSONL file to import ('-' for stdin).")
+        parser.add_argument('--kind', choices=['posts', 'comments'], default='posts')
+        parser.add_argument('--author', help="Email of the author that imported posts belong to.")
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        if options['kind'] == 'posts':
+            if not options['author']:
+                raise CommandError("--author is required when importing posts.")
+            try:
+                author = Author.objects.get(email=options['author'])
+            except Author.DoesNotExist:
+                raise CommandError("No author with email %s." % options['author'])
+            ingest = lambda items: ingest_posts(items, author.pk, options['chunk_size'])
+        else:
+            ingest = lambda items: ingest_comments(items, options['chunk_size'])
+
+        created = failed = 0
+        line_offset = 0
+        with self.open(options['path']) as lines:
+            # Read one chunk at a time so memory stays flat for any file size.
+            while True:
+                batch = list(islice(lines, options['chunk_size']))
+                if not batch:
+                    break
+                items = []
+                numbers = []
+                for number, line in enumerate(batch, start=line_offset + 1):
+                    if not line.strip():
+                        continue
+                    try:
+                        items.append(json.loads(line))
+                    except ValueError as exc:
+                        raise CommandError("Line %d is not valid JSON: %s" % (number, exc))
+                    numbers.append(number)
+                line_offset += len(batch)
+                if not items:
+                    continue
+
+                summary = ingest(items)
+                created += summary['created']
+                failed += summary['failed']
+                for result in summary['results']:
+                    if result['status'] == 'error':
+                        self.stderr.write("line %d: %s" % (numbers[result['index']], result['errors']))
+
+        self.stdout.write(self.style.SUCCESS("Created %d %s, %d failed." % (created, options['kind'], failed)))
+
+    def open(self, path):
+        if path == '-':
+            return open(sys.stdin.fileno(), encoding='utf-8', closefd=False)
+        return open(path, encoding='utf-8')
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from blogs import search
+
+
+class Command(BaseCommand):
+    help = "Rebuild the post search index (FTS5 table on SQLite, inverted index elsewhere)."
+
+    def handle(self, *args, **options):
+        search.rebuild_index()
+        backend = "FTS5" if search.uses_fts() else "inverted index"
+        self.stdout.write(self.style.SUCCESS("Rebuilt %s post search index." % backend))
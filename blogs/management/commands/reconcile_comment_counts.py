@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+
+from blogs.cache import invalidate_posts
+from blogs.counters import refresh_comment_stats
+from blogs.models import Post
+
+
+class Command(BaseCommand):
+    help = "Recompute Post.comment_count and Post.last_commented_at from the comments table."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        drifted = processed = 0
+        last = 0
+        while True:
+            ids = list(
+                Post.objects.filter(pk__gt=last).order_by('pk').values_list('pk', flat=True)[:chunk_size]
+            )
+            if not ids:
+                break
+            before = dict(self.stats(ids))
+            refresh_comment_stats(ids)
+            drifted += sum(1 for pk, stats in self.stats(ids) if before[pk] != stats)
+            processed += len(ids)
+            last = ids[-1]
+
+        if drifted:
+            invalidate_posts()
+        self.stdout.write(self.style.SUCCESS(
+            "Checked %d posts, repaired %d with drifted comment statistics." % (processed, drifted)
+        ))
+
+    def stats(self, ids):
+        rows = Post.objects.filter(pk__in=ids).values_list('pk', 'comment_count', 'last_commented_at')
+        return [(pk, (count, last)) for pk, count, last in rows]
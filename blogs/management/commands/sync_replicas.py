@@ -0,0 +1,31 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections, connections
+
+from blogs.replicas import PRIMARY, copy_sqlite_database, replicas
+
+
+class Command(BaseCommand):
+    help = (
+        "Copy the primary SQLite database over its replica files, once or every --interval "
+        "seconds: a local stand-in for replication. The interval is the replicas' lag."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=None, help="Keep copying, this many seconds apart.")
+
+    def handle(self, *args, **options):
+        aliases = replicas()
+        if not aliases:
+            raise CommandError("No replicas configured; set DJANGO_DB_REPLICAS.")
+        if connections[PRIMARY].vendor != 'sqlite':
+            raise CommandError("Only SQLite replicas are copied; other databases replicate themselves.")
+        while True:
+            for alias in aliases:
+                copy_sqlite_database(PRIMARY, alias)
+            if options['interval'] is None:
+                self.stdout.write("Copied the primary to %s." % ', '.join(aliases))
+                return
+            close_old_connections()
+            time.sleep(options['interval'])
@@ -0,0 +1,245 @@
+import contextvars
+import glob
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+
+
+logger = logging.getLogger('blogs.performance')
+
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576)
+
+# Where the gunicorn master adds up the files of workers that have exited.
+RETIRED_FILE = 'metrics-retired.json'
+
+# name: (type, help, buckets)
+METRICS = {
+    'blog_http_requests_total': ('counter', "Requests served.", None),
+    'blog_http_request_duration_seconds': ('histogram', "Wall time per request.", DURATION_BUCKETS),
+    'blog_http_db_queries': ('histogram', "Database queries per request.", QUERY_BUCKETS),
+    'blog_http_db_duration_seconds': ('histogram', "Database time per request.", DURATION_BUCKETS),
+    'blog_http_render_duration_seconds': ('histogram', "Response rendering (serialization) time.", DURATION_BUCKETS),
+    'blog_http_response_size_bytes': ('histogram', "Response body size.", SIZE_BUCKETS),
+    'blog_http_budget_exceeded_total': ('counter', "Requests over the query or latency budget.", None),
+}
+
+
+class RequestTimings:
+    """What one request spent where; filled in by the middleware and `time_query`."""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.render_start = None
+        self.render_time = 0.0
+
+
+# The timings of the request being handled. Context variables follow the
+# request into the threads sync_to_async runs ORM calls in, so queries from
+# async views are counted as well.
+current_timings = contextvars.ContextVar('blogs_request_timings', default=None)
+
+
+def time_query(execute, sql, params, many, context):
+    timings = current_timings.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings.queries += 1
+        timings.db_time += time.perf_counter() - start
+
+
+def install_query_timer(connection):
+    if time_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(time_query)
+
+
+class Registry:
+    """
+    Counters and histograms, keyed by metric name and a tuple of label pairs.
+
+    Values live in process memory. With `BLOG_METRICS_DIR` set, every process
+    also writes its values to a file of its own there (at most once per
+    `flush_interval` seconds), and `collect()` adds up all the files, so any
+    gunicorn worker can answer /metrics for all of them.
+    """
+    flush_interval = 1.0
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.values = {}
+        # Apart from `lock`: observing a value never waits for a file write.
+        self.flush_lock = threading.Lock()
+        self.last_flush = 0.0
+
+    def inc(self, name, labels, amount=1):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def observe(self, name, labels, value):
+        buckets = METRICS[name][2]
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            entry = self.values.get(key)
+            if entry is None:
+                entry = self.values[key] = {'buckets': [0] * len(buckets), 'sum': 0.0, 'count': 0}
+            for i, bound in enumerate(buckets):
+                if value <= bound:
+                    entry['buckets'][i] += 1
+            entry['sum'] += value
+            entry['count'] += 1
+        self.maybe_flush()
+
+    def reset(self):
+        with self.lock:
+            self.values.clear()
+
+    def snapshot(self):
+        with self.lock:
+            return [
+                [name, list(labels), dict(value, buckets=list(value['buckets'])) if isinstance(value, dict) else value]
+                for (name, labels), value in self.values.items()
+            ]
+
+    def directory(self):
+        return getattr(settings, 'BLOG_METRICS_DIR', None)
+
+    def maybe_flush(self, force=False):
+        directory = self.directory()
+        if not directory:
+            return
+        with self.flush_lock:
+            now = time.monotonic()
+            if not force and now - self.last_flush < self.flush_interval:
+                return
+            self.last_flush = now
+            try:
+                os.makedirs(directory, exist_ok=True)
+                write_rows(os.path.join(directory, 'metrics-%d.json' % os.getpid()), self.snapshot())
+            except OSError:
+                # Metrics must never fail the request being measured.
+                logger.exception("Could not write metrics to %s", directory)
+
+    def collect(self):
+        """Values of every process as `{(name, labels): value}`."""
+        directory = self.directory()
+        if not directory:
+            return values_of(self.snapshot())
+
+        self.maybe_flush(force=True)
+        merged = {}
+        for path in glob.glob(os.path.join(directory, 'metrics-*.json')):
+            try:
+                with open(path) as f:
+                    rows = json.load(f)
+            except (OSError, ValueError):
+                continue
+            for key, value in values_of(rows).items():
+                merged[key] = merge(merged.get(key), value)
+        return merged
+
+    def retire(self, pid):
+        """
+        Fold the file of the exited process `pid` into `metrics-retired.json`:
+        its counts still add up in `collect()`, but recycled workers do not
+        leave a file each behind. Called by the gunicorn master.
+        """
+        directory = self.directory()
+        if not directory:
+            return
+        path = os.path.join(directory, 'metrics-%d.json' % pid)
+        retired_path = os.path.join(directory, RETIRED_FILE)
+        try:
+            with open(path) as f:
+                rows = json.load(f)
+        except FileNotFoundError:
+            return
+        except ValueError:
+            rows = []
+        try:
+            with open(retired_path) as f:
+                retired = values_of(json.load(f))
+        except (OSError, ValueError):
+            retired = {}
+        for key, value in values_of(rows).items():
+            retired[key] = merge(retired.get(key), value)
+        write_rows(retired_path, [[name, list(labels), value] for (name, labels), value in retired.items()])
+        os.remove(path)
+
+
+def values_of(rows):
+    return {(name, tuple(map(tuple, labels))): value for name, labels, value in rows}
+
+
+def write_rows(path, rows):
+    # A temporary file of its own, outside the `metrics-*.json` pattern.
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.metrics-', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(rows, f)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+
+def merge(total, value):
+    if total is None:
+        return value
+    if isinstance(value, dict):
+        return {
+            'buckets': [a + b for a, b in zip(total['buckets'], value['buckets'])],
+            'sum': total['sum'] + value['sum'],
+            'count': total['count'] + value['count'],
+        }
+    return total + value
+
+
+registry = Registry()
+
+
+def format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ''
+    return '{%s}' % ','.join(
+        '%s="%s"' % (key, str(value).replace('\\', '\\\\').replace('"', '\\"')) for key, value in pairs
+    )
+
+
+def exposition():
+    """All metrics in the Prometheus text format."""
+    values = registry.collect()
+    lines = []
+    for name, (kind, help_text, buckets) in METRICS.items():
+        rows = sorted((labels, value) for (metric, labels), value in values.items() if metric == name)
+        if not rows:
+            continue
+        lines.append('# HELP %s %s' % (name, help_text))
+        lines.append('# TYPE %s %s' % (name, kind))
+        for labels, value in rows:
+            if kind == 'counter':
+                lines.append('%s%s %s' % (name, format_labels(labels), value))
+                continue
+            for bound, count in zip(buckets, value['buckets']):
+                lines.append('%s_bucket%s %d' % (name, format_labels(labels, [('le', bound)]), count))
+            lines.append('%s_bucket%s %d' % (name, format_labels(labels, [('le', '+Inf')]), value['count']))
+            lines.append('%s_sum%s %s' % (name, format_labels(labels), repr(value['sum'])))
+            lines.append('%s_count%s %d' % (name, format_labels(labels), value['count']))
+    return '\n'.join(lines) + '\n'
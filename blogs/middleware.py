@@ -0,0 +1,150 @@
+import logging
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+from . import replicas
+from .metrics import RequestTimings, current_timings, registry
+
+
+logger = logging.getLogger('blogs.performance')
+
+UNMATCHED_ROUTE = '<unmatched>'
+
+
+def query_budget():
+    return getattr(settings, 'BLOG_QUERY_BUDGET', 20)
+
+
+def latency_budget():
+    return getattr(settings, 'BLOG_LATENCY_BUDGET_MS', 500) / 1000.0
+
+
+class PerformanceMiddleware:
+    """
+    Per-request timings: wall time, database queries and time, rendering
+    time and response size.
+
+    Each response gets a `Server-Timing` header. The numbers are aggregated
+    per URL name into the histograms served at /metrics. Requests over
+    `BLOG_QUERY_BUDGET` queries or `BLOG_LATENCY_BUDGET_MS` are logged to
+    `blogs.performance` and counted.
+
+    Queries are counted by `metrics.time_query`, an execute wrapper that every
+    database connection gets when it is created (see `blogs.signals`).
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        timings = request.timings = RequestTimings()
+        token = current_timings.set(timings)
+        try:
+            response = self.get_response(request)
+        finally:
+            current_timings.reset(token)
+        return self.finish(request, response, timings)
+
+    async def __acall__(self, request):
+        timings = request.timings = RequestTimings()
+        token = current_timings.set(timings)
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_timings.reset(token)
+        return self.finish(request, response, timings)
+
+    def process_template_response(self, request, response):
+        # Runs just before DRF renders its Response (or a template is rendered).
+        timings = request.timings
+        timings.render_start = time.perf_counter()
+        response.add_post_render_callback(lambda rendered: self.rendered(timings))
+        return response
+
+    def rendered(self, timings):
+        timings.render_time = time.perf_counter() - timings.render_start
+
+    def finish(self, request, response, timings):
+        total = time.perf_counter() - timings.start
+        match = request.resolver_match
+        route = match.view_name if match is not None else UNMATCHED_ROUTE
+        size = None if response.streaming else len(response.content)
+
+        response['Server-Timing'] = ', '.join([
+            'db;dur=%.1f;desc="%d queries"' % (timings.db_time * 1000, timings.queries),
+            'render;dur=%.1f' % (timings.render_time * 1000),
+            'total;dur=%.1f' % (total * 1000),
+        ])
+
+        labels = {'route': route, 'method': request.method}
+        registry.inc('blog_http_requests_total', dict(labels, status=response.status_code))
+        registry.observe('blog_http_request_duration_seconds', labels, total)
+        registry.observe('blog_http_db_queries', labels, timings.queries)
+        registry.observe('blog_http_db_duration_seconds', labels, timings.db_time)
+        registry.observe('blog_http_render_duration_seconds', labels, timings.render_time)
+        if size is not None:
+            registry.observe('blog_http_response_size_bytes', labels, size)
+
+        exceeded = []
+        if timings.queries > query_budget():
+            exceeded.append('queries')
+        if total > latency_budget():
+            exceeded.append('latency')
+        for budget in exceeded:
+            registry.inc('blog_http_budget_exceeded_total', dict(labels, budget=budget))
+        if exceeded:
+            logger.warning(
+                "%s %s (%s) over budget: %d queries, %.1f ms",
+                request.method, request.path, route, timings.queries, total * 1000,
+            )
+        return response
+
+
+class ReplicaPinMiddleware:
+    """
+    Pins a client whose request wrote to the database to the primary for the
+    next `BLOG_REPLICA_PIN_SECONDS`, so it reads its own writes (see
+    `blogs.replicas`). Goes below AuthenticationMiddleware.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        writes = replicas.Writes()
+        token = replicas.request_writes.set(writes)
+        try:
+            response = self.get_response(request)
+        finally:
+            replicas.request_writes.reset(token)
+        return self.finish(request, response, writes)
+
+    async def __acall__(self, request):
+        writes = replicas.Writes()
+        token = replicas.request_writes.set(writes)
+        try:
+            response = await self.get_response(request)
+        finally:
+            replicas.request_writes.reset(token)
+        return self.finish(request, response, writes)
+
+    def finish(self, request, response, writes):
+        if writes.happened and replicas.replicas():
+            replicas.pin(request, response)
+        return response
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.19 on 2026-10-18 08:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blogs', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(condition=models.Q(('active', True)), fields=['published_date', 'id'], name='post_active_pub_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['published_date', 'id'], name='post_pub_idx'),
+        ),
+    ]
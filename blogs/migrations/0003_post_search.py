@@ -0,0 +1,91 @@
+# Generated by Django 4.2.19 on 2026-10-18 08:52
+
+import re
+from collections import Counter
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+FTS_FORWARD = [
+    """
+    CREATE VIRTUAL TABLE blogs_post_fts USING fts5(
+        title, content, author_name, tokenize = 'porter unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    INSERT INTO blogs_post_fts(rowid, title, content, author_name)
+    SELECT p.id, p.title, p.content, a.name
+    FROM blogs_post p JOIN blogs_author a ON a.id = p.author_id
+    """,
+]
+
+FTS_BACKWARD = [
+    "DROP TABLE IF EXISTS blogs_post_fts",
+]
+
+
+def run_sqlite(statements):
+    # The FTS5 table only exists on SQLite; other backends use the
+    # PostSearchTerm inverted index. Both are kept in sync by the signal
+    # handlers in blogs.signals.
+    def run(apps, schema_editor):
+        if schema_editor.connection.vendor != 'sqlite':
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+    return run
+
+
+# blogs.search's term weighting as of this migration, so that later changes
+# to it cannot change what this migration does.
+FIELD_WEIGHTS = {'title': 10.0, 'content': 1.0, 'author_name': 5.0}
+BM25_K1 = 1.2
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def term_weights(post):
+    weights = Counter()
+    fields = {'title': post.title, 'content': post.content, 'author_name': post.author.name}
+    for field, text in fields.items():
+        for term, tf in Counter(token.lower() for token in TOKEN_RE.findall(text or '')).items():
+            term = term[:64]
+            weights[term] += FIELD_WEIGHTS[field] * tf * (BM25_K1 + 1) / (tf + BM25_K1)
+    return weights
+
+
+def index_existing_posts(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        return
+    Post = apps.get_model('blogs', 'Post')
+    PostSearchTerm = apps.get_model('blogs', 'PostSearchTerm')
+    for post in Post.objects.select_related('author').iterator(chunk_size=500):
+        PostSearchTerm.objects.bulk_create([
+            PostSearchTerm(term=term, post_id=post.pk, weight=weight)
+            for term, weight in term_weights(post).items()
+        ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blogs', '0002_post_list_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PostSearchTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=64)),
+                ('weight', models.FloatField()),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_terms', to='blogs.post')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='postsearchterm',
+            constraint=models.UniqueConstraint(fields=('term', 'post'), name='post_search_term_uniq'),
+        ),
+        migrations.RunPython(run_sqlite(FTS_FORWARD), run_sqlite(FTS_BACKWARD)),
+        migrations.RunPython(index_existing_posts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 4.2.19 on 2026-10-18 09:03
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_comment_stats(apps, schema_editor):
+    Post = apps.get_model('blogs', 'Post')
+    Comment = apps.get_model('blogs', 'Comment')
+    comments = Comment.objects.filter(post=OuterRef('pk')).order_by()
+    Post.objects.update(
+        comment_count=Coalesce(Subquery(comments.values('post').annotate(n=Count('id')).values('n')), 0),
+        last_commented_at=Subquery(comments.order_by('-created').values('created')[:1]),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blogs', '0005_post_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='comment_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='last_commented_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(condition=models.Q(('active', True)), fields=['last_commented_at', 'id'], name='post_active_activity_idx'),
+        ),
+        migrations.RunPython(backfill_comment_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.19 on 2026-10-18 09:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blogs', '0006_post_comment_stats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='token',
+            field=models.UUIDField(blank=True, editable=False, null=True, unique=True),
+        ),
+    ]
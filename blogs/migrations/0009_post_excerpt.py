@@ -0,0 +1,43 @@
+# Generated by Django 4.2.19 on 2026-10-18 10:08
+
+from django.db import migrations, models
+from django.utils.text import Truncator
+
+
+# Copied from blogs.models as of this migration, so later changes to the
+# excerpt rules do not change what it writes.
+EXCERPT_WORDS = 30
+EXCERPT_MAX_LENGTH = 500
+
+
+def make_excerpt(content):
+    return Truncator(Truncator(content).words(EXCERPT_WORDS, truncate=' …')).chars(EXCERPT_MAX_LENGTH)
+
+
+def backfill_excerpts(apps, schema_editor):
+    Post = apps.get_model('blogs', 'Post')
+    last = 0
+    while True:
+        posts = list(Post.objects.filter(pk__gt=last).order_by('pk').only('content')[:1000])
+        if not posts:
+            return
+        for post in posts:
+            post.excerpt = make_excerpt(post.content)
+        Post.objects.bulk_update(posts, ['excerpt'])
+        last = posts[-1].pk
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blogs', '0008_api_token'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='excerpt',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.RunPython(backfill_excerpts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,170 @@
+# Generated by Django 4.2.19 on 2026-10-18 10:40
+
+import zlib
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import migrations, models
+
+import blogs.fields
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+TABLES = {'Post': 'blogs_post', 'Comment': 'blogs_comment'}
+
+# The stored format and its helpers, copied from blogs.fields as of this
+# migration, so later changes there do not change what it does to old rows.
+RAW = 0
+ZLIB = 1
+ZSTD = 2
+CODECS = {'none': RAW, 'zlib': ZLIB, 'zstd': ZSTD}
+ZLIB_LEVEL = 6
+ZSTD_LEVEL = 6
+
+
+def text_codec():
+    name = getattr(settings, 'BLOG_TEXT_COMPRESSION', 'zlib')
+    if name not in CODECS:
+        raise ImproperlyConfigured("BLOG_TEXT_COMPRESSION must be one of: %s." % ', '.join(CODECS))
+    if name == 'zstd' and zstandard is None:
+        raise ImproperlyConfigured("BLOG_TEXT_COMPRESSION = 'zstd' needs the zstandard package.")
+    return CODECS[name]
+
+
+def min_size():
+    return getattr(settings, 'BLOG_TEXT_COMPRESS_MIN_SIZE', 256)
+
+
+def compress_text(text, codec=None):
+    """`text` as a stored value: the codec byte, then the (compressed) UTF-8."""
+    data = text.encode('utf-8')
+    if codec is None:
+        codec = text_codec() if len(data) >= min_size() else RAW
+    if codec == ZLIB:
+        compressed = zlib.compress(data, ZLIB_LEVEL)
+    elif codec == ZSTD:
+        compressed = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+    else:
+        return bytes([RAW]) + data
+    if len(compressed) >= len(data):
+        return bytes([RAW]) + data
+    return bytes([codec]) + compressed
+
+
+def decompress_text(payload):
+    payload = bytes(payload)
+    codec, data = payload[0], payload[1:]
+    if codec == ZLIB:
+        data = zlib.decompress(data)
+    elif codec == ZSTD:
+        if zstandard is None:
+            raise ImproperlyConfigured("Reading zstd-compressed text needs the zstandard package.")
+        data = zstandard.ZstdDecompressor().decompress(data)
+    elif codec != RAW:
+        raise ValueError("Unknown compressed text codec %d." % codec)
+    return data.decode('utf-8')
+
+
+def compress_table_column(connection, table, column='content', chunk_size=500, codec=None):
+    """
+    Re-encode every value of `table.column` with `compress_text` (`codec`:
+    by the settings), in keyset chunks on id. Reads plain text as well as
+    any stored encoding.
+    """
+    qn = connection.ops.quote_name
+    select = 'SELECT id, %s FROM %s WHERE id > %%s ORDER BY id LIMIT %%s' % (qn(column), qn(table))
+    update = 'UPDATE %s SET %s = %%s WHERE id = %%s' % (qn(table), qn(column))
+    last = 0
+    while True:
+        with connection.cursor() as cursor:
+            cursor.execute(select, [last, chunk_size])
+            rows = cursor.fetchall()
+            if not rows:
+                return
+            changes = []
+            for pk, value in rows:
+                text = value if isinstance(value, str) or value is None else decompress_text(value)
+                if text is not None:
+                    changes.append((connection.Database.Binary(compress_text(text, codec)), pk))
+            cursor.executemany(update, changes)
+        last = rows[-1][0]
+
+
+# PostgreSQL would cast text to bytea by parsing it as a bytea literal, which
+# fails on backslashes; convert the UTF-8 instead and prefix the codec byte
+# for uncompressed text (RAW).
+PG_TO_BYTEA = """ALTER TABLE %s ALTER COLUMN content TYPE bytea USING '\\x00'::bytea || convert_to(content, 'UTF8')"""
+PG_TO_TEXT = "ALTER TABLE %s ALTER COLUMN content TYPE text USING convert_from(substring(content FROM 2), 'UTF8')"
+
+
+def content_fields(model):
+    old = model._meta.get_field('content')
+    new = blogs.fields.CompressedTextField()
+    new.set_attributes_from_name('content')
+    new.model = model
+    return old, new
+
+
+def to_binary_columns(apps, schema_editor):
+    for name, table in TABLES.items():
+        model = apps.get_model('blogs', name)
+        if schema_editor.connection.vendor == 'postgresql':
+            schema_editor.execute(PG_TO_BYTEA % table)
+        else:
+            schema_editor.alter_field(model, *content_fields(model))
+
+
+def to_text_columns(apps, schema_editor):
+    for name, table in TABLES.items():
+        model = apps.get_model('blogs', name)
+        if schema_editor.connection.vendor == 'postgresql':
+            schema_editor.execute(PG_TO_TEXT % table)
+        else:
+            schema_editor.alter_field(model, *reversed(content_fields(model)))
+
+
+def compress_existing(apps, schema_editor):
+    for table in TABLES.values():
+        compress_table_column(schema_editor.connection, table)
+
+
+def decompress_existing(apps, schema_editor):
+    # Uncompressed, ready for to_text_columns.
+    connection = schema_editor.connection
+    for table in TABLES.values():
+        compress_table_column(connection, table, codec=RAW)
+        if connection.vendor == 'sqlite':
+            # Back to TEXT values.
+            schema_editor.execute("UPDATE %s SET content = CAST(substr(content, 2) AS TEXT)" % table)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blogs', '0009_post_excerpt'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunPython(to_binary_columns, to_text_columns),
+            ],
+            state_operations=[
+                migrations.AlterField(
+                    model_name='post',
+                    name='content',
+                    field=blogs.fields.CompressedTextField(),
+                ),
+                migrations.AlterField(
+                    model_name='comment',
+                    name='content',
+                    field=blogs.fields.CompressedTextField(),
+                ),
+            ],
+        ),
+        migrations.RunPython(compress_existing, decompress_existing),
+    ]
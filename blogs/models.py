@@ -1,9 +1,21 @@
 from django.db import models
 from django.contrib.auth import get_user_model
 from django.utils import timezone
+from django.utils.text import Truncator
+
+from .fields import CompressedTextField
 
 User = get_user_model()
 
+# The post list shows the first EXCERPT_WORDS words of a post, exactly as the
+# `truncatewords` filter would, capped at EXCERPT_MAX_LENGTH characters.
+EXCERPT_WORDS = 30
+EXCERPT_MAX_LENGTH = 500
+
+
+def make_excerpt(content):
+    return Truncator(Truncator(content).words(EXCERPT_WORDS, truncate=' …')).chars(EXCERPT_MAX_LENGTH)
+
 class Author(models.Model):
     name = models.CharField(max_length=100)
     email = models.EmailField(unique=True)
@@ -25,7 +37,8 @@ class Post(models.Model):
     ]
     
     title = models.CharField(max_length=200)
-    content = models.TextField()
+    # Stored compressed; see blogs.fields.
+    content = CompressedTextField()
     published_date = models.DateTimeField(default=timezone.now)
     author = models.ForeignKey(
         Author, 
@@ -34,17 +47,56 @@ class Post(models.Model):
     )
     status = models.CharField(max_length=10, choices=STATUS_CHOICES)
     active = models.BooleanField()
+    # Last change to anything the post's API representation renders; backs the
+    # ETag/Last-Modified validators. Bulk `update()` calls must set it by hand.
+    updated_at = models.DateTimeField(auto_now=True)
+    # Denormalized from the comments table by `blogs.counters`.
+    comment_count = models.PositiveIntegerField(default=0)
+    last_commented_at = models.DateTimeField(null=True, blank=True)
+    # Stored `make_excerpt(content)`, so lists need not load the content.
+    # Set by save(); bulk_create callers must set it themselves.
+    excerpt = models.TextField(blank=True, editable=False)
+
+    class Meta:
+        indexes = [
+            # Active list filters, date ranges and the keyset ordering. Partial rather
+            # than leading on `active`: the ORM renders `active=True` as a bare
+            # `WHERE "active"`, which SQLite only matches against an index condition.
+            models.Index(
+                fields=['published_date', 'id'],
+                name='post_active_pub_idx',
+                condition=models.Q(active=True),
+            ),
+            # HTML list, which pages over every post.
+            models.Index(fields=['published_date', 'id'], name='post_pub_idx'),
+            # ?ordering=-last_commented_at on the active list.
+            models.Index(
+                fields=['last_commented_at', 'id'],
+                name='post_active_activity_idx',
+                condition=models.Q(active=True),
+            ),
+        ]
 
     def __str__(self):
         return self.title
 
+    def save(self, *args, **kwargs):
+        # A deferred content is unchanged, and loading it just for this would
+        # cost a query.
+        if 'content' not in self.get_deferred_fields():
+            self.excerpt = make_excerpt(self.content)
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None and 'content' in update_fields:
+                kwargs['update_fields'] = {*update_fields, 'excerpt'}
+        super().save(*args, **kwargs)
+
 class Comment(models.Model):
     post = models.ForeignKey(
         Post, 
         on_delete=models.CASCADE,
         related_name='comments'
     )   
-    content = models.TextField()
+    content = CompressedTextField()
     user = models.ForeignKey(
         User, 
         on_delete=models.SET_NULL, 
@@ -53,6 +105,60 @@ class Comment(models.Model):
         related_name='comments'
     )
     created = models.DateTimeField(default=timezone.now)
+    # Client token of a comment accepted through the write-behind queue
+    # (`blogs.comment_queue`); makes replaying the spool idempotent.
+    token = models.UUIDField(null=True, blank=True, unique=True, editable=False)
+
+    class Meta:
+        indexes = [
+            # Keyset pages of a post's comments.
+            models.Index(fields=['post', 'created', 'id'], name='comment_post_created_idx'),
+        ]
 
     def __str__(self):
         return self.content
+
+
+class ApiToken(models.Model):
+    """
+    API key of an integration client. Only the SHA-256 of the key is stored;
+    the key itself is shown once, when the token is created.
+    """
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='api_tokens'
+    )
+    name = models.CharField(max_length=100, blank=True)
+    # First characters of the key, to tell tokens apart when listing or revoking.
+    prefix = models.CharField(max_length=8)
+    key_hash = models.CharField(max_length=64, unique=True)
+    created = models.DateTimeField(default=timezone.now)
+    revoked_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return '%s (%s...)' % (self.name or self.user, self.prefix)
+
+
+class PostSearchTerm(models.Model):
+    """
+    Portable inverted index used by post search on backends without SQLite FTS5.
+
+    `weight` is the BM25 term-frequency component summed over the title, content
+    and author name fields; the IDF part is applied at query time.
+    """
+    term = models.CharField(max_length=64)
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='search_terms'
+    )
+    weight = models.FloatField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['term', 'post'], name='post_search_term_uniq'),
+        ]
+
+    def __str__(self):
+        return self.term
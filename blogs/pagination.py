@@ -0,0 +1,216 @@
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from collections import OrderedDict
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+def encode_cursor(field, value, pk, reverse=False):
+    # Cursors carry the (value, id) position itself, never an offset, so they
+    # stay valid while new rows are being inserted. The field they were issued
+    # for is part of them: a position in one ordering means nothing in another.
+    raw = '%s|%s|%s|%d' % (field, value.isoformat(), pk, int(reverse))
+    return urlsafe_b64encode(raw.encode('ascii')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor, field):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        issued_for, stamp, pk, reverse = urlsafe_b64decode(padded.encode('ascii')).decode('ascii').split('|')
+        value = parse_datetime(stamp)
+        if value is None or issued_for != field:
+            raise ValueError(stamp)
+        return value, int(pk), bool(int(reverse))
+    except (TypeError, ValueError, UnicodeError):
+        raise InvalidCursor(cursor)
+
+
+class KeysetPage:
+    def __init__(self, object_list, next_cursor, previous_cursor):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+
+def keyset_after(queryset, field, value, pk, descending):
+    """Filter `queryset` to rows strictly after (value, pk) in the given direction."""
+    op = 'lt' if descending else 'gt'
+    return queryset.filter(
+        Q(**{'%s__%s' % (field, op): value}) | Q(**{field: value, 'id__%s' % op: pk})
+    )
+
+
+def keyset_queryset(queryset, cursor, page_size, field='published_date', descending=True):
+    """
+    The query for one page: `(queryset, reverse)`, where `queryset` is ordered
+    on (`field`, id) and limited to `page_size + 1` rows.
+    """
+    reverse = False
+    if cursor:
+        value, pk, reverse = decode_cursor(cursor, field)
+        queryset = keyset_after(queryset, field, value, pk, descending != reverse)
+
+    prefix = '-' if descending != reverse else ''
+    return queryset.order_by(prefix + field, prefix + 'id')[:page_size + 1], reverse
+
+
+def keyset_page(rows, cursor, reverse, page_size, field):
+    """Build the KeysetPage from the rows fetched by `keyset_queryset`."""
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+    if reverse:
+        rows.reverse()
+
+    has_next = has_more if not reverse else True
+    has_previous = bool(cursor) if not reverse else has_more
+
+    next_cursor = None
+    previous_cursor = None
+    if rows and has_next:
+        next_cursor = encode_cursor(field, getattr(rows[-1], field), rows[-1].pk)
+    if rows and has_previous:
+        previous_cursor = encode_cursor(field, getattr(rows[0], field), rows[0].pk, reverse=True)
+    return KeysetPage(rows, next_cursor, previous_cursor)
+
+
+def paginate_keyset(queryset, cursor, page_size, field='published_date', descending=True):
+    """
+    Return one page of `queryset` ordered on (`field`, id), newest first by default.
+
+    Every page is a single indexed range scan limited to `page_size + 1` rows,
+    so page 1000 costs the same as page 1.
+    """
+    queryset, reverse = keyset_queryset(queryset, cursor, page_size, field, descending)
+    return keyset_page(list(queryset), cursor, reverse, page_size, field)
+
+
+async def apaginate_keyset(queryset, cursor, page_size, field='published_date', descending=True):
+    """`paginate_keyset` for async views."""
+    queryset, reverse = keyset_queryset(queryset, cursor, page_size, field, descending)
+    rows = [row async for row in queryset.aiterator()]
+    return keyset_page(rows, cursor, reverse, page_size, field)
+
+
+class PostCursorPagination(BasePagination):
+    """
+    Keyset pagination for the post list API.
+
+    The paginated envelope is opt-in: it is used when the request carries a
+    `cursor` or `page_size` query parameter. Otherwise the response is the
+    plain list, as before, but only the first `max_page_size` posts of it,
+    with a `Link: <...>; rel="next"` header to the rest.
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    page_size = 20
+    max_page_size = 100
+    keyset_field = 'published_date'
+    descending = True
+    opt_in = True
+    invalid_cursor_message = 'Invalid cursor'
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if size <= 0:
+            return self.page_size
+        return min(size, self.max_page_size)
+
+    def get_keyset_field(self, view):
+        if view is not None and hasattr(view, 'get_keyset_field'):
+            return view.get_keyset_field()
+        return self.keyset_field
+
+    def is_enabled(self, request):
+        params = request.query_params
+        return not self.opt_in or self.cursor_query_param in params or self.page_size_query_param in params
+
+    def get_keyset_kwargs(self, request, view):
+        # The plain list is a first page, as large as pages go.
+        enabled = self.is_enabled(request)
+        return {
+            'cursor': request.query_params.get(self.cursor_query_param) if enabled else None,
+            'page_size': self.get_page_size(request) if enabled else self.max_page_size,
+            'field': self.get_keyset_field(view),
+            'descending': self.descending,
+        }
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        try:
+            self.page = paginate_keyset(queryset, **self.get_keyset_kwargs(request, view))
+        except InvalidCursor:
+            raise NotFound(self.invalid_cursor_message)
+        return list(self.page)
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """`paginate_queryset` for async views; the rows are read with `aiterator()`."""
+        self.request = request
+        try:
+            self.page = await apaginate_keyset(queryset, **self.get_keyset_kwargs(request, view))
+        except InvalidCursor:
+            raise NotFound(self.invalid_cursor_message)
+        return list(self.page)
+
+    def get_link(self, cursor):
+        if cursor is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    def get_paginated_response(self, data):
+        if not self.is_enabled(self.request):
+            headers = {}
+            if self.page.next_cursor is not None:
+                # Pages as large as the plain list, in the paginated envelope.
+                url = replace_query_param(self.get_link(self.page.next_cursor),
+                                          self.page_size_query_param, self.max_page_size)
+                headers['Link'] = '<%s>; rel="next"' % url
+            return Response(data, headers=headers)
+        return Response(OrderedDict([
+            ('next', self.get_link(self.page.next_cursor)),
+            ('previous', self.get_link(self.page.previous_cursor)),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+
+class CommentCursorPagination(PostCursorPagination):
+    """Keyset pagination over a post's comments, oldest first. Always on."""
+    keyset_field = 'created'
+    descending = False
+    opt_in = False
@@ -6,5 +6,6 @@ class IsPostCreator(permissions.BasePermission):
     def has_object_permission(self, request, view, obj):
         # Only allow updates if the user is authenticated and is the post's creator.
         if request.user and request.user.is_authenticated:
-            return obj.author.user == request.user
+            # Compare ids: `obj.author.user` would load the user row.
+            return obj.author.user_id == request.user.pk
         return False
\ No newline at end of file
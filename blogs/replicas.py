@@ -0,0 +1,198 @@
+"""
+Read replicas.
+
+`ReplicaRouter` sends writes, and reads by default, to the primary
+(`default`). Views with `ReplicaReadMixin` (the post list and detail pages
+and API endpoints) read from one of `BLOG_READ_REPLICAS` instead. The replica
+is picked once per request, by `BLOG_REPLICA_STRATEGY`: 'round-robin', or
+'least-latency', the replica whose queries have been fastest lately.
+
+Replicas lag behind the primary. So that people see their own writes, a
+request that writes pins its client to the primary for
+`BLOG_REPLICA_PIN_SECONDS` (see `middleware.ReplicaPinMiddleware`). Browsers
+are pinned with a cookie. Authenticated users also get a cache entry, which
+covers token clients that keep no cookies.
+"""
+import contextvars
+import itertools
+import sqlite3
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connections
+from django.template.response import TemplateResponse
+from rest_framework.views import APIView
+
+
+PRIMARY = 'default'
+STRATEGIES = ('round-robin', 'least-latency')
+PIN_COOKIE = 'read_primary'
+PIN_KEY = 'blogs:replica-pin:%s'
+# Session saves are bookkeeping, not content anyone reads back.
+UNPINNED_APPS = {'sessions'}
+
+# Where the current request's reads go (None: the primary), and whether it
+# has written anything.
+read_database = contextvars.ContextVar('read_database', default=None)
+request_writes = contextvars.ContextVar('request_writes', default=None)
+
+
+def replicas():
+    return list(getattr(settings, 'BLOG_READ_REPLICAS', []))
+
+
+def strategy():
+    value = getattr(settings, 'BLOG_REPLICA_STRATEGY', 'round-robin')
+    if value not in STRATEGIES:
+        raise ImproperlyConfigured("BLOG_REPLICA_STRATEGY must be one of: %s." % ', '.join(STRATEGIES))
+    return value
+
+
+def pin_seconds():
+    return getattr(settings, 'BLOG_REPLICA_PIN_SECONDS', 5)
+
+
+class ReplicaSelector:
+    """Picks replicas, and keeps a moving average of each one's query time."""
+    smoothing = 0.2
+    # Under least-latency one pick in `probe_every` goes round the replicas
+    # in turn, so a replica that was slow once gets measured again.
+    probe_every = 20
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.picks = itertools.count()
+            self.turns = itertools.count()
+            self.latency = {}
+
+    def choose(self, aliases, strategy='round-robin'):
+        with self.lock:
+            if strategy == 'least-latency' and next(self.picks) % self.probe_every:
+                # Replicas not measured yet come first.
+                return min(aliases, key=lambda alias: self.latency.get(alias, 0.0))
+            return aliases[next(self.turns) % len(aliases)]
+
+    def record(self, alias, seconds):
+        with self.lock:
+            previous = self.latency.get(alias)
+            self.latency[alias] = seconds if previous is None else previous + self.smoothing * (seconds - previous)
+
+
+selector = ReplicaSelector()
+
+
+def time_replica_query(execute, sql, params, many, context):
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        selector.record(context['connection'].alias, time.perf_counter() - start)
+
+
+def install_latency_timer(connection):
+    if connection.alias in replicas() and time_replica_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(time_replica_query)
+
+
+class Writes:
+    happened = False
+
+
+def is_pinned(request):
+    if PIN_COOKIE in request.COOKIES:
+        return True
+    user = request.user
+    return user.is_authenticated and cache.get(PIN_KEY % user.pk) is not None
+
+
+def pin(request, response):
+    """Send the client's reads to the primary for the next `pin_seconds()`."""
+    seconds = pin_seconds()
+    response.set_cookie(PIN_COOKIE, '1', max_age=seconds, httponly=True, samesite='Lax')
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        cache.set(PIN_KEY % user.pk, True, seconds)
+
+
+def choose_read_database(request):
+    aliases = replicas()
+    if not aliases or is_pinned(request):
+        return None
+    return selector.choose(aliases, strategy())
+
+
+def read_from_primary():
+    """Send the rest of the current request's reads to the primary."""
+    read_database.set(None)
+
+
+class ReplicaTemplateResponse(TemplateResponse):
+    """Renders with the view's read database: templates evaluate querysets after dispatch() returns."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.read_database = read_database.get()
+
+    @property
+    def rendered_content(self):
+        token = read_database.set(self.read_database)
+        try:
+            return super().rendered_content
+        finally:
+            read_database.reset(token)
+
+
+class ReplicaReadMixin:
+    """Reads of the view go to a replica, unless the client is pinned to the primary."""
+    response_class = ReplicaTemplateResponse
+
+    def dispatch(self, request, *args, **kwargs):
+        # DRF views choose in initial(), once authentication has run, so
+        # pinned token clients are recognised too.
+        token = read_database.set(None if isinstance(self, APIView) else choose_read_database(request))
+        try:
+            return super().dispatch(request, *args, **kwargs)
+        finally:
+            read_database.reset(token)
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        read_database.set(choose_read_database(request))
+
+
+class ReplicaRouter:
+    """Writes to the primary; reads to the replica the current view chose, if any."""
+
+    def db_for_read(self, model, **hints):
+        return read_database.get()
+
+    def db_for_write(self, model, **hints):
+        writes = request_writes.get()
+        if writes is not None and model._meta.app_label not in UNPINNED_APPS:
+            writes.happened = True
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary.
+        databases = {PRIMARY, *replicas()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+
+def copy_sqlite_database(source, target):
+    """Copy database `source` over the SQLite file of `target`, a stand-in for replication."""
+    source_connection = connections[source]
+    source_connection.ensure_connection()
+    destination = sqlite3.connect(str(connections[target].settings_dict['NAME']))
+    try:
+        source_connection.connection.backup(destination)
+    finally:
+        destination.close()
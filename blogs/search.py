@@ -0,0 +1,284 @@
+import math
+import re
+from collections import Counter
+
+from django.db import connection, transaction
+from django.db.models import Case, Count, F, FloatField, Sum, When
+from django.utils.html import escape
+
+from .models import Post, PostSearchTerm
+
+
+# Relative importance of a match in each indexed field (title, content, author name).
+FIELD_WEIGHTS = {'title': 10.0, 'content': 1.0, 'author_name': 5.0}
+BM25_K1 = 1.2
+SNIPPET_TOKENS = 24
+
+# Private-use markers wrapped around matches by the backends; they are turned
+# into <mark> tags only after the surrounding text has been HTML escaped.
+MATCH_START = '\x02'
+MATCH_END = '\x03'
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+FTS_SEARCH_SQL = """
+    SELECT f.rowid,
+           bm25(blogs_post_fts, %(title)s, %(content)s, %(author_name)s) AS rank,
+           highlight(blogs_post_fts, 0, %%s, %%s) AS title_highlight,
+           snippet(blogs_post_fts, 1, %%s, %%s, '...', %(tokens)d) AS snippet
+    FROM blogs_post_fts f
+    JOIN blogs_post p ON p.id = f.rowid
+    WHERE blogs_post_fts MATCH %%s AND p.active
+    ORDER BY rank
+    LIMIT %%s
+""" % dict(FIELD_WEIGHTS, tokens=SNIPPET_TOKENS)
+
+# The content goes in from Python rather than by INSERT ... SELECT: it is
+# stored compressed (blogs.fields), which SQLite cannot read.
+FTS_INSERT_SQL = """
+    INSERT INTO blogs_post_fts(rowid, title, content, author_name) VALUES (%s, %s, %s, %s)
+"""
+FTS_POST_SQL = """
+    INSERT INTO blogs_post_fts(rowid, title, content, author_name)
+    VALUES (%s, %s, %s, (SELECT name FROM blogs_author WHERE id = %s))
+"""
+# For posts saved with their content deferred, and so unchanged.
+FTS_POST_TITLE_SQL = """
+    UPDATE blogs_post_fts SET title = %s, author_name = (SELECT name FROM blogs_author WHERE id = %s)
+    WHERE rowid = %s
+"""
+FTS_AUTHOR_SQL = """
+    UPDATE blogs_post_fts SET author_name = %s
+    WHERE rowid IN (SELECT id FROM blogs_post WHERE author_id = %s)
+"""
+FTS_CHUNK_SIZE = 500
+
+
+class SearchHit:
+    def __init__(self, post, rank, title_highlight, snippet):
+        self.post = post
+        self.rank = rank
+        self.title_highlight = title_highlight
+        self.snippet = snippet
+
+
+def tokenize(text):
+    return [token.lower() for token in TOKEN_RE.findall(text or '')]
+
+
+def render_markers(text):
+    return escape(text).replace(MATCH_START, '<mark>').replace(MATCH_END, '</mark>')
+
+
+def uses_fts():
+    return connection.vendor == 'sqlite'
+
+
+def search_posts(query, limit=20):
+    """
+    Return up to `limit` active posts matching every word of `query`, best first.
+
+    Ranking is bm25 over title, content and author name. On SQLite this runs
+    against the FTS5 table; elsewhere against the PostSearchTerm inverted index.
+    Both are kept in sync by the signal handlers in `blogs.signals`.
+    """
+    terms = list(dict.fromkeys(tokenize(query)))
+    if not terms:
+        return []
+    if uses_fts():
+        rows = fts_search(terms, limit)
+    else:
+        rows = term_index_search(terms, limit)
+
+    posts = Post.objects.select_related('author').in_bulk([row[0] for row in rows])
+    return [
+        SearchHit(posts[pk], rank, render_markers(title), render_markers(snippet))
+        for pk, rank, title, snippet in rows
+        if pk in posts
+    ]
+
+
+def fts_search(terms, limit):
+    # Quote every term so user input can never be read as FTS5 query syntax.
+    match = ' '.join('"%s"' % term for term in terms)
+    with connection.cursor() as cursor:
+        cursor.execute(FTS_SEARCH_SQL, [
+            MATCH_START, MATCH_END, MATCH_START, MATCH_END, match, limit,
+        ])
+        return cursor.fetchall()
+
+
+def term_index_search(terms, limit):
+    # Document frequencies and count over the searchable (active) posts.
+    frequencies = dict(
+        PostSearchTerm.objects.filter(term__in=terms, post__active=True)
+        .values_list('term')
+        .annotate(n=Count('id'))
+    )
+    if len(frequencies) < len(terms):
+        return []
+
+    total = Post.objects.filter(active=True).count()
+    idf = {
+        term: math.log(1 + (total - n + 0.5) / (n + 0.5))
+        for term, n in frequencies.items()
+    }
+    score = Sum(
+        Case(
+            *[When(term=term, then=F('weight') * value) for term, value in idf.items()],
+            output_field=FloatField(),
+        )
+    )
+    ranked = (
+        PostSearchTerm.objects.filter(term__in=terms, post__active=True)
+        .values('post')
+        .annotate(score=score, matched=Count('term'))
+        .filter(matched=len(terms))
+        .order_by('-score')[:limit]
+    )
+    scores = [(row['post'], row['score']) for row in ranked]
+    posts = Post.objects.select_related('author').in_bulk([pk for pk, _ in scores])
+
+    rows = []
+    for pk, value in scores:
+        post = posts[pk]
+        rows.append((
+            pk,
+            -value,  # Match FTS5, where a lower bm25 rank is a better match.
+            mark_terms(post.title, terms),
+            snippet_for(post.content, terms),
+        ))
+    return rows
+
+
+def mark_terms(text, terms):
+    def replace(match):
+        word = match.group(0)
+        if word.lower() in terms:
+            return MATCH_START + word + MATCH_END
+        return word
+    return TOKEN_RE.sub(replace, text)
+
+
+def snippet_for(text, terms, size=SNIPPET_TOKENS):
+    matches = list(TOKEN_RE.finditer(text))
+    first = next((i for i, m in enumerate(matches) if m.group(0).lower() in terms), 0)
+    start = max(0, first - size // 4)
+    window = matches[start:start + size]
+    if not window:
+        return ''
+    snippet = mark_terms(text[window[0].start():window[-1].end()], terms)
+    if start > 0:
+        snippet = '...' + snippet
+    if start + size < len(matches):
+        snippet += '...'
+    return snippet
+
+
+def term_weights(post, author_name):
+    """BM25 term-frequency component per term for one post."""
+    weights = Counter()
+    fields = {'title': post.title, 'content': post.content, 'author_name': author_name}
+    for field, text in fields.items():
+        for term, tf in Counter(tokenize(text)).items():
+            term = term[:64]
+            weights[term] += FIELD_WEIGHTS[field] * tf * (BM25_K1 + 1) / (tf + BM25_K1)
+    return weights
+
+
+def index_post_terms(post, term_model=PostSearchTerm):
+    with transaction.atomic():
+        term_model.objects.filter(post_id=post.pk).delete()
+        term_model.objects.bulk_create([
+            term_model(term=term, post_id=post.pk, weight=weight)
+            for term, weight in term_weights(post, post.author.name).items()
+        ])
+
+
+def rebuild_term_index(post_model=Post, term_model=PostSearchTerm, chunk_size=500):
+    term_model.objects.all().delete()
+    for post in post_model.objects.select_related('author').iterator(chunk_size=chunk_size):
+        index_post_terms(post, term_model)
+
+
+def fts_execute(sql, params=()):
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+
+
+def fts_rows(posts):
+    return [
+        (pk, title, str(content), author_name)
+        for pk, title, content, author_name in posts.values_list('pk', 'title', 'content', 'author__name')
+    ]
+
+
+def fts_insert(rows):
+    with connection.cursor() as cursor:
+        cursor.executemany(FTS_INSERT_SQL, rows)
+
+
+def in_clause(pks):
+    return '(%s)' % ', '.join(['%s'] * len(pks))
+
+
+def index_posts(pks):
+    """(Re)index the given posts. Called from signals and by bulk writers."""
+    pks = list(pks)
+    if not pks:
+        return
+    if not uses_fts():
+        for post in Post.objects.select_related('author').filter(pk__in=pks):
+            index_post_terms(post)
+        return
+    with transaction.atomic():
+        fts_execute("DELETE FROM blogs_post_fts WHERE rowid IN " + in_clause(pks), pks)
+        fts_insert(fts_rows(Post.objects.using(connection.alias).filter(pk__in=pks)))
+
+
+def index_saved_posts(posts):
+    """(Re)index posts just saved, from the instances rather than reading them back."""
+    if not uses_fts():
+        index_posts([post.pk for post in posts])
+        return
+    unchanged = [post for post in posts if 'content' in post.get_deferred_fields()]
+    posts = [post for post in posts if 'content' not in post.get_deferred_fields()]
+    pks = [post.pk for post in posts]
+    with transaction.atomic(), connection.cursor() as cursor:
+        if unchanged:
+            cursor.executemany(FTS_POST_TITLE_SQL, [(post.title, post.author_id, post.pk) for post in unchanged])
+        if pks:
+            cursor.execute("DELETE FROM blogs_post_fts WHERE rowid IN " + in_clause(pks), pks)
+            cursor.executemany(FTS_POST_SQL, [
+                (post.pk, post.title, post.content, post.author_id) for post in posts
+            ])
+
+
+def unindex_posts(pks):
+    # PostSearchTerm rows go away with the post through the FK cascade.
+    pks = list(pks)
+    if pks and uses_fts():
+        fts_execute("DELETE FROM blogs_post_fts WHERE rowid IN " + in_clause(pks), pks)
+
+
+def reindex_author(author):
+    if uses_fts():
+        fts_execute(FTS_AUTHOR_SQL, [author.name, author.pk])
+    else:
+        index_posts(author.posts.values_list('pk', flat=True))
+
+
+def rebuild_index():
+    if uses_fts():
+        posts = Post.objects.using(connection.alias).order_by('pk')
+        with transaction.atomic():
+            fts_execute("DELETE FROM blogs_post_fts")
+            last = 0
+            while True:
+                rows = fts_rows(posts.filter(pk__gt=last)[:FTS_CHUNK_SIZE])
+                if not rows:
+                    break
+                fts_insert(rows)
+                last = rows[-1][0]
+    else:
+        rebuild_term_index()
@@ -1,12 +1,46 @@
+from django.urls import reverse
 from rest_framework import serializers
+from rest_framework.exceptions import ValidationError
+from rest_framework.utils.urls import replace_query_param
 from .models import Author, Post, Comment
+from .pagination import encode_cursor
+
+class SparseFieldsMixin:
+    """
+    Renders only the fields named in the `fields` argument (a `?fields=`
+    list, see `requested_fields`), in the serializer's order. Without it,
+    every field but `Meta.optional_fields` is rendered.
+    """
+
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is None:
+            fields = set(self.fields) - set(getattr(self.Meta, 'optional_fields', ()))
+        for name in list(self.fields):
+            if name not in fields:
+                self.fields.pop(name)
+
+    @classmethod
+    def requested_fields(cls, query_params):
+        """The fields named by `?fields=a,b`, in the serializer's order; None without the parameter."""
+        value = query_params.get('fields')
+        if value is None:
+            return None
+        names = {name.strip() for name in value.split(',') if name.strip()}
+        if not names or not names.issubset(cls.Meta.fields):
+            raise ValidationError({'fields': "Expected a comma-separated list of: %s." % ', '.join(cls.Meta.fields)})
+        return [name for name in cls.Meta.fields if name in names]
+
 
 #task 1
-class PostSerializer(serializers.ModelSerializer):
+class PostSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     author_name = serializers.CharField(source='author.name', read_only=True)
     class Meta:
         model = Post
-        fields = ['title', 'content', 'published_date', 'author_name']
+        fields = ['id', 'title', 'content', 'excerpt', 'published_date', 'author_name', 'comment_count',
+                  'last_commented_at']
+        # Only with ?fields=. `excerpt` is the short alternative to `content`.
+        optional_fields = ['id', 'excerpt']
 
 #task2
 class CommentSerializer(serializers.ModelSerializer):
@@ -16,13 +50,31 @@ class CommentSerializer(serializers.ModelSerializer):
         model = Comment
         fields = ['id', 'content', 'user', 'created']
 
-class PostDetailSerializer(serializers.ModelSerializer):
+class PostDetailSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    """
+    Expects a post loaded through `post_detail_queryset`: `comments` holds only
+    the first page, prefetched into `comment_page`. The rest is reachable
+    through the `comments_next` link.
+    """
     author_name = serializers.CharField(source='author.name', read_only=True)
-    comments = CommentSerializer(many=True, read_only=True)  
+    comments = CommentSerializer(many=True, read_only=True, source='comment_page')
+    comments_next = serializers.SerializerMethodField()
 
     class Meta:
         model = Post
-        fields = ['id', 'title', 'content', 'published_date', 'author_name', 'status', 'active', 'comments']
+        fields = ['id', 'title', 'content', 'excerpt', 'published_date', 'author_name', 'status', 'active',
+                  'comment_count', 'last_commented_at', 'comments', 'comments_next']
+        optional_fields = ['excerpt']
+
+    def get_comments_next(self, obj):
+        if obj.comment_count <= len(obj.comment_page):
+            return None
+        last = obj.comment_page[-1]
+        url = reverse('api-comment-create', kwargs={'post_pk': obj.pk})
+        request = self.context.get('request')
+        if request is not None:
+            url = request.build_absolute_uri(url)
+        return replace_query_param(url, 'cursor', encode_cursor('created', last.created, last.pk))
 
 #task3
 class CommentCreateSerializer(serializers.ModelSerializer):
@@ -55,6 +107,25 @@ class PostCreateSerializer(serializers.ModelSerializer):
         return value
 
 
+class BulkPostSerializer(PostCreateSerializer):
+    """Per-item validation for bulk ingestion; title uniqueness is checked per batch."""
+
+    def validate_title(self, value):
+        if not value.strip():
+            raise serializers.ValidationError("Title cannot be empty.")
+        return value
+
+
+class BulkCommentSerializer(CommentCreateSerializer):
+    post = serializers.IntegerField()
+    user = serializers.CharField(required=False, allow_blank=True)
+    created = serializers.DateTimeField(required=False)
+
+    class Meta:
+        model = Comment
+        fields = ['post', 'content', 'user', 'created']
+
+
 #task5
 class PostEditSerializer(serializers.ModelSerializer):
     class Meta:
@@ -69,4 +140,14 @@ class PostEditSerializer(serializers.ModelSerializer):
     def validate_content(self, value):
         if len(value.strip()) < 10:
             raise serializers.ValidationError("Content should be at least 10 characters long.")
-        return value
\ No newline at end of file
+        return value
+
+
+class PostSearchResultSerializer(serializers.Serializer):
+    id = serializers.IntegerField(source='post.id')
+    title = serializers.CharField(source='post.title')
+    author_name = serializers.CharField(source='post.author.name')
+    published_date = serializers.DateTimeField(source='post.published_date')
+    rank = serializers.FloatField()
+    title_highlight = serializers.CharField()
+    snippet = serializers.CharField()
@@ -0,0 +1,116 @@
+from django.contrib.auth import get_user_model
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import ApiToken, Author, Comment, Post
+from . import authentication, authors, cache, counters, metrics, replicas, search
+
+
+User = get_user_model()
+
+
+# Keep the search index (FTS5 on SQLite, PostSearchTerm elsewhere) in sync.
+# Bulk writers that skip signals call `search.index_saved_posts` or
+# `search.index_posts` themselves.
+
+@receiver(post_save, sender=Post)
+def index_saved_post(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    search.index_saved_posts([instance])
+
+
+@receiver(post_delete, sender=Post)
+def unindex_deleted_post(sender, instance, **kwargs):
+    search.unindex_posts([instance.pk])
+
+
+@receiver(post_save, sender=Author)
+def reindex_author_posts(sender, instance, created=False, raw=False, **kwargs):
+    if created or raw:
+        return
+    search.reindex_author(instance)
+
+
+# Cached API responses are versioned; any change to what they render bumps
+# the matching generation counter.
+
+@receiver([post_save, post_delete], sender=Post)
+@receiver([post_save, post_delete], sender=Author)
+def invalidate_post_responses(sender, **kwargs):
+    cache.invalidate_posts()
+
+
+@receiver([post_save, post_delete], sender=Comment)
+def invalidate_commented_post(sender, instance, **kwargs):
+    cache.invalidate_post(instance.post_id)
+
+
+# Post.updated_at tracks the post's whole API representation, which also
+# renders the author name and the comments.
+
+@receiver(post_save, sender=Author)
+def touch_author_posts(sender, instance, created=False, raw=False, **kwargs):
+    if created or raw:
+        return
+    Post.objects.filter(author_id=instance.pk).update(updated_at=timezone.now())
+
+
+# Cached user -> author mapping used by the write endpoints.
+
+@receiver(pre_save, sender=Author)
+def forget_previous_author_user(sender, instance, raw=False, **kwargs):
+    # If the author moves to another user, the old user's entry goes too.
+    if instance._state.adding or raw:
+        return
+    authors.forget_user(
+        Author.objects.filter(pk=instance.pk).values_list('user_id', flat=True).first()
+    )
+
+
+@receiver([post_save, post_delete], sender=Author)
+def forget_author_user(sender, instance, **kwargs):
+    authors.forget_user(instance.user_id)
+
+
+# In-process caches of session users and API tokens.
+
+@receiver([post_save, post_delete], sender=User)
+def forget_cached_user(sender, instance, update_fields=None, **kwargs):
+    # Every login saves last_login, which nothing cached depends on.
+    if update_fields is not None and set(update_fields) == {'last_login'}:
+        return
+    authentication.forget_user(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=ApiToken)
+def forget_cached_token(sender, instance, **kwargs):
+    authentication.tokens.delete(instance.key_hash)
+
+
+# Denormalized comment statistics on Post, kept with single F() UPDATEs.
+
+@receiver(post_save, sender=Comment)
+def count_added_comment(sender, instance, created=False, raw=False, **kwargs):
+    if created and not raw:
+        counters.comment_added(instance)
+
+
+@receiver(post_delete, sender=Comment)
+def uncount_deleted_comment(sender, instance, origin=None, **kwargs):
+    # Comments cascading from a post or author delete have no post left to update.
+    if getattr(origin, 'model', type(origin)) is not Comment:
+        return
+    # Also moves updated_at: a deletion never advances last_commented_at.
+    counters.comment_removed(instance)
+
+
+# Query counts and times for the performance middleware.
+
+@receiver(connection_created)
+def time_connection_queries(sender, connection, **kwargs):
+    metrics.install_query_timer(connection)
+    # Query times of each replica, for the least-latency strategy.
+    replicas.install_latency_timer(connection)
@@ -0,0 +1,70 @@
+"""
+Template warm-up and the template bundle for production mode.
+
+In production (`DEBUG` off) templates go through Django's cached loader:
+each one is found and compiled once per process, then reused. `warm_templates`
+does that for every project template at worker boot, so the first requests do
+not pay for it. A bundle (see the `bundle_templates` command) holds the
+sources of all project templates in one JSON file, read with one open instead
+of a search through every template directory.
+"""
+import json
+import os
+import time
+
+from django.conf import settings
+from django.template import engines
+from django.template.loaders.locmem import Loader as LocmemLoader
+from django.template.utils import get_app_template_dirs
+
+
+def project_template_dirs():
+    """`DIRS` and the template directories of the project's own apps."""
+    engine = engines['django'].engine
+    base = str(settings.BASE_DIR)
+    app_dirs = [str(path) for path in get_app_template_dirs('templates') if str(path).startswith(base)]
+    return [str(path) for path in engine.dirs] + app_dirs
+
+
+def project_templates():
+    """Template name -> file, the first directory winning as in the loaders."""
+    templates = {}
+    for directory in project_template_dirs():
+        for root, _, files in os.walk(directory):
+            for filename in files:
+                if filename.endswith(('.html', '.txt')):
+                    path = os.path.join(root, filename)
+                    templates.setdefault(os.path.relpath(path, directory).replace(os.sep, '/'), path)
+    return templates
+
+
+def project_template_names():
+    return sorted(project_templates())
+
+
+def warm_templates(names=None):
+    """Compile `names` (all project templates by default); returns the seconds taken."""
+    start = time.perf_counter()
+    engine = engines['django'].engine
+    for name in names if names is not None else project_template_names():
+        engine.get_template(name)
+    return time.perf_counter() - start
+
+
+def write_bundle(path):
+    """Write the sources of all project templates, read from disk, to `path`."""
+    templates = {}
+    for name, filename in project_templates().items():
+        with open(filename, encoding=engines['django'].engine.file_charset) as f:
+            templates[name] = f.read()
+    with open(path, 'w') as f:
+        json.dump(templates, f, sort_keys=True)
+    return templates
+
+
+class BundleLoader(LocmemLoader):
+    """Serves templates from a JSON bundle written by `bundle_templates`."""
+
+    def __init__(self, engine, path):
+        with open(path) as f:
+            super().__init__(engine, json.load(f))
@@ -1,11 +1,19 @@
 from django.urls import path
-from .views import PostListAPIView, PostRetrieveAPIView, CommentCreateAPIView,PostCreateAPIView,PostUpdateAPIView, PostDeleteAPIView
+from .views import PostListAPIView, PostSearchAPIView, PostRetrieveAPIView, CommentCreateAPIView,PostCreateAPIView,PostUpdateAPIView, PostDeleteAPIView, CacheStatsAPIView, PostBulkCreateAPIView, CommentBulkCreateAPIView, QueuedCommentAPIView, ExportAPIView, AsyncPostListAPIView, AsyncPostRetrieveAPIView
 
 urlpatterns = [
     path('posts/', PostListAPIView.as_view(), name='api-post-list'),
+    path('posts/search/', PostSearchAPIView.as_view(), name='api-post-search'),
     path('posts/<int:pk>/', PostRetrieveAPIView.as_view(), name='api-post-detail'),
     path('posts/<int:post_pk>/comments/', CommentCreateAPIView.as_view(), name='api-comment-create'),
     path('posts/create/', PostCreateAPIView.as_view(), name='api-post-create'),
+    path('posts/bulk/', PostBulkCreateAPIView.as_view(), name='api-post-bulk-create'),
+    path('comments/bulk/', CommentBulkCreateAPIView.as_view(), name='api-comment-bulk-create'),
+    path('comments/queued/<uuid:token>/', QueuedCommentAPIView.as_view(), name='api-comment-queued'),
     path('posts/<int:pk>/edit/', PostUpdateAPIView.as_view(), name='api-post-edit'),
     path('posts/<int:pk>/delete/', PostDeleteAPIView.as_view(), name='api-post-delete'),
+    path('async/posts/', AsyncPostListAPIView.as_view(), name='api-async-post-list'),
+    path('async/posts/<int:pk>/', AsyncPostRetrieveAPIView.as_view(), name='api-async-post-detail'),
+    path('export/', ExportAPIView.as_view(), name='api-export'),
+    path('cache/stats/', CacheStatsAPIView.as_view(), name='api-cache-stats'),
 ]
@@ -1,32 +1,146 @@
-from django.urls import reverse_lazy
+from django.urls import reverse, reverse_lazy
+from django.views import View
 from django.views.generic import ListView, DetailView, CreateView
+from django.db import transaction
+from django.db.models import Prefetch
 from .models import Post, Author, Comment
 from .forms import CommentForm
+from django.http import Http404, HttpResponse, StreamingHttpResponse
 from django.shortcuts import render, redirect, get_object_or_404
 from rest_framework import generics,permissions, status
-from rest_framework.exceptions import ValidationError
+from rest_framework.exceptions import APIException, NotFound, ValidationError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
 from rest_framework.response import Response
-from .serializers import PostSerializer,PostDetailSerializer,CommentCreateSerializer,PostCreateSerializer,PostEditSerializer
+from rest_framework.settings import api_settings
+from .serializers import PostSerializer,PostDetailSerializer,CommentSerializer,CommentCreateSerializer,PostCreateSerializer,PostEditSerializer,PostSearchResultSerializer
+from django.conf import settings
 from django.utils import timezone
+from django.utils.functional import SimpleLazyObject
 from .permissions.post_permissions import IsPostCreator
+from .filters import filter_posts
+from .pagination import CommentCursorPagination, InvalidCursor, PostCursorPagination, keyset_page, keyset_queryset, paginate_keyset
+from .search import search_posts
+from .bulk import ingest_comments, ingest_posts
+from .export import CONTENT_TYPES, aiterate, export_stream
+from .conditional import ConditionalGetMixin, IfMatchMixin, make_etag, timestamp
+from .metrics import exposition
+from .compact import FastJSONRenderer, post_list_rows, serialize_posts
+from .authors import request_author_id
+from . import comment_queue
+from .comment_queue import QueuedCommentsVisibleMixin
+from .replicas import ReplicaReadMixin
+from .cache import CachedPageMixin, CachedResponseMixin, normalized_params, ANY_POST_GENERATION_KEY, POST_GENERATION_KEY, POSTS_GENERATION_KEY, stats as cache_stats
 
 
-class PostListView(ListView):
+# Columns behind PostDetailSerializer's fields, for ?fields= (`pk` is always read).
+POST_DETAIL_COLUMNS = {
+    'author_name': ['author__name'],
+    'comments': [],
+    'comments_next': ['comment_count'],
+}
+
+
+# The columns a post's ETag is built from.
+POST_VERSION_COLUMNS = ('updated_at', 'last_commented_at')
+
+
+def post_version(pk):
+    return Post.objects.filter(pk=pk).values_list(*POST_VERSION_COLUMNS).first()
+
+
+def post_validators(pk, version, fields=None):
+    """
+    `(etag, last_modified)` of post `pk` at `version` (see `post_version`).
+    The detail and edit endpoints share it, so an ETag read from one works as
+    `If-Match` on the other. A `?fields=` selection is another representation
+    and gets an ETag of its own.
+    """
+    updated_at, last_comment = version
+    last_modified = max(filter(None, [updated_at, last_comment]))
+    selection = [] if fields is None else ['fields'] + list(fields)
+    return make_etag(pk, updated_at, last_comment, *selection), timestamp(last_modified)
+
+
+def post_detail_queryset(fields=None):
+    """
+    Posts with their author and the first page of comments (with users) in
+    `comment_page`: two queries however many comments there are.
+
+    With `fields` (see `SparseFieldsMixin`), only what those fields need is
+    loaded: their columns, the author if named, the comments if named.
+    """
+    qs = Post.objects.all()
+    if fields is None or 'author_name' in fields:
+        qs = qs.select_related('author')
+    if fields is None or 'comments' in fields or 'comments_next' in fields:
+        first_page = (
+            Comment.objects.select_related('user')
+            .order_by('created', 'id')[:CommentCursorPagination.page_size]
+        )
+        qs = qs.prefetch_related(Prefetch('comments', queryset=first_page, to_attr='comment_page'))
+    if fields is not None:
+        columns = [column for name in fields for column in POST_DETAIL_COLUMNS.get(name, [name])]
+        if 'author__name' in columns:
+            columns.append('author')
+        qs = qs.only('pk', *columns)
+    return qs
+
+
+class PostListView(ReplicaReadMixin, CachedPageMixin, ListView):
     model = Post
     template_name = 'templates/post_list.html'  
     context_object_name = 'posts'
-    paginate_by = 10
+    page_size = 10
+    cache_scope = 'html-post-list'
+
+    def get_generation_keys(self):
+        # The page shows comment counts, which any post's comments change.
+        return [POSTS_GENERATION_KEY, ANY_POST_GENERATION_KEY]
 
     def get_queryset(self):
-       return Post.objects.select_related('author').all() 
+       # The cards show the stored excerpt, never the content.
+       return Post.objects.select_related('author').defer('content')
 
-class PostDetailView(DetailView):
+    def get_context_data(self, **kwargs):
+        # Keyset pagination instead of OFFSET: deep pages cost the same as the first one.
+        try:
+            page = paginate_keyset(self.object_list, self.request.GET.get('cursor'), self.page_size)
+        except InvalidCursor:
+            raise Http404("Invalid cursor")
+        kwargs[self.context_object_name] = page.object_list
+        kwargs['page_obj'] = page
+        kwargs['is_paginated'] = page.has_next or page.has_previous
+        return super().get_context_data(object_list=page.object_list, **kwargs)
+
+class PostDetailView(ReplicaReadMixin, QueuedCommentsVisibleMixin, CachedPageMixin, DetailView):
     model = Post
     template_name = 'templates/post_detail.html'
     context_object_name = 'post'
+    cache_scope = 'html-post-detail'
+
+    def get_generation_keys(self):
+        return [POSTS_GENERATION_KEY, POST_GENERATION_KEY % self.kwargs['pk']]
+
+    def get_queryset(self):
+        return Post.objects.select_related('author')
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
+        cursor = self.request.GET.get('comments_cursor') or ''
+        page_size = CommentCursorPagination.page_size
+        try:
+            comments, reverse = keyset_queryset(
+                self.object.comments.select_related('user'), cursor, page_size,
+                field='created', descending=False,
+            )
+        except InvalidCursor:
+            raise Http404("Invalid cursor")
+        # Only queried if the comments fragment is not cached.
+        context['comments'] = SimpleLazyObject(
+            lambda: keyset_page(list(comments), cursor, reverse, page_size, 'created')
+        )
+        context['comments_cursor'] = cursor
         context['form'] = CommentForm()
         return context
 
@@ -49,57 +163,258 @@ def add_comment(request, pk):
         if form.is_valid():
             comment = form.save(commit=False)
             comment.post = post
+            if comment_queue.enabled():
+                comment_queue.enqueue(request, post.pk, comment.content)
+                return comment_queue.set_writer_cookie(request, redirect('blogs:post-detail', pk=post.pk))
             if request.user.is_authenticated:
                 comment.user = request.user
-            comment.save()
+            # The comment and its post's counters commit together.
+            with transaction.atomic():
+                comment.save()
     return redirect('blogs:post-detail', pk=post.pk)
 
 
 #2. REST API with Django REST Framework
 
-class PostListAPIView(generics.ListAPIView):
+POST_LIST_ORDERINGS = {
+    '-published_date': 'published_date',
+    '-last_commented_at': 'last_commented_at',
+}
+
+
+def post_list_keyset_field(params):
+    ordering = params.get('ordering') or '-published_date'
+    if ordering not in POST_LIST_ORDERINGS:
+        raise ValidationError({'ordering': "Expected one of: %s." % ', '.join(POST_LIST_ORDERINGS)})
+    return POST_LIST_ORDERINGS[ordering]
+
+
+def post_list_queryset(params):
+    qs = Post.objects.filter(active=True).select_related('author')
+    if post_list_keyset_field(params) == 'last_commented_at':
+        # Most recent discussion first, from the denormalized column and its
+        # index; posts nobody has commented on yet are left out.
+        qs = qs.filter(last_commented_at__isnull=False).order_by('-last_commented_at', '-id')
+    return filter_posts(qs, params)
+
+
+class PostListAPIView(ReplicaReadMixin, CachedResponseMixin, ConditionalGetMixin, generics.ListAPIView):
     serializer_class = PostSerializer
+    pagination_class = PostCursorPagination
+    renderer_classes = [FastJSONRenderer] + [
+        renderer for renderer in api_settings.DEFAULT_RENDERER_CLASSES if renderer is not JSONRenderer
+    ]
+    cache_scope = 'post-list'
+
+    def get_generation_keys(self):
+        # Posts carry comment counts, which any post's comments change.
+        return [POSTS_GENERATION_KEY, ANY_POST_GENERATION_KEY]
+
+    def get_keyset_field(self):
+        return post_list_keyset_field(self.request.query_params)
 
     def get_queryset(self):
-        qs = Post.objects.filter(active=True).select_related('author')
+        return post_list_queryset(self.request.query_params)
+
+    def list(self, request, *args, **kwargs):
+        # PostSerializer's output, built from tuples (see blogs.compact).
+        fields = PostSerializer.requested_fields(request.query_params)
+        page = self.paginate_queryset(post_list_rows(self.get_queryset(), fields))
+        return self.get_paginated_response(serialize_posts(page, fields))
+
+    def get_validators(self):
+        # Versions of the rows on this page only, read with the page's own
+        # keyset query: bounded by the page size however many posts match.
+        # ETag only: a deleted post never moves the newest updated_at, so a
+        # Last-Modified date could wrongly answer 304. The row ids catch it.
+        keyset = self.paginator.get_keyset_kwargs(self.request, self)
+        rows = self.get_queryset().values_list('id', 'updated_at', 'last_commented_at', 'comment_count')
+        try:
+            rows, _ = keyset_queryset(rows, **keyset)
+        except InvalidCursor:
+            return None
+        # The row past the page only decides whether there is a next link.
+        rows = list(rows)
+        has_more = len(rows) > keyset['page_size']
         request = self.request
-        title = request.query_params.get('title')
-        author_name = request.query_params.get('author_name')
-        published_date = request.query_params.get('published_date')
-
-        start_date = self.request.data.get("start_date")
-        end_date = self.request.data.get("end_date")
-
-        if title:
-            qs = qs.filter(title__icontains=title)
-        if author_name:
-            qs = qs.filter(author__name__icontains=author_name)
-        # if published_date:
-        #     qs = qs.filter(published_date__date=published_date)
-
-        start_date = request.query_params.get('start_date')
-        end_date = request.query_params.get('end_date')
-        if start_date and end_date:
-            qs = qs.filter(
-                published_date__date__gte=start_date,
-                published_date__date__lte=end_date
-            )
-        elif start_date:
-            qs = qs.filter(published_date__date__gte=start_date)
-        elif end_date:
-            qs = qs.filter(published_date__date__lte=end_date)
-        
-        return qs
+        etag = make_etag(request.get_host(), normalized_params(request.query_params), has_more,
+                         *(part for row in rows[:keyset['page_size']] for part in row))
+        return etag, None
 
 
-class PostRetrieveAPIView(generics.RetrieveAPIView):
-    queryset = Post.objects.all().select_related('author')
+class PostSearchAPIView(generics.GenericAPIView):
+    serializer_class = PostSearchResultSerializer
+    default_limit = 20
+    max_limit = 100
+
+    def get_limit(self):
+        try:
+            limit = int(self.request.query_params.get('limit', self.default_limit))
+        except ValueError:
+            return self.default_limit
+        return min(max(limit, 1), self.max_limit)
+
+    def get(self, request, *args, **kwargs):
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            raise ValidationError({'q': "This query parameter is required."})
+        hits = search_posts(query, limit=self.get_limit())
+        serializer = self.get_serializer(hits, many=True)
+        return Response(serializer.data)
+
+
+class PostRetrieveAPIView(ReplicaReadMixin, QueuedCommentsVisibleMixin, CachedResponseMixin, ConditionalGetMixin,
+                          generics.RetrieveAPIView):
     serializer_class = PostDetailSerializer
+    cache_scope = 'post-detail'
+
+    def get_sparse_fields(self):
+        return PostDetailSerializer.requested_fields(self.request.query_params)
+
+    def get_queryset(self):
+        return post_detail_queryset(self.get_sparse_fields())
+
+    def get_serializer(self, *args, **kwargs):
+        kwargs.setdefault('fields', self.get_sparse_fields())
+        return super().get_serializer(*args, **kwargs)
+
+    def get_validators(self):
+        version = post_version(self.kwargs['pk'])
+        if version is None:
+            return None
+        return post_validators(self.kwargs['pk'], version, self.get_sparse_fields())
+
+    def get_generation_keys(self):
+        # Comments only invalidate the post they belong to.
+        return [POSTS_GENERATION_KEY, POST_GENERATION_KEY % self.kwargs['pk']]
+
+
+# Async read path, for the ASGI app (blogging_system/asgi.py).
+
+class AsyncReadAPIView(View):
+    """
+    Base for async read-only API views.
+
+    Handlers are coroutines that return plain data. It is rendered with DRF's
+    JSONRenderer, so the bodies are byte-for-byte those of the sync views, and
+    DRF API exceptions become the same JSON error responses. The request is
+    wrapped in a DRF `Request` for `query_params`; nothing here touches
+    authentication, so no session query runs.
+
+    These views are not cached and send no validators. Their purpose is to
+    keep a worker free while the database or a slow client is busy.
+    """
+    http_method_names = ['get', 'head', 'options']
+    renderer = FastJSONRenderer()
+
+    def render(self, data, status=200):
+        return HttpResponse(self.renderer.render(data), status=status,
+                            content_type=self.renderer.media_type)
+
+    async def dispatch(self, request, *args, **kwargs):
+        self.request = Request(request)
+        try:
+            response = await super().dispatch(self.request, *args, **kwargs)
+        except APIException as exc:
+            data = exc.detail if isinstance(exc.detail, (list, dict)) else {'detail': exc.detail}
+            return self.render(data, status=exc.status_code)
+        if isinstance(response, HttpResponse):
+            return response
+        return self.render(response)
+
+
+class AsyncPostListAPIView(AsyncReadAPIView):
+    """PostListAPIView with the async ORM: same filters, orderings and cursors."""
+    pagination_class = PostCursorPagination
+
+    def get_keyset_field(self):
+        return post_list_keyset_field(self.request.query_params)
+
+    async def get(self, request, *args, **kwargs):
+        fields = PostSerializer.requested_fields(request.query_params)
+        rows = post_list_rows(post_list_queryset(request.query_params), fields)
+        paginator = self.pagination_class()
+        page = await paginator.apaginate_queryset(rows, request, view=self)
+        paginated = paginator.get_paginated_response(serialize_posts(page, fields))
+        response = self.render(paginated.data)
+        if paginated.has_header('Link'):
+            response['Link'] = paginated['Link']
+        return response
+
+
+class AsyncPostRetrieveAPIView(AsyncReadAPIView):
+    """PostRetrieveAPIView with the async ORM."""
+
+    async def get(self, request, pk, *args, **kwargs):
+        fields = PostDetailSerializer.requested_fields(request.query_params)
+        try:
+            post = await post_detail_queryset(fields).aget(pk=pk)
+        except Post.DoesNotExist:
+            raise NotFound("No %s matches the given query." % Post._meta.object_name)
+        return PostDetailSerializer(post, context={'request': request}, fields=fields).data
+
+
+class ExportAPIView(generics.GenericAPIView):
+    """
+    Streams every post (or comment) matching the post list filters as NDJSON or
+    CSV: `?kind=posts|comments&output=ndjson|csv&gzip=1`. Memory use does not
+    depend on table size.
+    """
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request, *args, **kwargs):
+        params = request.query_params
+        kind = params.get('kind', 'posts')
+        output = params.get('output', 'ndjson')
+        if kind not in ('posts', 'comments'):
+            raise ValidationError({'kind': "Expected 'posts' or 'comments'."})
+        if output not in CONTENT_TYPES:
+            raise ValidationError({'output': "Expected 'ndjson' or 'csv'."})
+        gzip = params.get('gzip') in ('1', 'true')
+
+        filename = '%s.%s' % (kind, output)
+        content_type = CONTENT_TYPES[output]
+        if gzip:
+            filename += '.gz'
+            content_type = 'application/gzip'
+        chunks = export_stream(kind, output, params, gzip=gzip)
+        if hasattr(request._request, 'scope'):
+            # Under ASGI, keep streaming: see export.aiterate.
+            chunks = aiterate(chunks)
+        response = StreamingHttpResponse(chunks, content_type=content_type)
+        response['Content-Disposition'] = 'attachment; filename="%s"' % filename
+        return response
+
+
+class CacheStatsAPIView(generics.GenericAPIView):
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request, *args, **kwargs):
+        return Response(cache_stats.snapshot())
+
+
+def prometheus_metrics(request):
+    """
+    Request histograms recorded by PerformanceMiddleware, in the Prometheus
+    text format. Unauthenticated, for scrapers; keep it off the public
+    interface at the proxy.
+    """
+    return HttpResponse(exposition(), content_type='text/plain; version=0.0.4; charset=utf-8')
 
 
 #task3
-class CommentCreateAPIView(generics.CreateAPIView):
+class CommentCreateAPIView(QueuedCommentsVisibleMixin, generics.ListCreateAPIView):
     serializer_class = CommentCreateSerializer
+    pagination_class = CommentCursorPagination
+    post_kwarg = 'post_pk'
+
+    def get_queryset(self):
+        return Comment.objects.filter(post_id=self.kwargs.get('post_pk')).select_related('user')
+
+    def get_serializer_class(self):
+        if self.request.method == 'GET':
+            return CommentSerializer
+        return self.serializer_class
 
     def perform_create(self, serializer):
         post_pk = self.kwargs.get('post_pk')
@@ -109,14 +424,51 @@ class CommentCreateAPIView(generics.CreateAPIView):
             raise ValidationError("Cannot add comment to an inactive post.")
         
         user = self.request.user if self.request.user.is_authenticated else None
-        serializer.save(post=post, user=user)
+        with transaction.atomic():
+            serializer.save(post=post, user=user)
     
     def create(self, request, *args, **kwargs):
         try:
+            if comment_queue.enabled():
+                return self.enqueue(request)
             return super().create(request, *args, **kwargs)
         except ValidationError as exc:
             return Response({'detail': exc.detail}, status=status.HTTP_400_BAD_REQUEST)
 
+    def enqueue(self, request):
+        # Accepted now, stored by the next flush of the comment queue.
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        post_pk = int(self.kwargs.get('post_pk'))
+        active = Post.objects.filter(pk=post_pk).values_list('active', flat=True).first()
+        if active is None:
+            raise Http404
+        if not active:
+            raise ValidationError("Cannot add comment to an inactive post.")
+
+        token = comment_queue.enqueue(request, post_pk, serializer.validated_data['content'])
+        response = Response(
+            dict(serializer.data, token=str(token), status='queued'),
+            status=status.HTTP_202_ACCEPTED,
+            headers={'Location': reverse('api-comment-queued', kwargs={'token': token})},
+        )
+        return comment_queue.set_writer_cookie(request, response)
+
+
+class QueuedCommentAPIView(generics.RetrieveAPIView):
+    """A comment by its queue token: 202 while it is still queued, the comment once stored."""
+    serializer_class = CommentSerializer
+    queryset = Comment.objects.select_related('user')
+
+    def retrieve(self, request, *args, **kwargs):
+        comment = self.get_queryset().filter(token=kwargs['token']).first()
+        if comment is None:
+            return Response({'token': str(kwargs['token']), 'status': 'queued'}, status=status.HTTP_202_ACCEPTED)
+        return Response(dict(self.get_serializer(comment).data, post=comment.post_id, status='stored'))
+
+
+NOT_AN_AUTHOR = "You are not registered as an author and cannot create posts."
+
 
 #task 4
 class PostCreateAPIView(generics.CreateAPIView):
@@ -124,12 +476,11 @@ class PostCreateAPIView(generics.CreateAPIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def perform_create(self, serializer):
-        try:
-            author = Author.objects.get(user=self.request.user)
-        except Author.DoesNotExist:
-            raise ValidationError("You are not registered as an author and cannot create posts.")
-        
-        serializer.save(author=author, active=True)
+        author_id = request_author_id(self.request)
+        if author_id is None:
+            raise ValidationError(NOT_AN_AUTHOR)
+
+        serializer.save(author_id=author_id, active=True)
     
     def create(self, request, *args, **kwargs):
         response = super().create(request, *args, **kwargs)
@@ -139,16 +490,50 @@ class PostCreateAPIView(generics.CreateAPIView):
         )
 
 
+class BulkIngestMixin:
+    """Accepts a JSON list of items, bounded by `BLOG_BULK_MAX_ITEMS`."""
+
+    def get_items(self, request):
+        items = request.data
+        if not isinstance(items, list):
+            raise ValidationError("Expected a list of items.")
+        limit = getattr(settings, 'BLOG_BULK_MAX_ITEMS', 5000)
+        if len(items) > limit:
+            raise ValidationError("At most %d items can be sent per request." % limit)
+        return items
+
+
+class PostBulkCreateAPIView(BulkIngestMixin, generics.GenericAPIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request, *args, **kwargs):
+        items = self.get_items(request)
+        author_id = request_author_id(request)
+        if author_id is None:
+            raise ValidationError(NOT_AN_AUTHOR)
+        return Response(ingest_posts(items, author_id))
+
+
+class CommentBulkCreateAPIView(BulkIngestMixin, generics.GenericAPIView):
+    # Items may name any user as the comment author, so this is staff only.
+    permission_classes = [permissions.IsAdminUser]
+
+    def post(self, request, *args, **kwargs):
+        return Response(ingest_comments(self.get_items(request)))
+
+
 #task 5
-class PostUpdateAPIView(generics.RetrieveUpdateAPIView):
+class PostUpdateAPIView(IfMatchMixin, generics.RetrieveUpdateAPIView):
     queryset = Post.objects.all().select_related('author')
     serializer_class = PostEditSerializer
     permission_classes = [permissions.IsAuthenticated, IsPostCreator]
+    version_fields = POST_VERSION_COLUMNS
 
-    def get_object(self):
-        obj = super().get_object()
-        self.check_object_permissions(self.request, obj)
-        return obj
+    def get_validators(self):
+        version = self.get_version()
+        if version is None:
+            return None
+        return post_validators(self.kwargs['pk'], version)
 
 
 #task6
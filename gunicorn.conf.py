@@ -0,0 +1,91 @@
+"""
+Gunicorn settings for production serving; picked up automatically when
+gunicorn is started from the project root:
+
+    gunicorn                                # gthread workers, WSGI app
+    GUNICORN_WORKER_CLASS=uvicorn gunicorn  # uvicorn workers, ASGI app
+
+Every value can be overridden with the GUNICORN_* environment variables
+below. `kill -HUP <master pid>` reloads gracefully: new workers are started
+with the new code and old ones finish their in-flight requests first.
+"""
+import multiprocessing
+import os
+
+
+def env_int(name, default):
+    return int(os.environ.get(name, default))
+
+
+cpus = multiprocessing.cpu_count()
+worker_mode = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+
+if worker_mode == 'uvicorn':
+    # One event loop per worker serves many connections, so one worker per CPU.
+    worker_class = 'uvicorn.workers.UvicornWorker'
+    wsgi_app = 'blogging_system.asgi:application'
+    workers = env_int('GUNICORN_WORKERS', cpus)
+else:
+    # Threads overlap the time requests spend waiting on the database.
+    worker_class = 'gthread'
+    wsgi_app = 'blogging_system.wsgi:application'
+    workers = env_int('GUNICORN_WORKERS', cpus * 2 + 1)
+    threads = env_int('GUNICORN_THREADS', 4)
+
+# Import Django once in the master; workers share those pages copy-on-write
+# and start faster. Preloaded code is not reloaded by HUP, only by a restart.
+preload_app = os.environ.get('GUNICORN_PRELOAD', '1') == '1'
+
+# Recycle workers now and then so slow leaks cannot grow without bound; the
+# jitter keeps them from all restarting at once. A recycling gthread worker
+# resets connections it accepted but had not started on, so keep it rare.
+max_requests = env_int('GUNICORN_MAX_REQUESTS', 10000)
+max_requests_jitter = env_int('GUNICORN_MAX_REQUESTS_JITTER', 1000)
+
+# Behind a proxy that keeps connections open, keepalive must exceed the
+# proxy's idle timeout or requests race against the close.
+keepalive = env_int('GUNICORN_KEEPALIVE', 5)
+timeout = env_int('GUNICORN_TIMEOUT', 30)
+graceful_timeout = env_int('GUNICORN_GRACEFUL_TIMEOUT', 30)
+
+# Heartbeat files on tmpfs: in containers /tmp may be an overlay filesystem
+# whose writes can stall workers long enough to be killed.
+worker_tmp_dir = '/dev/shm' if os.path.isdir('/dev/shm') else None
+
+accesslog = os.environ.get('GUNICORN_ACCESSLOG') or None
+errorlog = '-'
+loglevel = os.environ.get('GUNICORN_LOGLEVEL', 'info')
+
+
+def post_fork(server, worker):
+    # Connections opened while preloading must not be shared across processes.
+    if server.cfg.preload_app:
+        from django.db import connections
+        connections.close_all()
+
+
+def warm_templates(log):
+    from blogs.template_cache import project_template_names, warm_templates as compile_templates
+    names = project_template_names()
+    log.info("Compiled %d templates in %.1f ms", len(names), compile_templates(names) * 1000)
+
+
+def when_ready(server):
+    # Preloaded: compile templates once in the master, workers inherit them.
+    if server.cfg.preload_app:
+        warm_templates(server.log)
+
+
+def post_worker_init(worker):
+    if not worker.cfg.preload_app:
+        warm_templates(worker.log)
+
+
+def child_exit(server, worker):
+    # Runs in the master: fold the worker's metrics file (BLOG_METRICS_DIR)
+    # into the retired totals so recycled workers leave no files behind.
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'blogging_system.settings')
+    from blogs.metrics import registry
+    registry.retire(worker.pid)
@@ -0,0 +1,46 @@
+import pytest
+from django.core.cache import cache
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+from rest_framework.test import APIClient
+from blogs.cache import stats
+from blogs.metrics import registry
+from blogs.models import Post, Author
+from blogs import authentication
+
+
+User = get_user_model()
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    # Cached API responses live in process memory and would leak between tests.
+    cache.clear()
+    stats.reset()
+    registry.reset()
+    authentication.tokens.clear()
+    authentication.users.clear()
+    yield
+    cache.clear()
+
+@pytest.fixture
+def user(db):
+    return User.objects.create_user(username="testuser", password="password123")
+
+@pytest.fixture
+def author(db, user):
+    return Author.objects.create(name="Test Author", email="author@example.com", user=user)
+
+@pytest.fixture
+def active_post(db, author):
+    return Post.objects.create(
+        title="Active Post",
+        content="This is an active post.",
+        published_date=timezone.now(),
+        author=author,
+        status="published",
+        active=True
+    )
+
+@pytest.fixture
+def api_client():
+    return APIClient()
@@ -0,0 +1,80 @@
+import datetime
+
+import pytest
+from django.urls import reverse
+from django.utils import timezone
+from blogs.models import Post, Comment
+
+@pytest.fixture
+def many_posts(db, author):
+    now = timezone.now()
+    posts = [
+        Post.objects.create(
+            title="Post %d" % i,
+            content="Content of post %d." % i,
+            published_date=now - datetime.timedelta(hours=i // 2),
+            author=author,
+            status="published",
+            active=True
+        )
+        for i in range(15)
+    ]
+    for i in range(3):
+        Comment.objects.create(post=posts[0], content="Comment %d" % i, user=author.user)
+    return posts
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('params', [
+    {},
+    {'page_size': 5},
+    {'title': 'Post 1', 'page_size': 2},
+    {'ordering': '-last_commented_at'},
+])
+def test_async_post_list_matches_sync(api_client, many_posts, params):
+    sync = api_client.get(reverse('api-post-list'), params)
+    async_ = api_client.get(reverse('api-async-post-list'), params)
+    assert async_.status_code == 200
+    assert async_['Content-Type'] == 'application/json'
+    expected = sync.content.replace(b'/api/posts/', b'/api/async/posts/')
+    assert async_.content == expected
+
+
+@pytest.mark.django_db
+def test_async_post_list_follows_cursors(api_client, many_posts):
+    data = api_client.get(reverse('api-async-post-list'), {'page_size': 4}).json()
+    seen = [post['title'] for post in data['results']]
+    while data['next']:
+        data = api_client.get(data['next']).json()
+        seen.extend(post['title'] for post in data['results'])
+    expected = Post.objects.order_by('-published_date', '-id').values_list('title', flat=True)
+    assert seen == list(expected)
+
+
+@pytest.mark.django_db
+def test_async_post_detail_matches_sync(api_client, many_posts):
+    pk = many_posts[0].pk
+    sync = api_client.get(reverse('api-post-detail', kwargs={'pk': pk}))
+    async_ = api_client.get(reverse('api-async-post-detail', kwargs={'pk': pk}))
+    assert async_.status_code == 200
+    assert async_.content == sync.content
+
+
+@pytest.mark.django_db
+def test_async_errors_match_sync(api_client, many_posts):
+    for sync_url, async_url, params in [
+        (reverse('api-post-detail', kwargs={'pk': 999}),
+         reverse('api-async-post-detail', kwargs={'pk': 999}), {}),
+        (reverse('api-post-list'), reverse('api-async-post-list'), {'cursor': 'bogus'}),
+        (reverse('api-post-list'), reverse('api-async-post-list'), {'ordering': 'title'}),
+        (reverse('api-post-list'), reverse('api-async-post-list'), {'start_date': 'soon'}),
+    ]:
+        sync = api_client.get(sync_url, params)
+        async_ = api_client.get(async_url, params)
+        assert (async_.status_code, async_.json()) == (sync.status_code, sync.json())
+
+
+@pytest.mark.django_db
+def test_async_views_are_read_only(api_client, many_posts):
+    response = api_client.post(reverse('api-async-post-list'), {})
+    assert response.status_code == 405
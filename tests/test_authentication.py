@@ -0,0 +1,123 @@
+import base64
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+from blogs.authentication import create_token
+from blogs.models import ApiToken
+from django.contrib.auth import get_user_model
+
+
+User = get_user_model()
+
+
+def auth_queries(queries):
+    return [query['sql'] for query in queries if 'auth_user' in query['sql'] or 'django_session' in query['sql']
+            or 'blogs_apitoken' in query['sql']]
+
+
+def edit_url(post):
+    return reverse('api-post-edit', kwargs={'pk': post.pk})
+
+
+@pytest.mark.django_db
+def test_token_authenticates_and_is_stored_hashed(api_client, user, active_post, capsys):
+    call_command('api_token', 'create', 'testuser', '--name', 'integration')
+    key = capsys.readouterr().out.strip()
+    token = ApiToken.objects.get()
+    assert token.prefix == key[:8] and key not in token.key_hash
+
+    api_client.credentials(HTTP_AUTHORIZATION='Token ' + key)
+    assert api_client.get(edit_url(active_post)).status_code == 200
+    api_client.credentials(HTTP_AUTHORIZATION='Bearer ' + key)
+    assert api_client.get(edit_url(active_post)).status_code == 200
+
+
+@pytest.mark.django_db
+def test_cached_token_needs_no_auth_queries(api_client, user, active_post):
+    _, key = create_token(user)
+    api_client.credentials(HTTP_AUTHORIZATION='Token ' + key)
+    with CaptureQueriesContext(connection) as first:
+        api_client.get(edit_url(active_post))
+    assert len(auth_queries(first.captured_queries)) == 1
+
+    with CaptureQueriesContext(connection) as second:
+        assert api_client.get(edit_url(active_post)).status_code == 200
+    assert auth_queries(second.captured_queries) == []
+
+
+@pytest.mark.django_db
+def test_other_users_changes_keep_cached_tokens(api_client, user, active_post):
+    _, key = create_token(user)
+    api_client.credentials(HTTP_AUTHORIZATION='Token ' + key)
+    api_client.get(edit_url(active_post))
+
+    other = User.objects.create_user(username="other", password="password123")
+    other.first_name = "Other"
+    other.save()
+    APIClient().login(username='testuser', password='password123')
+    with CaptureQueriesContext(connection) as context:
+        assert api_client.get(edit_url(active_post)).status_code == 200
+    assert auth_queries(context.captured_queries) == []
+
+
+@pytest.mark.django_db
+def test_session_request_needs_no_auth_queries(api_client, user, active_post):
+    api_client.force_login(user)
+    api_client.get(edit_url(active_post))
+    with CaptureQueriesContext(connection) as context:
+        assert api_client.get(edit_url(active_post)).status_code == 200
+    assert auth_queries(context.captured_queries) == []
+
+
+@pytest.mark.django_db
+def test_revoked_token_is_rejected_at_once(api_client, user, active_post, capsys):
+    _, key = create_token(user)
+    api_client.credentials(HTTP_AUTHORIZATION='Token ' + key)
+    assert api_client.get(edit_url(active_post)).status_code == 200
+
+    call_command('api_token', 'revoke', key[:8])
+    assert api_client.get(edit_url(active_post)).status_code == 403
+
+
+@pytest.mark.django_db
+def test_deactivated_user_is_rejected(api_client, user, active_post):
+    _, key = create_token(user)
+    api_client.credentials(HTTP_AUTHORIZATION='Token ' + key)
+    assert api_client.get(edit_url(active_post)).status_code == 200
+
+    user.is_active = False
+    user.save()
+    assert api_client.get(edit_url(active_post)).status_code == 403
+
+
+@pytest.mark.django_db
+def test_unknown_token_and_basic_auth_are_rejected(api_client, user, active_post):
+    api_client.credentials(HTTP_AUTHORIZATION='Token not-a-token')
+    assert api_client.get(edit_url(active_post)).status_code == 403
+
+    basic = base64.b64encode(b'testuser:password123').decode()
+    api_client.credentials(HTTP_AUTHORIZATION='Basic ' + basic)
+    assert api_client.get(edit_url(active_post)).status_code == 403
+
+
+@pytest.mark.django_db
+def test_undecodable_authorization_header_is_not_an_error(api_client, user, active_post):
+    # Sent as latin-1 bytes, which are not valid UTF-8.
+    api_client.credentials(HTTP_AUTHORIZATION='T\xf6ken abc')
+    assert api_client.get(edit_url(active_post)).status_code == 403
+    api_client.credentials(HTTP_AUTHORIZATION='Token \xff\xfe')
+    assert api_client.get(edit_url(active_post)).status_code == 403
+
+
+@pytest.mark.django_db
+def test_password_change_ends_sessions(api_client, user, active_post):
+    api_client.force_login(user)
+    assert api_client.get(edit_url(active_post)).status_code == 200
+
+    user.set_password('another-password')
+    user.save()
+    assert api_client.get(edit_url(active_post)).status_code == 403
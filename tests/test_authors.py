@@ -0,0 +1,94 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from blogs import authors
+from blogs.models import Post
+from django.contrib.auth import get_user_model
+
+
+User = get_user_model()
+
+
+def create_post(api_client, title):
+    return api_client.post(reverse('api-post-create'), {
+        "title": title,
+        "content": "This is the content of the new post.",
+        "published_date": timezone.now().isoformat(),
+    }, format='json')
+
+
+@pytest.mark.django_db
+def test_post_create_resolves_author_from_cache(api_client, user, author):
+    api_client.force_login(user)
+    assert create_post(api_client, "First").status_code == status.HTTP_201_CREATED
+
+    with CaptureQueriesContext(connection) as queries:
+        response = create_post(api_client, "Second")
+    assert response.status_code == status.HTTP_201_CREATED
+    assert not [q for q in queries if 'FROM "blogs_author"' in q['sql']]
+    assert Post.objects.get(title="Second").author == author
+
+
+@pytest.mark.django_db
+def test_author_changes_reach_the_cache(api_client, user, author):
+    other = User.objects.create_user(username="other", password="password123")
+    api_client.force_login(other)
+    assert create_post(api_client, "Not yet").status_code == status.HTTP_400_BAD_REQUEST
+
+    # Handing the author over to `other` drops both users' cached entries.
+    api_client.force_login(user)
+    assert create_post(api_client, "Mine").status_code == status.HTTP_201_CREATED
+    author.user = other
+    author.save()
+    assert create_post(api_client, "No longer").status_code == status.HTTP_400_BAD_REQUEST
+
+    api_client.force_login(other)
+    assert create_post(api_client, "Now mine").status_code == status.HTTP_201_CREATED
+
+    author.delete()
+    assert create_post(api_client, "Gone").status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.django_db
+def test_post_edit_checks_ownership_without_loading_users(api_client, user, author):
+    post = Post.objects.create(title="Post", content="Some content here.", author=author,
+                               status="published", active=True)
+    api_client.force_login(user)
+    with CaptureQueriesContext(connection) as queries:
+        response = api_client.put(reverse('api-post-edit', kwargs={'pk': post.pk}), {
+            "title": "Edited", "content": "Edited content of the post.", "active": True,
+        }, format='json')
+    assert response.status_code == status.HTTP_200_OK
+    # Only the session's own user row is loaded, never the author's.
+    assert len([q for q in queries if 'FROM "auth_user"' in q['sql']]) == 1
+
+    intruder = User.objects.create_user(username="intruder", password="password123")
+    api_client.force_login(intruder)
+    response = api_client.put(reverse('api-post-edit', kwargs={'pk': post.pk}), {
+        "title": "Hijacked", "content": "Hijacked content of the post.", "active": True,
+    }, format='json')
+    assert response.status_code == status.HTTP_403_FORBIDDEN
+
+
+@pytest.mark.django_db
+def test_author_lookups_expire(user, author, settings, monkeypatch):
+    def lookup_queries(user_id):
+        with CaptureQueriesContext(connection) as queries:
+            authors.author_id_for_user(user_id)
+        return len(queries)
+
+    assert lookup_queries(user.pk) == 1
+    assert lookup_queries(user.pk) == 0
+    settings.BLOG_AUTHOR_CACHE_TIMEOUT = 0
+    authors.forget_user(user.pk)
+    assert lookup_queries(user.pk) == 1
+    assert lookup_queries(user.pk) == 1
+
+    # Users without an author are remembered for a short time only.
+    other = User.objects.create_user(username="other", password="password123")
+    monkeypatch.setattr(authors, 'NO_AUTHOR_TIMEOUT', 0)
+    assert lookup_queries(other.pk) == 1
+    assert lookup_queries(other.pk) == 1
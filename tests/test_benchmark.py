@@ -0,0 +1,72 @@
+import json
+
+import pytest
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from blogs.models import Post, Author, Comment
+from blogs.benchmark import InProcessTransport, compare
+from blogs.search import search_posts
+
+
+@pytest.mark.django_db
+def test_generate_data_bulk_inserts_a_zipf_workload():
+    call_command('generate_data', authors=3, users=10, posts=200, comments=2000, seed=3)
+
+    assert Author.objects.count() == 3
+    assert Post.objects.count() == 200
+    assert Comment.objects.count() == 2000
+
+    counts = sorted(Post.objects.values_list('comment_count', flat=True), reverse=True)
+    assert sum(counts) == 2000
+    # Heavy head, long tail.
+    assert counts[0] > 10 * counts[len(counts) // 2]
+    top = Post.objects.order_by('-comment_count').first()
+    assert top.comment_count == top.comments.count()
+    assert top.last_commented_at == top.comments.latest('created').created
+
+    word = Post.objects.first().title.split()[0]
+    assert search_posts(word)
+
+
+@pytest.mark.django_db
+def test_benchmark_runs_in_process(tmp_path, settings):
+    # As configured outside the test run, where 'testserver' is not allowed.
+    settings.ALLOWED_HOSTS = ['127.0.0.1']
+    call_command('generate_data', authors=2, users=5, posts=30, comments=100)
+    output = tmp_path / 'run.json'
+    names = 'api-list[title+start_date],api-detail,api-comment-create,api-post-edit,api-post-delete,html-list'
+    call_command('benchmark', requests=3, scenarios=names, output=str(output))
+
+    report = json.loads(output.read_text())
+    assert report['meta']['target'] == 'in-process'
+    assert list(report['scenarios']) == names.split(',')
+    for result in report['scenarios'].values():
+        assert result['requests'] == 3
+        assert result['errors'] == 0
+
+    # The same run compared with itself is not a regression.
+    call_command('benchmark', requests=3, scenarios='api-detail', compare=str(output),
+                 threshold=10)
+
+
+def test_compare_flags_slower_runs():
+    baseline = {'api-detail': {'requests_per_s': 100.0, 'p99_ms': 10.0}}
+    assert compare(baseline, {'api-detail': {'requests_per_s': 95.0, 'p99_ms': 10.5}}, 0.1) == []
+    assert compare(baseline, {'api-detail': {'requests_per_s': 80.0, 'p99_ms': 20.0}}, 0.1) == [
+        ('api-detail', 'requests_per_s', 100.0, 80.0),
+        ('api-detail', 'p99_ms', 10.0, 20.0),
+    ]
+
+
+@pytest.mark.django_db
+def test_benchmark_rejects_unknown_scenarios():
+    with pytest.raises(CommandError):
+        call_command('benchmark', scenarios='nope')
+
+
+@pytest.mark.django_db
+def test_benchmark_fails_when_every_request_fails(monkeypatch):
+    call_command('generate_data', authors=2, users=5, posts=30, comments=100)
+    monkeypatch.setattr(InProcessTransport, 'request', lambda self, method, path, body=None: (500, None))
+    with pytest.raises(CommandError, match='api-detail'):
+        call_command('benchmark', requests=3, scenarios='api-detail')
@@ -0,0 +1,110 @@
+import json
+import pytest
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from blogs.models import Post, Comment
+from blogs import search
+from django.contrib.auth import get_user_model
+
+
+User = get_user_model()
+
+@pytest.fixture
+def existing_post(db, author):
+    return Post.objects.create(
+        title="Existing Post",
+        content="This post is already here.",
+        published_date=timezone.now(),
+        author=author,
+        status="published",
+        active=True
+    )
+
+
+@pytest.mark.django_db
+def test_bulk_create_posts(api_client, user, author, existing_post, django_assert_max_num_queries):
+    api_client.login(username='testuser', password='password123')
+    items = [
+        {"title": "Archive %d" % i, "content": "Archived content number %d." % i}
+        for i in range(300)
+    ]
+    items += [
+        {"title": "Existing Post", "content": "Clashes with a stored title."},
+        {"title": "Archive 0", "content": "Clashes with an earlier item."},
+        {"title": "Too short", "content": "short"},
+    ]
+
+    # Query count does not depend on the number of items.
+    with django_assert_max_num_queries(20):
+        response = api_client.post(reverse('api-post-bulk-create'), items, format='json')
+
+    assert response.status_code == status.HTTP_200_OK
+    data = response.json()
+    assert data['created'] == 300
+    assert data['failed'] == 3
+    assert [result['status'] for result in data['results'][-3:]] == ['error'] * 3
+    assert 'title' in data['results'][-2]['errors']
+    assert 'content' in data['results'][-1]['errors']
+
+    assert Post.objects.filter(author=author, active=True).count() == 301
+    assert [hit.post.title for hit in search.search_posts("archive 42")] == ["Archive 42"]
+    # The plain list is capped; the cached list was invalidated.
+    response = api_client.get(reverse('api-post-list'))
+    assert len(response.json()) == 100
+    assert response.json()[0]['title'] == "Archive 299"
+    assert 'rel="next"' in response['Link']
+
+
+@pytest.mark.django_db
+def test_bulk_create_posts_requires_author(api_client, user):
+    api_client.login(username='testuser', password='password123')
+    response = api_client.post(reverse('api-post-bulk-create'), [{"title": "x"}], format='json')
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.django_db
+def test_bulk_create_comments_is_staff_only(api_client, user, existing_post):
+    api_client.login(username='testuser', password='password123')
+    response = api_client.post(reverse('api-comment-bulk-create'), [], format='json')
+    assert response.status_code == status.HTTP_403_FORBIDDEN
+
+
+@pytest.mark.django_db
+def test_bulk_create_comments(api_client, user, existing_post):
+    User.objects.create_superuser(username="admin", password="password123")
+    api_client.login(username='admin', password='password123')
+    detail_url = reverse('api-post-detail', kwargs={'pk': existing_post.pk})
+    etag = api_client.get(detail_url)['ETag']
+
+    items = [{"post": existing_post.pk, "content": "Comment %d" % i, "user": "testuser"} for i in range(50)]
+    items += [
+        {"post": 999999, "content": "Missing post."},
+        {"post": existing_post.pk, "content": "Unknown user.", "user": "nobody"},
+        {"post": existing_post.pk, "content": "   "},
+    ]
+    data = api_client.post(reverse('api-comment-bulk-create'), items, format='json').json()
+
+    assert data['created'] == 50
+    assert data['failed'] == 3
+    assert Comment.objects.filter(post=existing_post, user=user).count() == 50
+    response = api_client.get(detail_url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()['comment_count'] == 50
+
+
+@pytest.mark.django_db
+def test_import_jsonl_command(tmp_path, author, existing_post, capsys):
+    path = tmp_path / "posts.jsonl"
+    lines = [json.dumps({"title": "Imported %d" % i, "content": "Imported content %d." % i}) for i in range(7)]
+    lines.insert(3, "")
+    lines.append(json.dumps({"title": "Existing Post", "content": "Duplicate title here."}))
+    path.write_text("\n".join(lines) + "\n")
+
+    call_command('import_jsonl', str(path), '--author', author.email, '--chunk-size', '3')
+
+    out, err = capsys.readouterr()
+    assert "Created 7 posts, 1 failed." in out
+    assert "line 9:" in err
+    assert Post.objects.filter(title__startswith="Imported").count() == 7
@@ -0,0 +1,101 @@
+import pytest
+from django.urls import reverse
+from blogs.models import Post, Comment
+from blogs.cache import stats
+from django.contrib.auth import get_user_model
+
+
+User = get_user_model()
+
+
+@pytest.mark.django_db
+def test_post_list_served_from_cache(api_client, active_post, django_assert_num_queries):
+    url = reverse('api-post-list')
+    first = api_client.get(url, {'title': 'Active', 'author_name': ''})
+    assert first['X-Cache'] == 'MISS'
+
+    # Same params in a different order, empty values dropped: same key, no queries.
+    with django_assert_num_queries(0):
+        second = api_client.get(url + '?author_name=&title=Active')
+    assert second['X-Cache'] == 'HIT'
+    assert second.json() == first.json()
+    assert stats.snapshot()['post-list'] == {'hits': 1, 'misses': 1}
+
+
+@pytest.mark.django_db
+def test_post_edit_invalidates_list_and_detail(api_client, user, active_post):
+    list_url = reverse('api-post-list')
+    detail_url = reverse('api-post-detail', kwargs={'pk': active_post.pk})
+    api_client.get(list_url)
+    api_client.get(detail_url)
+
+    api_client.login(username='testuser', password='password123')
+    api_client.put(reverse('api-post-edit', kwargs={'pk': active_post.pk}), {
+        "title": "Edited Title",
+        "content": "This is the edited content of the post.",
+        "active": True
+    }, format='json')
+
+    response = api_client.get(list_url)
+    assert response['X-Cache'] == 'MISS'
+    assert response.json()[0]['title'] == "Edited Title"
+    assert api_client.get(detail_url).json()['title'] == "Edited Title"
+
+    api_client.delete(reverse('api-post-delete', kwargs={'pk': active_post.pk}))
+    assert api_client.get(list_url).json() == []
+    assert api_client.get(detail_url).status_code == 404
+
+
+@pytest.mark.django_db
+def test_comment_invalidates_only_its_post(api_client, author, active_post):
+    other = Post.objects.create(title="Other", content="Other post content.", author=author,
+                                status="published", active=True)
+    detail_url = reverse('api-post-detail', kwargs={'pk': active_post.pk})
+    other_url = reverse('api-post-detail', kwargs={'pk': other.pk})
+    api_client.get(detail_url)
+    api_client.get(other_url)
+
+    api_client.post(reverse('api-comment-create', kwargs={'post_pk': active_post.pk}),
+                    {"content": "Fresh comment."}, format='json')
+
+    response = api_client.get(detail_url)
+    assert response['X-Cache'] == 'MISS'
+    assert response.json()['comment_count'] == 1
+    assert api_client.get(other_url)['X-Cache'] == 'HIT'
+
+
+@pytest.mark.django_db
+def test_comment_invalidates_list(api_client, active_post):
+    url = reverse('api-post-list')
+    first = api_client.get(url)
+    assert first.json()[0]['comment_count'] == 0
+    ordered = api_client.get(url, {'ordering': '-last_commented_at'})
+    assert ordered.json() == []
+
+    Comment.objects.create(post=active_post, content="A new comment.")
+    response = api_client.get(url, HTTP_IF_NONE_MATCH=first['ETag'])
+    assert response.status_code == 200
+    assert response['X-Cache'] == 'MISS'
+    assert response['ETag'] != first['ETag']
+    assert response.json()[0]['comment_count'] == 1
+    ordered = api_client.get(url, {'ordering': '-last_commented_at'}, HTTP_IF_NONE_MATCH=ordered['ETag'])
+    assert [post['title'] for post in ordered.json()] == ["Active Post"]
+
+
+@pytest.mark.django_db
+def test_author_rename_invalidates_list(api_client, author, active_post):
+    url = reverse('api-post-list')
+    api_client.get(url)
+    author.name = "Renamed"
+    author.save()
+    assert api_client.get(url).json()[0]['author_name'] == "Renamed"
+
+
+@pytest.mark.django_db
+def test_cache_stats_requires_admin(api_client, user):
+    url = reverse('api-cache-stats')
+    assert api_client.get(url).status_code == 403
+
+    User.objects.create_superuser(username="admin", password="password123")
+    api_client.login(username='admin', password='password123')
+    assert api_client.get(url).status_code == 200
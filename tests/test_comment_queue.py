@@ -0,0 +1,200 @@
+import json
+import os
+import threading
+import time
+import uuid
+
+import pytest
+from django.core.cache import cache as django_cache
+from django.core.management import call_command
+from django.test import Client, RequestFactory
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from blogs.models import Post, Comment
+from blogs.comment_queue import PENDING_KEY, Spool, WRITER_COOKIE, enqueue, flush, spool
+
+@pytest.fixture(autouse=True)
+def comment_queue(settings, tmp_path):
+    settings.BLOG_COMMENT_QUEUE = True
+    settings.BLOG_COMMENT_SPOOL_DIR = str(tmp_path / 'spool')
+    # Flushed by hand in the tests, not by a background thread.
+    settings.BLOG_COMMENT_QUEUE_WORKER = 'command'
+
+
+def entry(post, content="Spooled comment.", user=None):
+    return {'token': uuid.uuid4().hex, 'post': post.pk, 'user': user, 'content': content,
+            'created': timezone.now().isoformat()}
+
+
+@pytest.mark.django_db
+def test_comment_is_accepted_then_stored_by_flush(api_client, active_post, django_assert_num_queries):
+    url = reverse('api-comment-create', kwargs={'post_pk': active_post.pk})
+    # Only the post lookup: nothing is written to the database.
+    with django_assert_num_queries(1):
+        response = api_client.post(url, {"content": "Queued comment."}, format='json')
+    assert response.status_code == 202
+    token = response.json()['token']
+    assert response['Location'] == reverse('api-comment-queued', kwargs={'token': token})
+    assert not Comment.objects.exists()
+    assert api_client.get(response['Location']).status_code == 202
+
+    assert flush() == 1
+    comment = Comment.objects.get()
+    assert str(comment.token) == token and comment.content == "Queued comment."
+    active_post.refresh_from_db()
+    assert active_post.comment_count == 1
+    assert active_post.last_commented_at == comment.created
+
+    stored = api_client.get(response['Location'])
+    assert stored.status_code == 200
+    assert stored.json()['status'] == 'stored'
+
+
+@pytest.mark.django_db
+def test_queued_comment_is_validated(api_client, author, active_post):
+    url = reverse('api-comment-create', kwargs={'post_pk': active_post.pk})
+    assert api_client.post(url, {"content": "  "}, format='json').status_code == 400
+
+    inactive = Post.objects.create(title="Inactive", content="Inactive post.", author=author,
+                                   status="draft", active=False)
+    response = api_client.post(reverse('api-comment-create', kwargs={'post_pk': inactive.pk}),
+                               {"content": "Hello"}, format='json')
+    assert response.status_code == 400
+    response = api_client.post(reverse('api-comment-create', kwargs={'post_pk': 999999}),
+                               {"content": "Hello"}, format='json')
+    assert response.status_code == 404
+    assert not os.path.exists(spool().path)
+
+
+@pytest.mark.django_db
+def test_submitter_reads_own_comment(api_client, user, active_post):
+    api_client.force_login(user)
+    url = reverse('api-comment-create', kwargs={'post_pk': active_post.pk})
+    api_client.post(url, {"content": "My comment."}, format='json')
+
+    # Someone else does not flush the queue; the submitter's own read does.
+    assert APIClient().get(url).json()['results'] == []
+    results = api_client.get(url).json()['results']
+    assert [comment['content'] for comment in results] == ["My comment."]
+    assert results[0]['user'] == "testuser"
+
+
+@pytest.mark.django_db
+def test_submitter_read_stores_only_their_own_comments(api_client, user, active_post):
+    url = reverse('api-comment-create', kwargs={'post_pk': active_post.pk})
+    other = APIClient()
+    other.post(url, {"content": "Their comment."}, format='json')
+    api_client.force_login(user)
+    api_client.post(url, {"content": "My comment."}, format='json')
+
+    results = api_client.get(url).json()['results']
+    assert [comment['content'] for comment in results] == ["My comment."]
+    # The flush stores the rest, and the submitter's comment only once.
+    assert flush() == 1
+    assert sorted(Comment.objects.values_list('content', flat=True)) == ["My comment.", "Their comment."]
+    active_post.refresh_from_db()
+    assert active_post.comment_count == 2
+
+
+@pytest.mark.django_db
+def test_concurrent_enqueues_keep_every_pending_entry(user, active_post, monkeypatch):
+    cache = django_cache
+
+    class SlowCache:
+        # Widens the window between reading the pending entries and writing them back.
+        def get(self, key):
+            value = cache.get(key)
+            time.sleep(0.02)
+            return value
+
+        def set(self, key, value, timeout):
+            cache.set(key, value, timeout)
+    monkeypatch.setattr('blogs.comment_queue.django_cache', SlowCache())
+
+    request = RequestFactory().post('/')
+    request.user = user
+    threads = [threading.Thread(target=enqueue, args=(request, active_post.pk, "Comment %d" % i))
+               for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(cache.get(PENDING_KEY % ('user:%s' % user.pk))[active_post.pk]) == 4
+
+
+@pytest.mark.django_db
+def test_anonymous_submitter_reads_own_comment_on_the_page(active_post):
+    detail_url = reverse('blogs:post-detail', kwargs={'pk': active_post.pk})
+    visitor = Client()
+    visitor.get(detail_url)
+    response = visitor.post(reverse('blogs:add-comment', kwargs={'pk': active_post.pk}), {'content': 'Anonymous words.'})
+    assert response.status_code == 302
+    assert WRITER_COOKIE in response.cookies
+
+    assert b"Anonymous words." not in Client().get(detail_url).content
+    assert b"Anonymous words." in visitor.get(detail_url).content
+
+
+@pytest.mark.django_db
+def test_replayed_spool_stores_each_comment_once(active_post):
+    queue = spool()
+    first = entry(active_post)
+    queue.append(first)
+    assert flush() == 1
+
+    # A flush that died after storing, before removing its claimed file.
+    os.makedirs(queue.directory, exist_ok=True)
+    with open(os.path.join(queue.directory, 'comments.1.1.claimed'), 'w') as f:
+        f.write(json.dumps(first) + '\n' + json.dumps(entry(active_post, "Second.")) + '\n')
+    assert flush() == 1
+    assert sorted(Comment.objects.values_list('content', flat=True)) == ["Second.", "Spooled comment."]
+    active_post.refresh_from_db()
+    assert active_post.comment_count == 2
+    assert os.listdir(queue.directory) == []
+
+
+@pytest.mark.django_db
+def test_flush_skips_torn_lines_and_deleted_posts(author, active_post, user):
+    gone = Post.objects.create(title="Gone", content="Deleted soon.", author=author,
+                               status="published", active=True)
+    queue = spool()
+    queue.append(entry(gone))
+    queue.append(entry(active_post, user=user.pk))
+    with open(queue.path, 'a') as f:
+        f.write('{"token": "cut sho')
+    gone.delete()
+
+    assert flush() == 1
+    assert Comment.objects.get().user == user
+
+
+@pytest.mark.django_db
+def test_flush_skips_files_removed_after_claim(active_post, monkeypatch):
+    queue = spool()
+    queue.append(entry(active_post))
+    claim = Spool.claim
+
+    def claim_with_vanished_file(self):
+        return [os.path.join(self.directory, 'comments.0.0.claimed')] + claim(self)
+    monkeypatch.setattr(Spool, 'claim', claim_with_vanished_file)
+    assert flush() == 1
+
+
+def test_append_after_claim_goes_to_a_new_spool(tmp_path):
+    queue = Spool(str(tmp_path))
+    queue.append({'n': 1})
+    claimed = queue.claim()
+    queue.append({'n': 2})
+    with open(claimed[0]) as f:
+        assert queue.read(f) == [{'n': 1}]
+    with open(queue.path) as f:
+        assert queue.read(f) == [{'n': 2}]
+
+
+@pytest.mark.django_db
+def test_flush_comments_command(active_post, capsys):
+    spool().append(entry(active_post))
+    call_command('flush_comments')
+    assert "Stored 1 queued comments." in capsys.readouterr().out
+    assert Comment.objects.count() == 1
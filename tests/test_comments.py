@@ -0,0 +1,81 @@
+import pytest
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from blogs.models import Comment
+from blogs.pagination import CommentCursorPagination
+from blogs.counters import refresh_comment_stats
+from django.contrib.auth import get_user_model
+import datetime
+
+
+User = get_user_model()
+PAGE_SIZE = CommentCursorPagination.page_size
+
+def add_comments(post, count):
+    users = [User.objects.create_user(username="commenter%d-%d" % (post.pk, i)) for i in range(3)]
+    now = timezone.now()
+    Comment.objects.bulk_create([
+        Comment(post=post, content="Comment %d" % i, user=users[i % 3],
+                created=now + datetime.timedelta(seconds=i))
+        for i in range(count)
+    ])
+    refresh_comment_stats([post.pk])
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('count', [1, 5 * PAGE_SIZE])
+def test_post_detail_query_count_is_constant(api_client, active_post, count, django_assert_num_queries):
+    add_comments(active_post, count)
+    url = reverse('api-post-detail', kwargs={'pk': active_post.pk})
+    # ETag validators, then the post with its comment count, then one page of comments.
+    with django_assert_num_queries(3):
+        response = api_client.get(url)
+
+    data = response.json()
+    assert data['comment_count'] == count
+    assert len(data['comments']) == min(count, PAGE_SIZE)
+    assert data['comments'][0]['user'].startswith("commenter")
+
+
+@pytest.mark.django_db
+def test_post_detail_comments_next_walks_all_comments(api_client, active_post):
+    add_comments(active_post, 2 * PAGE_SIZE + 3)
+    data = api_client.get(reverse('api-post-detail', kwargs={'pk': active_post.pk})).json()
+
+    seen = [comment['content'] for comment in data['comments']]
+    url = data['comments_next']
+    while url:
+        page = api_client.get(url).json()
+        seen.extend(comment['content'] for comment in page['results'])
+        url = page['next']
+
+    assert seen == ["Comment %d" % i for i in range(2 * PAGE_SIZE + 3)]
+
+
+@pytest.mark.django_db
+def test_post_detail_without_more_comments(api_client, active_post):
+    add_comments(active_post, 2)
+    data = api_client.get(reverse('api-post-detail', kwargs={'pk': active_post.pk})).json()
+    assert data['comments_next'] is None
+
+
+@pytest.mark.django_db
+def test_comment_list_is_paginated(api_client, active_post):
+    add_comments(active_post, PAGE_SIZE + 1)
+    response = api_client.get(reverse('api-comment-create', kwargs={'post_pk': active_post.pk}))
+    assert response.status_code == status.HTTP_200_OK
+    assert len(response.json()['results']) == PAGE_SIZE
+    assert response.json()['next']
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('count', [1, 3 * PAGE_SIZE])
+def test_html_post_detail_query_count_is_constant(client, active_post, count, django_assert_num_queries):
+    add_comments(active_post, count)
+    url = reverse('blogs:post-detail', kwargs={'pk': active_post.pk})
+    # Post with its comment count, then one page of comments with their users.
+    with django_assert_num_queries(2):
+        response = client.get(url)
+    assert response.status_code == 200
+    assert len(response.context['comments']) == min(count, PAGE_SIZE)
@@ -0,0 +1,123 @@
+"""
+The post list fast path must produce PostSerializer's output byte for byte.
+Each seed generates a different set of posts: awkward text (quotes, control
+characters, line separators, astral characters), dates with and without
+microseconds, posts never commented on.
+"""
+import datetime
+import random
+
+import pytest
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from blogs.compact import FastJSONRenderer, post_list_rows, serialize_posts
+from blogs.models import Post, Author
+from blogs.serializers import PostSerializer
+from blogs.views import post_list_queryset
+from django.contrib.auth import get_user_model
+
+
+User = get_user_model()
+
+ALPHABET = ['a', 'Z', ' ', '"', '\\', '/', '\n', '\t', '\x00', '\x1f', '\x7f', '\xe9', '\u2028', '\u2029',
+            '\ufeff', '\u4e2d', '\U0001f600', '<', '&']
+
+
+def text(rng, max_length):
+    return ''.join(rng.choice(ALPHABET) for _ in range(rng.randint(1, max_length)))
+
+
+def moment(rng):
+    value = datetime.datetime(2020, 1, 1, tzinfo=datetime.timezone.utc) + datetime.timedelta(
+        seconds=rng.randint(0, 10 ** 8))
+    if rng.random() < 0.5:
+        value = value.replace(microsecond=rng.randint(0, 999999))
+    return value
+
+
+def generate(seed, count=12):
+    rng = random.Random(seed)
+    user = User.objects.create_user(username="writer%d" % seed)
+    authors = [
+        Author.objects.create(name=text(rng, 20), email="a%d-%d@example.com" % (seed, i), user=user)
+        for i in range(3)
+    ]
+    Post.objects.bulk_create([
+        Post(
+            title=text(rng, 40),
+            content=text(rng, 200),
+            published_date=moment(rng),
+            author=rng.choice(authors),
+            status='published',
+            active=True,
+            comment_count=rng.randint(0, 10 ** 6),
+            last_commented_at=moment(rng) if rng.random() < 0.7 else None,
+        )
+        for i in range(count)
+    ])
+
+
+def expected_bytes(data):
+    return JSONRenderer().render(data)
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('seed', range(20))
+def test_fast_path_matches_post_serializer(seed):
+    generate(seed)
+    queryset = post_list_queryset({}).order_by('-published_date', '-id')
+    expected = PostSerializer(queryset, many=True).data
+
+    data = serialize_posts(post_list_rows(queryset))
+    assert data == expected
+    assert FastJSONRenderer().render(data) == expected_bytes(expected)
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('fields', [['title'], ['id', 'excerpt', 'author_name'], ['content', 'last_commented_at'],
+                                    PostSerializer.Meta.fields])
+def test_sparse_fast_path_matches_post_serializer(fields):
+    generate(2)
+    queryset = post_list_queryset({}).order_by('-published_date', '-id')
+    expected = PostSerializer(queryset, many=True, fields=fields).data
+
+    data = serialize_posts(post_list_rows(queryset, fields), fields)
+    assert data == expected
+    assert FastJSONRenderer().render(data) == expected_bytes(expected)
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('zone', ['UTC', 'Asia/Kolkata', 'America/St_Johns'])
+def test_fast_path_matches_in_other_time_zones(zone):
+    generate(0)
+    queryset = post_list_queryset({}).order_by('-published_date', '-id')
+    with timezone.override(zone):
+        expected = PostSerializer(queryset, many=True).data
+        assert serialize_posts(post_list_rows(queryset)) == expected
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('params', [{}, {'page_size': 5}, {'page_size': 5, 'ordering': '-last_commented_at'}])
+def test_list_response_is_unchanged(params):
+    generate(1, count=15)
+    response = APIClient().get(reverse('api-post-list'), params)
+    paginated = 'page_size' in params
+
+    # Without page_size, the plain list: the first page in the same order.
+    field = 'last_commented_at' if params.get('ordering') else 'published_date'
+    queryset = post_list_queryset(params).order_by('-' + field, '-id')[:params.get('page_size', 100)]
+    expected = PostSerializer(queryset, many=True).data
+    body = response.json()
+    results = body['results'] if paginated else body
+    assert results == expected
+    assert response.content == expected_bytes(body)
+
+
+def test_renderer_falls_back_for_indented_output():
+    data = {'title': 'T\u2028', 'when': datetime.datetime(2024, 5, 1, tzinfo=datetime.timezone.utc)}
+    assert FastJSONRenderer().render(data) == JSONRenderer().render(data)
+    context = {'indent': 4}
+    assert FastJSONRenderer().render(data, renderer_context=context) == JSONRenderer().render(data, renderer_context=context)
+    assert FastJSONRenderer().render({1: 'non-string key'}) == JSONRenderer().render({1: 'non-string key'})
@@ -0,0 +1,201 @@
+import asyncio
+import gzip
+import random
+import re
+
+import pytest
+from django.test import Client, RequestFactory
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from blogs import compression
+from blogs.models import Post, Comment
+from django.contrib.auth import get_user_model
+
+
+User = get_user_model()
+
+@pytest.fixture
+def posts(db, author):
+    return [
+        Post.objects.create(
+            title="Post %d" % i,
+            content="Content of post %d. " % i * 60,
+            published_date=timezone.now(),
+            author=author,
+            status="published",
+            active=True
+        )
+        for i in range(5)
+    ]
+
+@pytest.fixture
+def gzip_codings(monkeypatch):
+    # The same results whether or not brotli and zstandard are installed.
+    monkeypatch.setattr(compression, 'available_codings', lambda: ['gzip'])
+
+@pytest.fixture
+def compress_calls(monkeypatch):
+    calls = []
+    compress = compression.compress
+
+    def counting(data, coding, level):
+        calls.append(coding)
+        return compress(data, coding, level)
+    monkeypatch.setattr(compression, 'compress', counting)
+    return calls
+
+
+def accepting(header):
+    return RequestFactory().get('/', HTTP_ACCEPT_ENCODING=header)
+
+
+@pytest.mark.parametrize('header,codings,expected', [
+    ('gzip, deflate', ['br', 'gzip'], 'gzip'),
+    ('gzip, br', ['br', 'gzip'], 'br'),
+    ('gzip;q=1.0, br;q=0.5', ['br', 'gzip'], 'gzip'),
+    ('br;q=0, *', ['br', 'gzip'], 'gzip'),
+    ('*;q=0', ['br', 'gzip'], None),
+    ('identity', ['gzip'], None),
+    ('', ['gzip'], None),
+    ('GZIP;Q=0.8', ['gzip'], 'gzip'),
+])
+def test_negotiation(header, codings, expected):
+    assert compression.negotiate(accepting(header), codings) == expected
+
+
+@pytest.mark.parametrize('seed', range(10))
+def test_stitched_gzip_is_one_valid_stream(seed):
+    rng = random.Random(seed)
+    words = [b'<div class="post">', b'comment', b'\x00\xff', b'csrf', b'\n']
+    parts = [b''.join(rng.choice(words) for _ in range(rng.randint(0, 3000))) for _ in range(rng.randint(1, 4))]
+    insert = bytes(rng.randrange(256) for _ in range(rng.randint(0, 100)))
+    stitched = compression.stitch_gzip(compression.deflate_segments(parts), parts, insert)
+    # gzip.decompress checks the CRC and length trailer too.
+    assert gzip.decompress(stitched) == insert.join(parts)
+
+
+def test_async_streams_are_compressed():
+    async def chunks():
+        for i in range(100):
+            yield b'line %d\n' % i
+
+    async def collect():
+        return b''.join([chunk async for chunk in compression.acompress_stream(chunks(), 'gzip', 5)])
+    assert gzip.decompress(asyncio.run(collect())) == b''.join(b'line %d\n' % i for i in range(100))
+
+
+@pytest.mark.django_db
+def test_api_list_is_compressed(posts, gzip_codings):
+    client = APIClient()
+    plain = client.get(reverse('api-post-list'))
+    assert 'Content-Encoding' not in plain
+    assert 'Accept-Encoding' in plain['Vary']
+
+    response = client.get(reverse('api-post-list'), HTTP_ACCEPT_ENCODING='gzip, deflate')
+    assert response['Content-Encoding'] == 'gzip'
+    assert int(response['Content-Length']) == len(response.content) < len(plain.content)
+    assert gzip.decompress(response.content) == plain.content
+
+
+@pytest.mark.django_db
+def test_small_bodies_are_not_compressed(db, gzip_codings):
+    response = APIClient().get(reverse('api-post-list'), HTTP_ACCEPT_ENCODING='gzip')
+    assert response.content == b'[]'
+    assert 'Content-Encoding' not in response
+
+
+@pytest.mark.django_db
+def test_cached_api_response_is_compressed_once(posts, gzip_codings, compress_calls):
+    client = APIClient()
+    url = reverse('api-post-detail', kwargs={'pk': posts[0].pk})
+    first = client.get(url, HTTP_ACCEPT_ENCODING='gzip')
+    assert first['X-Cache'] == 'MISS'
+    assert compress_calls == ['gzip']
+
+    for _ in range(3):
+        hit = client.get(url, HTTP_ACCEPT_ENCODING='gzip')
+        assert hit['X-Cache'] == 'HIT' and hit['Content-Encoding'] == 'gzip'
+        assert hit.content == first.content
+        assert hit['ETag'] == first['ETag'] == 'W/' + client.get(url)['ETag']
+        assert hit['Content-Type'] == first['Content-Type']
+    assert compress_calls == ['gzip']
+    assert gzip.decompress(first.content) == client.get(url).content
+
+
+@pytest.mark.django_db
+def test_compressed_etag_is_weak_and_matches(posts, gzip_codings):
+    client = APIClient()
+    client.login(username='testuser', password='password123')
+    url = reverse('api-post-edit', kwargs={'pk': posts[0].pk})
+    response = client.get(url, HTTP_ACCEPT_ENCODING='gzip')
+    assert response['Content-Encoding'] == 'gzip'
+    etag = response['ETag']
+    assert etag.startswith('W/"')
+    assert client.get(url, HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_NONE_MATCH=etag).status_code == 304
+
+    data = {"title": "Edited", "content": posts[0].content, "active": True}
+    assert client.put(url, data, format='json', HTTP_IF_MATCH=etag).status_code == 200
+    assert client.put(url, data, format='json', HTTP_IF_MATCH=etag).status_code == 412
+
+
+@pytest.mark.django_db
+def test_browsable_api_is_not_served_from_compressed_cache(posts, gzip_codings):
+    client = APIClient()
+    url = reverse('api-post-detail', kwargs={'pk': posts[0].pk})
+    client.get(url, HTTP_ACCEPT_ENCODING='gzip')
+    response = client.get(url, HTTP_ACCEPT_ENCODING='gzip', HTTP_ACCEPT='text/html')
+    assert response['Content-Type'].startswith('text/html')
+    assert gzip.decompress(response.content).lstrip().startswith(b'<!DOCTYPE html>')
+
+
+@pytest.mark.django_db
+def test_cached_page_is_stitched_around_the_csrf_token(posts, compress_calls):
+    url = reverse('blogs:post-detail', kwargs={'pk': posts[0].pk})
+    Client().get(url)
+
+    visitor = Client(enforce_csrf_checks=True)
+    response = visitor.get(url, HTTP_ACCEPT_ENCODING='gzip, br')
+    assert response['X-Cache'] == 'HIT' and response['Content-Encoding'] == 'gzip'
+    assert compress_calls == []
+    page = gzip.decompress(response.content)
+    token = re.search(rb'name="csrfmiddlewaretoken" value="([^"]+)"', page).group(1).decode()
+
+    # The same page as without compression, token aside.
+    plain = visitor.get(url)
+    assert 'Content-Encoding' not in plain
+    assert page.replace(token.encode(), b'TOKEN') == plain.content.replace(
+        re.search(rb'name="csrfmiddlewaretoken" value="([^"]+)"', plain.content).group(1), b'TOKEN')
+
+    response = visitor.post(reverse('blogs:add-comment', kwargs={'pk': posts[0].pk}),
+                            {'content': 'Hello', 'csrfmiddlewaretoken': token})
+    assert response.status_code == 302
+    assert Comment.objects.filter(post=posts[0]).count() == 1
+
+
+@pytest.mark.django_db
+def test_streaming_export_is_compressed(posts, gzip_codings):
+    User.objects.create_superuser(username="admin", password="password123")
+    client = APIClient()
+    client.login(username='admin', password='password123')
+    url = reverse('api-export')
+
+    plain = b''.join(client.get(url).streaming_content)
+    response = client.get(url, HTTP_ACCEPT_ENCODING='gzip')
+    assert response['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(b''.join(response.streaming_content)) == plain
+
+    # Already gzipped by the export itself.
+    response = client.get(url, {'gzip': '1'}, HTTP_ACCEPT_ENCODING='gzip')
+    assert 'Content-Encoding' not in response
+    assert gzip.decompress(b''.join(response.streaming_content)) == plain
+
+
+@pytest.mark.django_db
+def test_brotli_when_installed(posts):
+    brotli = pytest.importorskip('brotli')
+    client = APIClient()
+    plain = client.get(reverse('api-post-list'))
+    response = client.get(reverse('api-post-list'), HTTP_ACCEPT_ENCODING='gzip, br')
+    assert response['Content-Encoding'] == 'br'
+    assert brotli.decompress(response.content) == plain.content
@@ -0,0 +1,152 @@
+import pytest
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from blogs.models import Post, Comment
+from blogs.serializers import PostEditSerializer
+from django.contrib.auth import get_user_model
+
+
+User = get_user_model()
+
+
+@pytest.mark.django_db
+def test_post_detail_if_none_match(api_client, active_post, django_assert_num_queries):
+    url = reverse('api-post-detail', kwargs={'pk': active_post.pk})
+    first = api_client.get(url)
+    etag = first['ETag']
+    assert etag.startswith('"') and first['Last-Modified']
+
+    with django_assert_num_queries(0):
+        response = api_client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+    assert response['ETag'] == etag
+
+    Comment.objects.create(post=active_post, content="A new comment.")
+    response = api_client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == status.HTTP_200_OK
+    assert response['ETag'] != etag
+
+
+@pytest.mark.django_db
+def test_post_detail_if_modified_since(api_client, active_post):
+    url = reverse('api-post-detail', kwargs={'pk': active_post.pk})
+    last_modified = api_client.get(url)['Last-Modified']
+    response = api_client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+
+@pytest.mark.django_db
+def test_post_list_etag_changes_on_delete(api_client, author, active_post):
+    other = Post.objects.create(title="Other", content="Other post content.", author=author,
+                                status="published", active=True)
+    url = reverse('api-post-list')
+    etag = api_client.get(url)['ETag']
+    assert api_client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == status.HTTP_304_NOT_MODIFIED
+
+    other.delete()
+    assert api_client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == status.HTTP_200_OK
+
+
+@pytest.mark.django_db
+def test_post_list_etag_covers_its_page_only(api_client, author, active_post):
+    older = Post.objects.create(title="Older", content="Older post content.", author=author,
+                                published_date=timezone.now() - timezone.timedelta(days=1),
+                                status="published", active=True)
+    url = reverse('api-post-list') + '?page_size=1'
+    first = api_client.get(url)
+    assert [post['title'] for post in first.json()['results']] == ["Active Post"]
+    etag = first['ETag']
+
+    # Off the page: the first page is still current.
+    older.title = "Renamed"
+    older.save()
+    assert api_client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == status.HTTP_304_NOT_MODIFIED
+
+    active_post.title = "Renamed"
+    active_post.save()
+    assert api_client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == status.HTTP_200_OK
+
+
+@pytest.mark.django_db
+def test_post_detail_etag_changes_on_author_rename(api_client, author, active_post):
+    url = reverse('api-post-detail', kwargs={'pk': active_post.pk})
+    etag = api_client.get(url)['ETag']
+    author.name = "Renamed"
+    author.save()
+    response = api_client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()['author_name'] == "Renamed"
+
+
+@pytest.mark.django_db
+def test_post_edit_if_match(api_client, user, active_post):
+    api_client.login(username='testuser', password='password123')
+    url = reverse('api-post-edit', kwargs={'pk': active_post.pk})
+    etag = api_client.get(url)['ETag']
+    data = {
+        "title": "Updated Title",
+        "content": "This is the updated content for the post.",
+        "active": True
+    }
+
+    response = api_client.put(url, data, format='json', HTTP_IF_MATCH=etag)
+    assert response.status_code == status.HTTP_200_OK
+
+    # The first write moved the ETag, so a second write with the old one is rejected.
+    data["title"] = "Lost Update"
+    response = api_client.put(url, data, format='json', HTTP_IF_MATCH=etag)
+    assert response.status_code == status.HTTP_412_PRECONDITION_FAILED
+    active_post.refresh_from_db()
+    assert active_post.title == "Updated Title"
+
+
+@pytest.mark.django_db
+def test_post_detail_etag_works_for_edits(api_client, user, active_post):
+    Comment.objects.create(post=active_post, content="A comment.")
+    detail_url = reverse('api-post-detail', kwargs={'pk': active_post.pk})
+    etag = api_client.get(detail_url)['ETag']
+    # Another selection of fields is another representation.
+    assert api_client.get(detail_url, {'fields': 'title'})['ETag'] != etag
+
+    api_client.login(username='testuser', password='password123')
+    url = reverse('api-post-edit', kwargs={'pk': active_post.pk})
+    response = api_client.patch(url, {"title": "Edited"}, format='json', HTTP_IF_MATCH=etag)
+    assert response.status_code == status.HTTP_200_OK
+
+
+@pytest.mark.django_db
+def test_post_edit_can_require_if_match(api_client, user, active_post, settings):
+    settings.BLOG_REQUIRE_IF_MATCH = True
+    api_client.login(username='testuser', password='password123')
+    url = reverse('api-post-edit', kwargs={'pk': active_post.pk})
+    response = api_client.patch(url, {"title": "No precondition"}, format='json')
+    assert response.status_code == status.HTTP_428_PRECONDITION_REQUIRED
+
+
+@pytest.mark.django_db
+def test_post_edit_if_match_is_checked_with_the_write(api_client, user, active_post, monkeypatch):
+    api_client.login(username='testuser', password='password123')
+    url = reverse('api-post-edit', kwargs={'pk': active_post.pk})
+    etag = api_client.get(url)['ETag']
+
+    # Another client saves between this request's If-Match check and its write.
+    validate = PostEditSerializer.validate
+
+    def concurrent_edit(serializer, attrs):
+        Post.objects.filter(pk=active_post.pk).update(title="Theirs", updated_at=timezone.now())
+        return validate(serializer, attrs)
+    monkeypatch.setattr(PostEditSerializer, 'validate', concurrent_edit)
+    response = api_client.patch(url, {"title": "Mine"}, format='json', HTTP_IF_MATCH=etag)
+    assert response.status_code == status.HTTP_412_PRECONDITION_FAILED
+    active_post.refresh_from_db()
+    assert active_post.title == "Theirs"
+
+
+@pytest.mark.django_db
+def test_post_edit_checks_permission_before_if_match(api_client, active_post):
+    User.objects.create_user(username="other", password="password123")
+    api_client.login(username='other', password='password123')
+    url = reverse('api-post-edit', kwargs={'pk': active_post.pk})
+    response = api_client.patch(url, {"title": "Not mine"}, format='json', HTTP_IF_MATCH='"stale"')
+    assert response.status_code == status.HTTP_403_FORBIDDEN
@@ -0,0 +1,104 @@
+import datetime
+import pytest
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+from blogs.models import Post, Comment
+
+def create_post(author, title):
+    return Post.objects.create(
+        title=title,
+        content="Content of %s." % title,
+        published_date=timezone.now(),
+        author=author,
+        status="published",
+        active=True
+    )
+
+
+@pytest.mark.django_db
+def test_comment_creation_updates_counters(api_client, client, author):
+    post = create_post(author, "Counted")
+    api_client.post(reverse('api-comment-create', kwargs={'post_pk': post.pk}),
+                    {"content": "Through the API."}, format='json')
+    client.post(reverse('blogs:add-comment', kwargs={'pk': post.pk}), {"content": "Through the form."})
+
+    post.refresh_from_db()
+    latest = Comment.objects.filter(post=post).latest('created')
+    assert post.comment_count == 2
+    assert post.last_commented_at == latest.created
+
+
+@pytest.mark.django_db
+def test_comment_deletion_updates_counters(author):
+    post = create_post(author, "Counted")
+    now = timezone.now()
+    older = Comment.objects.create(post=post, content="Older", created=now - datetime.timedelta(hours=1))
+    newer = Comment.objects.create(post=post, content="Newer", created=now)
+
+    newer.delete()
+    post.refresh_from_db()
+    assert post.comment_count == 1
+    assert post.last_commented_at == older.created
+
+    older.delete()
+    post.refresh_from_db()
+    assert post.comment_count == 0
+    assert post.last_commented_at is None
+
+
+@pytest.mark.django_db
+def test_comment_deletion_with_drifted_counter(author):
+    post = create_post(author, "Drifted")
+    comment = Comment.objects.create(post=post, content="Uncounted")
+    Post.objects.filter(pk=post.pk).update(comment_count=0)
+
+    comment.delete()
+    post.refresh_from_db()
+    assert post.comment_count == 0
+
+
+@pytest.mark.django_db
+def test_post_delete_cascades_without_recounting(author, django_assert_max_num_queries):
+    post = create_post(author, "Doomed")
+    for i in range(20):
+        Comment.objects.create(post=post, content="Comment %d" % i)
+    with django_assert_max_num_queries(10):
+        post.delete()
+
+
+@pytest.mark.django_db
+def test_post_list_ordering_by_activity(api_client, author):
+    quiet = create_post(author, "Quiet")
+    old_thread = create_post(author, "Old thread")
+    hot_thread = create_post(author, "Hot thread")
+    now = timezone.now()
+    Comment.objects.create(post=old_thread, content="Long ago", created=now - datetime.timedelta(days=3))
+    Comment.objects.create(post=hot_thread, content="Just now", created=now)
+
+    url = reverse('api-post-list')
+    data = api_client.get(url, {'ordering': '-last_commented_at'}).json()
+    assert [post['title'] for post in data] == ["Hot thread", "Old thread"]
+    assert data[0]['comment_count'] == 1
+
+    page = api_client.get(url, {'ordering': '-last_commented_at', 'page_size': 1}).json()
+    assert [post['title'] for post in page['results']] == ["Hot thread"]
+    page = api_client.get(page['next']).json()
+    assert [post['title'] for post in page['results']] == ["Old thread"]
+    assert page['next'] is None
+
+    assert api_client.get(url, {'ordering': 'title'}).status_code == 400
+
+
+@pytest.mark.django_db
+def test_reconcile_comment_counts(author, capsys):
+    post = create_post(author, "Drifted")
+    Comment.objects.bulk_create([Comment(post=post, content="Bulk %d" % i) for i in range(3)])
+    create_post(author, "Fine")
+
+    call_command('reconcile_comment_counts', '--chunk-size', '1')
+
+    post.refresh_from_db()
+    assert post.comment_count == 3
+    assert post.last_commented_at is not None
+    assert "Checked 2 posts, repaired 1" in capsys.readouterr().out
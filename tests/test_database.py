@@ -0,0 +1,41 @@
+import pytest
+from django.db import connection
+
+from blogging_system.sqlite_backend.base import DatabaseWrapper
+
+
+@pytest.fixture
+def file_connection(tmp_path):
+    settings_dict = dict(connection.settings_dict, NAME=str(tmp_path / 'db.sqlite3'))
+    conn = DatabaseWrapper(settings_dict, alias='pragma-test')
+    yield conn
+    conn.close()
+
+
+def pragma(conn, name):
+    with conn.cursor() as cursor:
+        cursor.execute('PRAGMA %s' % name)
+        return cursor.fetchone()[0]
+
+
+@pytest.mark.django_db
+def test_sqlite_connection_pragmas(file_connection):
+    assert pragma(file_connection, 'journal_mode') == 'wal'
+    assert pragma(file_connection, 'synchronous') == 1  # NORMAL
+    assert pragma(file_connection, 'busy_timeout') == 5000
+    assert pragma(file_connection, 'temp_store') == 2  # MEMORY
+
+
+@pytest.mark.django_db
+def test_sqlite_transactions_begin_immediate(file_connection):
+    queries = []
+
+    def record(execute, sql, params, many, context):
+        queries.append(sql)
+        return execute(sql, params, many, context)
+
+    file_connection.ensure_connection()
+    with file_connection.execute_wrapper(record):
+        file_connection._start_transaction_under_autocommit()
+    file_connection.connection.rollback()
+    assert queries == ['BEGIN IMMEDIATE']
@@ -0,0 +1,132 @@
+import json
+import os
+import re
+import threading
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from blogs.metrics import registry
+from blogs.models import Post, Comment
+
+@pytest.fixture
+def active_post(db, author):
+    post = Post.objects.create(
+        title="Active Post",
+        content="This is an active post.",
+        published_date=timezone.now(),
+        author=author,
+        status="published",
+        active=True
+    )
+    Comment.objects.create(post=post, content="A comment", user=author.user)
+    return post
+
+
+def timing_queries(response):
+    return int(re.search(r'db;dur=[\d.]+;desc="(\d+) queries"', response['Server-Timing']).group(1))
+
+
+@pytest.mark.django_db
+def test_server_timing_counts_queries(api_client, active_post):
+    url = reverse('api-post-detail', kwargs={'pk': active_post.pk})
+    with CaptureQueriesContext(connection) as queries:
+        response = api_client.get(url)
+    assert timing_queries(response) == len(queries) > 0
+    assert 'render;dur=' in response['Server-Timing']
+    assert 'total;dur=' in response['Server-Timing']
+
+    # Served from the response cache: no queries at all.
+    assert timing_queries(api_client.get(url)) == 0
+
+
+@pytest.mark.django_db
+def test_async_view_queries_are_counted(api_client, active_post):
+    response = api_client.get(reverse('api-async-post-detail', kwargs={'pk': active_post.pk}))
+    assert timing_queries(response) == 2
+
+
+@pytest.mark.django_db
+def test_metrics_endpoint_aggregates_per_route(api_client, active_post):
+    for _ in range(3):
+        api_client.get(reverse('api-post-list'), {'page_size': 5})
+    api_client.get('/no/such/page/')
+
+    body = api_client.get(reverse('metrics')).content.decode()
+    assert '# TYPE blog_http_request_duration_seconds histogram' in body
+    assert 'blog_http_requests_total{method="GET",route="api-post-list",status="200"} 3' in body
+    assert 'blog_http_request_duration_seconds_count{method="GET",route="api-post-list"} 3' in body
+    assert 'blog_http_db_queries_bucket{method="GET",route="api-post-list",le="+Inf"} 3' in body
+    assert 'route="<unmatched>",status="404"' in body
+
+
+@pytest.mark.django_db
+def test_requests_over_budget_are_flagged(api_client, active_post, settings, caplog):
+    settings.BLOG_QUERY_BUDGET = 0
+    api_client.get(reverse('api-post-detail', kwargs={'pk': active_post.pk}))
+
+    assert 'over budget' in caplog.text
+    body = api_client.get(reverse('metrics')).content.decode()
+    assert 'blog_http_budget_exceeded_total{budget="queries",method="GET",route="api-post-detail"} 1' in body
+
+
+@pytest.mark.django_db
+def test_metrics_are_merged_across_processes(api_client, active_post, settings, tmp_path):
+    settings.BLOG_METRICS_DIR = str(tmp_path)
+    other_worker = [[
+        'blog_http_requests_total',
+        [['method', 'GET'], ['route', 'api-post-list'], ['status', 200]],
+        5,
+    ]]
+    (tmp_path / 'metrics-1.json').write_text(json.dumps(other_worker))
+
+    api_client.get(reverse('api-post-list'))
+    body = api_client.get(reverse('metrics')).content.decode()
+    assert 'blog_http_requests_total{method="GET",route="api-post-list",status="200"} 6' in body
+
+
+@pytest.mark.django_db
+def test_exited_worker_files_are_retired(api_client, active_post, settings, tmp_path):
+    settings.BLOG_METRICS_DIR = str(tmp_path)
+    rows = [['blog_http_requests_total', [['method', 'GET'], ['route', 'api-post-list'], ['status', 200]], 5]]
+    (tmp_path / 'metrics-1.json').write_text(json.dumps(rows))
+    (tmp_path / 'metrics-2.json').write_text(json.dumps(rows))
+
+    registry.retire(1)
+    registry.retire(2)
+    registry.retire(3)
+    assert sorted(path.name for path in tmp_path.iterdir()) == ['metrics-retired.json']
+
+    api_client.get(reverse('api-post-list'))
+    body = api_client.get(reverse('metrics')).content.decode()
+    assert 'blog_http_requests_total{method="GET",route="api-post-list",status="200"} 11' in body
+
+
+def test_concurrent_flushes_do_not_collide(settings, tmp_path):
+    settings.BLOG_METRICS_DIR = str(tmp_path)
+    errors = []
+
+    def flush_often():
+        try:
+            for _ in range(200):
+                registry.maybe_flush(force=True)
+        except Exception as exc:
+            errors.append(exc)
+    threads = [threading.Thread(target=flush_often) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert [path.name for path in tmp_path.iterdir()] == ['metrics-%d.json' % os.getpid()]
+
+
+@pytest.mark.django_db
+def test_unwritable_metrics_dir_does_not_fail_requests(api_client, active_post, settings, tmp_path):
+    not_a_directory = tmp_path / 'file'
+    not_a_directory.write_text('')
+    settings.BLOG_METRICS_DIR = str(not_a_directory)
+    assert api_client.get(reverse('api-post-list')).status_code == 200
+    assert api_client.get(reverse('metrics')).status_code == 200
@@ -0,0 +1,102 @@
+import re
+
+import pytest
+from django.test import Client
+from django.urls import reverse
+from blogs.models import Comment
+from blogs.cache import stats
+
+
+def csrf_input(response):
+    return re.search(r'name="csrfmiddlewaretoken" value="([^"]*)"', response.content.decode()).group(1)
+
+
+@pytest.mark.django_db
+def test_anonymous_detail_page_served_from_cache(client, active_post, django_assert_num_queries):
+    url = reverse('blogs:post-detail', kwargs={'pk': active_post.pk})
+    first = client.get(url)
+    assert first['X-Cache'] == 'MISS'
+
+    with django_assert_num_queries(0):
+        second = Client().get(url)
+    assert second['X-Cache'] == 'HIT'
+    assert b"This is an active post." in second.content
+    assert stats.snapshot()['html-post-detail'] == {'hits': 1, 'misses': 1}
+
+
+@pytest.mark.django_db
+def test_cached_page_gets_the_visitors_csrf_token(active_post):
+    url = reverse('blogs:post-detail', kwargs={'pk': active_post.pk})
+    Client().get(url)
+
+    visitor = Client(enforce_csrf_checks=True)
+    response = visitor.get(url)
+    assert response['X-Cache'] == 'HIT'
+    token = csrf_input(response)
+    assert token and 'csrftoken' in response.cookies
+
+    # The form on the cached page posts back fine.
+    response = visitor.post(reverse('blogs:add-comment', kwargs={'pk': active_post.pk}),
+                            {'content': 'Hello', 'csrfmiddlewaretoken': token})
+    assert response.status_code == 302
+    assert Comment.objects.filter(post=active_post).count() == 1
+
+
+@pytest.mark.django_db
+def test_add_comment_invalidates_detail_and_list(client, active_post):
+    detail_url = reverse('blogs:post-detail', kwargs={'pk': active_post.pk})
+    list_url = reverse('blogs:post-list')
+    client.get(detail_url)
+    client.get(list_url)
+
+    client.post(reverse('blogs:add-comment', kwargs={'pk': active_post.pk}), {'content': 'Fresh comment.'})
+
+    response = client.get(detail_url)
+    assert response['X-Cache'] == 'MISS'
+    assert b"Fresh comment." in response.content
+    response = client.get(list_url)
+    assert response['X-Cache'] == 'MISS'
+    assert b"1 comment" in response.content
+
+
+@pytest.mark.django_db
+def test_post_save_invalidates_pages(client, active_post):
+    detail_url = reverse('blogs:post-detail', kwargs={'pk': active_post.pk})
+    client.get(detail_url)
+    client.get(reverse('blogs:post-list'))
+
+    active_post.title = "Edited Title"
+    active_post.save()
+
+    assert b"Edited Title" in client.get(detail_url).content
+    assert b"Edited Title" in client.get(reverse('blogs:post-list')).content
+
+
+@pytest.mark.django_db
+def test_logged_in_users_get_fragments_not_pages(client, user, active_post, django_assert_num_queries):
+    Comment.objects.create(post=active_post, content="First comment.")
+    url = reverse('blogs:post-detail', kwargs={'pk': active_post.pk})
+    client.force_login(user)
+    first = client.get(url)
+    assert 'X-Cache' not in first
+    assert b"First comment." in first.content
+
+    # Only the post: session and user are cached, and so is the comments
+    # fragment, which skips the comment query.
+    with django_assert_num_queries(1):
+        second = client.get(url)
+    assert second.content.replace(csrf_input(second).encode(), b'') == \
+        first.content.replace(csrf_input(first).encode(), b'')
+
+
+@pytest.mark.django_db
+def test_comment_fragment_follows_comment_activity(client, user, active_post):
+    url = reverse('blogs:post-detail', kwargs={'pk': active_post.pk})
+    client.force_login(user)
+    assert b"No comments yet." in client.get(url).content
+
+    comment = Comment.objects.create(post=active_post, content="New comment.")
+    assert b"New comment." in client.get(url).content
+
+    comment.delete()
+    assert b"No comments yet." in client.get(url).content
@@ -0,0 +1,131 @@
+import re
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from blogs.models import Post
+from blogs.cache import invalidate_posts
+from blogs.pagination import PostCursorPagination
+import datetime
+
+@pytest.fixture
+def many_posts(db, author):
+    """
+    25 active posts, where every two posts share the same published_date so the
+    id tie-breaker of the cursor is exercised.
+    """
+    now = timezone.now()
+    return [
+        Post.objects.create(
+            title="Post %d" % i,
+            content="Content of post %d." % i,
+            published_date=now - datetime.timedelta(hours=i // 2),
+            author=author,
+            status="published",
+            active=True
+        )
+        for i in range(25)
+    ]
+
+
+@pytest.mark.django_db
+def test_post_list_cursor_walks_every_post_once(api_client, many_posts):
+    url = reverse('api-post-list')
+    response = api_client.get(url, {'page_size': 10})
+    assert response.status_code == status.HTTP_200_OK
+
+    seen = []
+    pages = 0
+    data = response.json()
+    while True:
+        pages += 1
+        assert len(data['results']) <= 10
+        seen.extend(post['title'] for post in data['results'])
+        if not data['next']:
+            break
+        data = api_client.get(data['next']).json()
+
+    assert pages == 3
+    assert len(seen) == len(set(seen)) == 25
+
+    expected = Post.objects.order_by('-published_date', '-id').values_list('title', flat=True)
+    assert seen == list(expected)
+
+
+@pytest.mark.django_db
+def test_post_list_cursor_previous_returns_same_page(api_client, many_posts):
+    url = reverse('api-post-list')
+    first = api_client.get(url, {'page_size': 10}).json()
+    assert first['previous'] is None
+
+    second = api_client.get(first['next']).json()
+    back = api_client.get(second['previous']).json()
+    assert back['results'] == first['results']
+
+
+@pytest.mark.django_db
+def test_post_list_cursor_page_size_is_bounded(api_client, many_posts):
+    url = reverse('api-post-list')
+    response = api_client.get(url, {'page_size': 100000})
+    assert len(response.json()['results']) == 25
+
+    Post.objects.bulk_create([
+        Post(title="Extra %d" % i, content="Extra content.", author=many_posts[0].author,
+             status="published", active=True)
+        for i in range(100)
+    ])
+    # bulk_create sends no post_save signals, so cached responses are invalidated by hand.
+    invalidate_posts()
+    response = api_client.get(url, {'page_size': 100000})
+    assert len(response.json()['results']) == 100
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('url_name', ['api-post-list', 'api-async-post-list'])
+def test_plain_post_list_is_bounded(api_client, many_posts, monkeypatch, url_name):
+    monkeypatch.setattr(PostCursorPagination, 'max_page_size', 10)
+    expected = list(Post.objects.order_by('-published_date', '-id').values_list('title', flat=True))
+    url = reverse(url_name)
+
+    # The second request is a cache hit on the sync view; the link is kept.
+    for _ in range(2):
+        response = api_client.get(url)
+        assert [post['title'] for post in response.json()] == expected[:10]
+        next_url = re.match(r'<(.*)>; rel="next"$', response['Link']).group(1)
+
+    data = api_client.get(next_url).json()
+    assert [post['title'] for post in data['results']] == expected[10:20]
+
+
+@pytest.mark.django_db
+def test_post_list_cursor_is_bound_to_its_ordering(api_client, many_posts):
+    Post.objects.update(last_commented_at=timezone.now())
+    invalidate_posts()
+    url = reverse('api-post-list')
+    cursor = parse_qs(urlparse(api_client.get(url, {'page_size': 5}).json()['next']).query)['cursor'][0]
+
+    assert api_client.get(url, {'cursor': cursor}).status_code == status.HTTP_200_OK
+    response = api_client.get(url, {'cursor': cursor, 'ordering': '-last_commented_at'})
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+@pytest.mark.django_db
+def test_post_list_invalid_cursor(api_client, many_posts):
+    response = api_client.get(reverse('api-post-list'), {'cursor': 'not-a-cursor'})
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+@pytest.mark.django_db
+def test_html_post_list_uses_cursor_links(client, many_posts):
+    response = client.get(reverse('blogs:post-list'))
+    assert response.status_code == 200
+    page = response.context['page_obj']
+    assert len(page.object_list) == 10
+    assert page.has_next and not page.has_previous
+
+    response = client.get(reverse('blogs:post-list'), {'cursor': page.next_cursor})
+    assert [post.title for post in response.context['posts']] == [
+        post.title for post in sorted(many_posts, key=lambda p: (p.published_date, p.id), reverse=True)[10:20]
+    ]
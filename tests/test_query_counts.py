@@ -0,0 +1,211 @@
+"""
+N+1 guard for every route in `blogs.urls` and `blogs.urls_api`.
+
+Each route is requested once against a small dataset and once after the
+dataset has grown (more authors, posts, comments and commenting users). The
+query count must be the same both times, and equal to the number recorded in
+ROUTES, so an extra per-request lookup is caught as well as a per-row one.
+"""
+import datetime
+import difflib
+import itertools
+import re
+import uuid
+
+import pytest
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, get_resolver, reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from blogs.models import Post, Author, Comment
+from blogs.counters import refresh_comment_stats
+from blogs import authentication, search
+from django.contrib.auth import get_user_model
+
+
+User = get_user_model()
+
+SMALL = dict(authors=2, posts=3, comments=2)
+# Each growth step adds this much on top of the small dataset. More comments
+# than fit a comment page would not change the count, so stay below 20.
+LARGE = dict(authors=6, posts=30, comments=12)
+
+
+class Dataset:
+    """Authors, posts and comments; `grow()` adds more of each."""
+
+    def __init__(self):
+        self.counter = itertools.count()
+        self.owner = User.objects.create_user(username="owner", password="password123")
+        self.owner_author = Author.objects.create(name="Owner", email="owner@example.com", user=self.owner)
+        self.admin = User.objects.create_superuser(username="admin", password="password123")
+        self.target = None
+
+    def grow(self, authors, posts, comments):
+        step = next(self.counter)
+        users = [
+            User.objects.create_user(username="user-%d-%d" % (step, i), first_name="First%d" % i)
+            for i in range(authors)
+        ]
+        writers = [self.owner_author] + [
+            Author.objects.create(name="Author %d-%d" % (step, i), email="a%d-%d@example.com" % (step, i), user=user)
+            for i, user in enumerate(users)
+        ]
+        now = timezone.now()
+        new_posts = Post.objects.bulk_create([
+            Post(
+                title="Post %d-%d" % (step, i),
+                content="Searchable content of post %d in step %d." % (i, step),
+                published_date=now - datetime.timedelta(minutes=i),
+                author=writers[i % len(writers)],
+                status="published",
+                active=True,
+            )
+            for i in range(posts)
+        ])
+        Comment.objects.bulk_create([
+            Comment(post=post, content="Comment %d" % i, user=users[i % len(users)],
+                    created=now + datetime.timedelta(seconds=i))
+            for post in new_posts
+            for i in range(comments)
+        ])
+        # bulk_create sends no signals.
+        refresh_comment_stats([post.pk for post in new_posts])
+        search.rebuild_index()
+        # The owner's newest post: its comment count grows with the dataset.
+        self.target = new_posts[0]
+        # A comment stored through the comment queue, by its token.
+        self.token = uuid.uuid4()
+        Comment.objects.filter(pk__in=self.target.comments.values_list('pk', flat=True)[:1]).update(token=self.token)
+
+    def unique(self, prefix):
+        return "%s %d" % (prefix, next(self.counter))
+
+
+def bulk_posts(data):
+    return [{"title": data.unique("Bulk post"), "content": "Bulk content, long enough."} for _ in range(5)]
+
+
+def bulk_comments(data):
+    return [{"post": data.target.pk, "content": "Bulk comment", "user": "owner"} for _ in range(5)]
+
+
+def new_post(data):
+    return {"title": data.unique("New post"), "content": "New content, long enough.",
+            "published_date": timezone.now().isoformat()}
+
+
+def html_new_post(data):
+    return {"title": data.unique("Form post"), "content": "Form content.",
+            "author": data.owner_author.pk, "status": "published", "active": "on"}
+
+
+def edit_post(data):
+    return {"title": data.unique("Edited"), "content": "Edited content, long enough.", "active": True}
+
+
+# (url name, method, url kwargs, query params or body, user, expected queries)
+ROUTES = [
+    ('blogs:post-list', 'get', {}, {}, None, 1),
+    ('blogs:post-detail', 'get', {'pk'}, {}, None, 2),
+    ('blogs:post-create', 'get', {}, {}, None, 1),
+    ('blogs:post-create', 'post', {}, html_new_post, None, 7),
+    ('blogs:add-comment', 'post', {'pk'}, {'content': 'Hello'}, None, 5),
+    ('api-post-list', 'get', {}, {}, None, 2),
+    ('api-post-list', 'get', {}, {'page_size': 10}, None, 2),
+    ('api-post-list', 'get', {}, {'ordering': '-last_commented_at'}, None, 2),
+    ('api-post-search', 'get', {}, {'q': 'searchable content'}, None, 2),
+    ('api-post-detail', 'get', {'pk'}, {}, None, 3),
+    ('api-async-post-list', 'get', {}, {}, None, 1),
+    ('api-async-post-detail', 'get', {'pk'}, {}, None, 2),
+    ('api-comment-create', 'get', {'post_pk'}, {}, None, 1),
+    ('api-comment-create', 'post', {'post_pk'}, {'content': 'Hello'}, None, 5),
+    ('api-post-create', 'post', {}, new_post, 'owner', 9),
+    ('api-post-bulk-create', 'post', {}, bulk_posts, 'owner', 11),
+    ('api-comment-bulk-create', 'post', {}, bulk_comments, 'admin', 9),
+    ('api-comment-queued', 'get', {'token'}, {}, None, 1),
+    ('api-post-edit', 'get', {'pk'}, {}, 'owner', 4),
+    ('api-post-edit', 'put', {'pk'}, edit_post, 'owner', 8),
+    ('api-post-delete', 'delete', {'pk'}, {}, 'owner', 8),
+    ('api-export', 'get', {}, {'kind': 'posts'}, 'admin', 3),
+    ('api-export', 'get', {}, {'kind': 'comments'}, 'admin', 3),
+    ('api-cache-stats', 'get', {}, {}, 'admin', 2),
+]
+
+
+def route_id(route):
+    name, method, _, params, _, _ = route
+    extra = ','.join('%s=%s' % item for item in params.items()) if isinstance(params, dict) and method == 'get' else ''
+    return '%s %s %s' % (method.upper(), name, extra)
+
+
+def request(data, route):
+    name, method, kwargs, params, user, _ = route
+    client = APIClient()
+    if user is not None:
+        client.force_login(data.owner if user == 'owner' else data.admin)
+    url = reverse(name, kwargs={key: data.token if key == 'token' else data.target.pk for key in kwargs})
+    body = params(data) if callable(params) else params
+    # Every measurement starts from empty caches.
+    cache.clear()
+    authentication.tokens.clear()
+    authentication.users.clear()
+    with CaptureQueriesContext(connection) as context:
+        if method == 'get':
+            response = client.get(url, body)
+        elif name.startswith('blogs:'):
+            response = getattr(client, method)(url, body)
+        else:
+            response = getattr(client, method)(url, body, format='json')
+        if response.streaming:
+            b''.join(response.streaming_content)
+    assert response.status_code < 400, (response.status_code, getattr(response, 'content', b'')[:500])
+    return [query['sql'] for query in context.captured_queries]
+
+
+def normalize(sql):
+    # Ids and literal values differ between the runs; the statements should not.
+    return re.sub(r"\b\d+\b|'[^']*'", '?', sql)
+
+
+def report(small, large):
+    diff = difflib.unified_diff(
+        [normalize(sql) for sql in small], [normalize(sql) for sql in large],
+        'small dataset', 'large dataset', lineterm='', n=1,
+    )
+    return '\n'.join(diff)
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('route', ROUTES, ids=route_id)
+def test_query_count_is_constant(route):
+    expected = route[-1]
+    data = Dataset()
+    data.grow(**SMALL)
+    small = request(data, route)
+
+    data.grow(**LARGE)
+    large = request(data, route)
+
+    assert len(small) == len(large), (
+        "%s: %d queries on the small dataset, %d on the large one\n%s"
+        % (route_id(route), len(small), len(large), report(small, large))
+    )
+    assert len(large) == expected, (
+        "%s: expected %d queries, got %d:\n%s"
+        % (route_id(route), expected, len(large), '\n'.join(large))
+    )
+
+
+def route_names(urlconf, namespace=None):
+    for pattern in get_resolver(urlconf).url_patterns:
+        if isinstance(pattern, URLPattern) and pattern.name:
+            yield '%s:%s' % (namespace, pattern.name) if namespace else pattern.name
+
+
+def test_every_route_is_covered():
+    covered = {route[0] for route in ROUTES}
+    routes = set(route_names('blogs.urls', 'blogs')) | set(route_names('blogs.urls_api'))
+    assert routes - covered == set()
@@ -0,0 +1,81 @@
+import pytest
+from django.db import connection
+from django.test import RequestFactory
+from rest_framework.request import Request
+from blogs.models import Post
+from blogs.views import PostListAPIView, PostListView
+
+
+pytestmark = pytest.mark.skipif(
+    connection.vendor != 'sqlite', reason="EXPLAIN QUERY PLAN checks are SQLite specific"
+)
+
+FILTER_COMBINATIONS = [
+    {},
+    {'title': 'django'},
+    {'author_name': 'smith'},
+    {'start_date': '2025-01-01'},
+    {'end_date': '2025-02-01'},
+    {'start_date': '2025-01-01', 'end_date': '2025-02-01'},
+    {'title': 'django', 'author_name': 'smith', 'start_date': '2025-01-01', 'end_date': '2025-02-01'},
+    {'ordering': '-last_commented_at'},
+    {'ordering': '-last_commented_at', 'title': 'django'},
+]
+
+
+def list_api_queryset(params):
+    view = PostListAPIView()
+    view.request = Request(RequestFactory().get('/api/posts/', params))
+    return view.get_queryset()
+
+
+def capture_plan(queryset):
+    """Run EXPLAIN QUERY PLAN for `queryset` and return the plan lines."""
+    sql, sql_params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute('EXPLAIN QUERY PLAN ' + sql, sql_params)
+        return [row[-1] for row in cursor.fetchall()]
+
+
+def assert_no_post_table_scan(queryset):
+    """
+    Fail if blogs_post is scanned other than through one of the partial active
+    indexes, which only hold the rows the list endpoint can return.
+    """
+    plan = capture_plan(queryset)
+    table = Post._meta.db_table
+    scans = [
+        line for line in plan
+        if line.startswith('SCAN %s' % table) and 'post_active_' not in line
+    ]
+    assert not scans, "Full scan of %s:\n  %s\nSQL: %s" % (table, "\n  ".join(plan), queryset.query)
+    return plan
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('params', FILTER_COMBINATIONS, ids=lambda p: ','.join(p) or 'none')
+def test_post_list_filters_use_index(params):
+    assert_no_post_table_scan(list_api_queryset(params))
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('params', FILTER_COMBINATIONS, ids=lambda p: ','.join(p) or 'none')
+def test_post_list_keyset_page_uses_index(params):
+    field = 'last_commented_at' if params.get('ordering') else 'published_date'
+    qs = list_api_queryset(params).order_by('-' + field, '-id')[:21]
+    plan = assert_no_post_table_scan(qs)
+    assert not any('TEMP B-TREE' in line for line in plan), "\n".join(plan)
+
+
+@pytest.mark.django_db
+def test_date_range_is_sargable():
+    sql = str(list_api_queryset({'start_date': '2025-01-01', 'end_date': '2025-02-01'}).query)
+    assert 'django_datetime_cast_date' not in sql
+
+
+@pytest.mark.django_db
+def test_html_list_page_uses_index():
+    qs = PostListView().get_queryset().order_by('-published_date', '-id')[:11]
+    plan = capture_plan(qs)
+    assert any('post_pub_idx' in line for line in plan), "\n".join(plan)
+    assert not any('TEMP B-TREE' in line for line in plan), "\n".join(plan)
@@ -0,0 +1,171 @@
+import pytest
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connections
+from django.test import Client
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from blogs.authentication import create_token
+from blogs.models import Post, Comment
+from blogs.replicas import PIN_COOKIE, ReplicaSelector, selector
+
+
+# The replica is a second SQLite file, copied from the test database by
+# `sync_replicas`. SQLite cannot copy a database another transaction is
+# writing to, so these tests commit as they go.
+pytestmark = pytest.mark.django_db(transaction=True)
+
+
+@pytest.fixture
+def replica(tmp_path, settings):
+    alias = 'replica1'
+    connections.settings[alias] = dict(connections['default'].settings_dict, NAME=str(tmp_path / 'replica.sqlite3'))
+    settings.BLOG_READ_REPLICAS = [alias]
+    # Reads reach the database rather than the response caches.
+    settings.BLOG_API_CACHE_TIMEOUT = 0
+    settings.BLOG_PAGE_CACHE_TIMEOUT = 0
+    selector.reset()
+    yield alias
+    connections[alias].close()
+    del connections[alias]
+    del connections.settings[alias]
+
+def create_post(author, title):
+    return Post.objects.create(
+        title=title,
+        content="Content of %s." % title,
+        published_date=timezone.now(),
+        author=author,
+        status="published",
+        active=True
+    )
+
+
+def titles(response):
+    return [post['title'] for post in response.json()]
+
+
+def test_list_and_detail_read_from_replica(replica, author):
+    synced = create_post(author, "Synced Post")
+    call_command('sync_replicas')
+    lagging = create_post(author, "Lagging Post")
+
+    client = APIClient()
+    assert titles(client.get(reverse('api-post-list'))) == ["Synced Post"]
+    assert client.get(reverse('api-post-detail', kwargs={'pk': lagging.pk})).status_code == 404
+    assert client.get(reverse('api-post-detail', kwargs={'pk': synced.pk})).status_code == 200
+    assert client.get(reverse('blogs:post-detail', kwargs={'pk': lagging.pk})).status_code == 404
+
+    call_command('sync_replicas')
+    assert sorted(titles(client.get(reverse('api-post-list')))) == ["Lagging Post", "Synced Post"]
+
+
+def test_replica_reads_are_not_cached_until_the_replica_caught_up(replica, author, settings):
+    settings.BLOG_API_CACHE_TIMEOUT = 60
+    create_post(author, "Synced Post")
+    call_command('sync_replicas')
+    create_post(author, "Lagging Post")
+
+    client = APIClient()
+    response = client.get(reverse('api-post-list'))
+    assert titles(response) == ["Synced Post"]
+    response = client.get(reverse('api-post-list'))
+    assert response['X-Cache'] == 'MISS'
+
+    call_command('sync_replicas')
+    assert sorted(titles(client.get(reverse('api-post-list')))) == ["Lagging Post", "Synced Post"]
+
+
+def test_writes_go_to_primary_and_pin_the_writer(replica, user, author, settings):
+    settings.BLOG_REPLICA_PIN_SECONDS = 7
+    post = create_post(author, "Post")
+    call_command('sync_replicas')
+    url = reverse('api-post-detail', kwargs={'pk': post.pk})
+
+    client = APIClient()
+    client.force_login(user)
+    response = client.post(reverse('api-comment-create', kwargs={'post_pk': post.pk}), {'content': 'Mine.'})
+    assert response.status_code == 201
+    assert response.cookies[PIN_COOKIE]['max-age'] == 7
+    assert Comment.objects.using('default').count() == 1
+
+    # The writer reads the primary; everyone else still reads the replica.
+    assert [c['content'] for c in client.get(url).json()['comments']] == ['Mine.']
+    assert APIClient().get(url).json()['comments'] == []
+
+
+def test_token_clients_are_pinned_without_cookies(replica, user, author):
+    post = create_post(author, "Post")
+    call_command('sync_replicas')
+    _, key = create_token(user)
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION='Token ' + key)
+
+    client.patch(reverse('api-post-edit', kwargs={'pk': post.pk}), {'title': 'Edited'})
+    client.cookies.clear()
+    assert titles(client.get(reverse('api-post-list'))) == ['Edited']
+
+    anonymous = APIClient()
+    assert titles(anonymous.get(reverse('api-post-list'))) == ['Post']
+
+
+def test_anonymous_form_comment_is_read_back(replica, author):
+    post = create_post(author, "Post")
+    call_command('sync_replicas')
+    url = reverse('blogs:post-detail', kwargs={'pk': post.pk})
+
+    client = Client()
+    client.post(reverse('blogs:add-comment', kwargs={'pk': post.pk}), {'content': 'Anonymous comment.'})
+    assert PIN_COOKIE in client.cookies
+    assert b"Anonymous comment." in client.get(url).content
+    assert b"Anonymous comment." not in Client().get(url).content
+
+
+def test_queued_comments_are_read_back_from_primary(replica, author, settings, tmp_path):
+    settings.BLOG_COMMENT_QUEUE = True
+    settings.BLOG_COMMENT_QUEUE_WORKER = 'command'
+    settings.BLOG_COMMENT_SPOOL_DIR = str(tmp_path / 'spool')
+    post = create_post(author, "Post")
+    call_command('sync_replicas')
+
+    client = APIClient()
+    response = client.post(reverse('api-comment-create', kwargs={'post_pk': post.pk}), {'content': 'Queued.'})
+    assert response.status_code == 202
+    detail = client.get(reverse('api-post-detail', kwargs={'pk': post.pk}))
+    assert [c['content'] for c in detail.json()['comments']] == ['Queued.']
+
+
+def test_without_replicas_nothing_is_pinned(user, author):
+    post = create_post(author, "Post")
+    client = APIClient()
+    client.force_login(user)
+    response = client.post(reverse('api-comment-create', kwargs={'post_pk': post.pk}), {'content': 'Hi.'})
+    assert response.status_code == 201
+    assert PIN_COOKIE not in response.cookies
+
+
+def test_sync_replicas_needs_replicas():
+    with pytest.raises(CommandError):
+        call_command('sync_replicas')
+
+
+def test_round_robin_takes_turns():
+    chooser = ReplicaSelector()
+    assert [chooser.choose(['a', 'b', 'c']) for _ in range(6)] == ['a', 'b', 'c', 'a', 'b', 'c']
+
+
+def test_least_latency_prefers_the_fastest_and_probes_the_rest():
+    chooser = ReplicaSelector()
+    for seconds in (0.010, 0.012):
+        chooser.record('slow', seconds)
+    chooser.record('fast', 0.001)
+    picks = [chooser.choose(['slow', 'fast'], 'least-latency') for _ in range(40)]
+    assert picks.count('fast') == 39
+    assert picks.count('slow') == 1
+
+    # Moving averages follow the replicas as they change.
+    for _ in range(30):
+        chooser.record('fast', 0.050)
+    picks = [chooser.choose(['slow', 'fast'], 'least-latency') for _ in range(5)]
+    assert picks.count('slow') >= 4
@@ -0,0 +1,101 @@
+import pytest
+from django.db import connection
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from blogs.models import Post
+from blogs import search
+
+@pytest.fixture
+def posts(db, author):
+    def create(title, content, active=True):
+        return Post.objects.create(
+            title=title,
+            content=content,
+            published_date=timezone.now(),
+            author=author,
+            status="published",
+            active=active
+        )
+    return {
+        'title_match': create("Django performance tips", "Some general notes about web apps."),
+        'content_match': create("Weekend notes", "We talked about django for a while, then lunch."),
+        'no_match': create("Gardening", "Tomatoes need a lot of sun."),
+        'inactive': create("Django draft", "Unpublished django thoughts.", active=False),
+    }
+
+
+@pytest.mark.django_db
+def test_search_ranks_title_matches_first(api_client, posts):
+    response = api_client.get(reverse('api-post-search'), {'q': 'django'})
+    assert response.status_code == status.HTTP_200_OK
+
+    data = response.json()
+    assert [hit['title'] for hit in data] == ["Django performance tips", "Weekend notes"]
+    assert data[0]['title_highlight'] == "<mark>Django</mark> performance tips"
+    assert "<mark>django</mark>" in data[1]['snippet']
+    assert data[0]['author_name'] == "Test Author"
+
+
+@pytest.mark.django_db
+def test_search_requires_query(api_client, posts):
+    response = api_client.get(reverse('api-post-search'))
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.django_db
+def test_search_escapes_content_and_query_syntax(api_client, author):
+    Post.objects.create(
+        title="Markup", content="<script>alert(1)</script> django NEAR OR",
+        author=author, status="published", active=True
+    )
+    response = api_client.get(reverse('api-post-search'), {'q': 'django" OR *'})
+    assert response.status_code == status.HTTP_200_OK
+    snippet = response.json()[0]['snippet']
+    assert "<script>" not in snippet
+    assert "&lt;script&gt;" in snippet
+
+
+@pytest.mark.django_db
+def test_search_index_follows_edits(author, posts):
+    post = posts['no_match']
+    post.title = "Django in the garden"
+    post.save()
+    assert "Django in the garden" in [hit.post.title for hit in search.search_posts("django")]
+
+    author.name = "Guido"
+    author.save()
+    assert len(search.search_posts("guido")) == 3
+
+    posts['title_match'].delete()
+    assert "Django performance tips" not in [hit.post.title for hit in search.search_posts("django")]
+
+
+@pytest.mark.django_db
+def test_term_index_fallback_matches_fts(posts):
+    search.rebuild_term_index()
+    rows = search.term_index_search(["django"], 10)
+    assert [row[0] for row in rows] == [posts['title_match'].pk, posts['content_match'].pk]
+    assert search.term_index_search(["django", "lunch"], 10)[0][0] == posts['content_match'].pk
+    assert search.term_index_search(["missing"], 10) == []
+
+
+@pytest.mark.django_db
+def test_term_index_idf_counts_active_posts_only(author, posts):
+    search.rebuild_term_index()
+    before = search.term_index_search(["django"], 10)
+
+    # Inactive posts are not searched, so they do not change the ranking.
+    Post.objects.bulk_create([
+        Post(title="Old", content="Old django notes.", author=author, status="draft", active=False)
+        for _ in range(5)
+    ])
+    search.rebuild_term_index()
+    assert search.term_index_search(["django"], 10) == before
+
+
+@pytest.mark.django_db
+def test_search_index_is_kept_by_signals_not_triggers():
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'trigger'")
+        assert cursor.fetchall() == []
@@ -0,0 +1,126 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from blogs.bulk import ingest_posts
+from blogs.models import Post, Comment, make_excerpt
+
+
+LONG_CONTENT = ' '.join('word%d' % i for i in range(200))
+
+@pytest.fixture
+def active_post(db, author):
+    return Post.objects.create(
+        title="Active Post",
+        content=LONG_CONTENT,
+        published_date=timezone.now(),
+        author=author,
+        status="published",
+        active=True
+    )
+
+
+def post_queries(queries):
+    return [query['sql'] for query in queries if 'FROM "blogs_post"' in query['sql']]
+
+
+@pytest.mark.django_db
+def test_excerpt_is_the_truncated_content(active_post):
+    assert active_post.excerpt == ' '.join('word%d' % i for i in range(30)) + ' …'
+    assert make_excerpt('Short post.') == 'Short post.'
+    assert len(make_excerpt('x' * 10000)) == 500
+
+
+@pytest.mark.django_db
+def test_excerpt_follows_content(active_post):
+    active_post.content = "Rewritten content."
+    active_post.save(update_fields=['content'])
+    assert Post.objects.get(pk=active_post.pk).excerpt == "Rewritten content."
+
+    # Saving a post loaded without its content leaves the excerpt alone.
+    post = Post.objects.defer('content').get(pk=active_post.pk)
+    with CaptureQueriesContext(connection) as context:
+        post.title = "New title"
+        post.save()
+    assert not any('"blogs_post"."content"' in query['sql'] for query in context.captured_queries)
+    assert Post.objects.get(pk=active_post.pk).excerpt == "Rewritten content."
+
+
+@pytest.mark.django_db
+def test_bulk_ingested_posts_get_excerpts(author):
+    ingest_posts([{'title': 'Bulk', 'content': LONG_CONTENT}], author.pk)
+    assert Post.objects.get(title='Bulk').excerpt == make_excerpt(LONG_CONTENT)
+
+
+@pytest.mark.django_db
+def test_list_fields_narrow_the_response_and_the_query(api_client, active_post):
+    with CaptureQueriesContext(connection) as context:
+        response = api_client.get(reverse('api-post-list'), {'fields': 'id,excerpt,title'})
+    # Serializer order, not request order.
+    assert response.json() == [{'id': active_post.pk, 'title': 'Active Post', 'excerpt': active_post.excerpt}]
+    sql = post_queries(context.captured_queries)
+    assert sql and not any('"content"' in query for query in sql)
+
+
+@pytest.mark.django_db
+def test_list_default_fields_are_unchanged(api_client, active_post):
+    post = api_client.get(reverse('api-post-list')).json()[0]
+    assert list(post) == ['title', 'content', 'published_date', 'author_name', 'comment_count', 'last_commented_at']
+
+
+@pytest.mark.django_db
+def test_sparse_list_pages_with_cursors(api_client, author):
+    for i in range(5):
+        Post.objects.create(title="Post %d" % i, content="Content %d." % i, author=author,
+                            status="published", active=True)
+    url = reverse('api-post-list')
+    titles = []
+    params = {'fields': 'title', 'page_size': 2}
+    while url:
+        body = api_client.get(url, params).json()
+        titles += [post['title'] for post in body['results']]
+        url, params = body['next'], None
+    assert sorted(titles) == ["Post %d" % i for i in range(5)]
+
+
+@pytest.mark.django_db
+def test_detail_fields_skip_comments_and_content(api_client, active_post):
+    Comment.objects.create(post=active_post, content="A comment.")
+    url = reverse('api-post-detail', kwargs={'pk': active_post.pk})
+    with CaptureQueriesContext(connection) as context:
+        response = api_client.get(url, {'fields': 'title,excerpt,author_name'})
+    assert response.json() == {'title': 'Active Post', 'excerpt': active_post.excerpt, 'author_name': 'Test Author'}
+    assert not any('"blogs_comment"' in query['sql'] for query in context.captured_queries)
+    assert not any('"content"' in query for query in post_queries(context.captured_queries))
+
+    body = api_client.get(url, {'fields': 'comments,comments_next'}).json()
+    assert [c['content'] for c in body['comments']] == ["A comment."] and body['comments_next'] is None
+
+    assert 'excerpt' not in api_client.get(url).json()
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('name', ['api-post-list', 'api-async-post-list'])
+@pytest.mark.parametrize('fields', ['password', '', 'title,nope'])
+def test_unknown_fields_are_rejected(api_client, active_post, name, fields):
+    response = api_client.get(reverse(name), {'fields': fields})
+    assert response.status_code == 400
+    assert 'fields' in response.json()
+
+
+@pytest.mark.django_db
+def test_async_views_take_fields(api_client, active_post):
+    response = api_client.get(reverse('api-async-post-list'), {'fields': 'title'})
+    assert response.json() == [{'title': 'Active Post'}]
+    response = api_client.get(reverse('api-async-post-detail', kwargs={'pk': active_post.pk}), {'fields': 'id'})
+    assert response.json() == {'id': active_post.pk}
+
+
+@pytest.mark.django_db
+def test_html_list_shows_excerpts_without_loading_content(client, active_post):
+    with CaptureQueriesContext(connection) as context:
+        response = client.get(reverse('blogs:post-list'))
+    assert active_post.excerpt.encode() in response.content
+    assert b'word31' not in response.content
+    assert not any('"content"' in query for query in post_queries(context.captured_queries))
@@ -0,0 +1,40 @@
+import json
+
+from django.core.management import call_command
+from django.template import Context, Engine, engines
+from blogs.template_cache import project_template_names, warm_templates
+
+
+def test_project_templates_are_found():
+    names = project_template_names()
+    assert 'base.html' in names
+    assert 'templates/post_detail.html' in names
+    # Templates of Django's and DRF's apps are not part of the project.
+    assert not any(name.startswith(('admin/', 'rest_framework/')) for name in names)
+
+
+def test_production_mode_uses_the_cached_loader():
+    engine = engines['django'].engine
+    assert [loader.__class__.__name__ for loader in engine.template_loaders] == ['Loader']
+    assert engine.template_loaders[0].__module__ == 'django.template.loaders.cached'
+
+
+def test_warm_templates_fills_the_cache():
+    loader = engines['django'].engine.template_loaders[0]
+    loader.reset()
+    warm_templates()
+    assert all(loader.cache_key(name) in loader.get_template_cache for name in project_template_names())
+
+
+def test_bundle_serves_the_project_templates(tmp_path):
+    path = str(tmp_path / 'templates.json')
+    call_command('bundle_templates', path)
+    with open(path) as f:
+        bundle = json.load(f)
+    assert sorted(bundle) == project_template_names()
+
+    # A bundle-only engine renders {% extends %} chains without the template directories.
+    engine = Engine(loaders=[('blogs.template_cache.BundleLoader', path)], libraries={})
+    html = engine.get_template('templates/post_form.html').render(Context({'authors': []}))
+    assert '<title>Blog</title>' in html
+